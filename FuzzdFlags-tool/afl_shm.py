@@ -0,0 +1,138 @@
+"""
+afl_shm.py - AFL-compatible shared-memory edge maps without afl-fuzz.
+
+An AFL++-instrumented binary (the clang built with afl-clang-fast, see
+build-clang17-clang-options.sh) attaches to the SysV shared-memory segment
+named by __AFL_SHM_ID at start-up and bumps one byte per edge it executes.
+Clang 17 runs cc1 in-process, so one compile fills one map.
+
+  SharedMap     one segment per process; clear() before a run, env() for the
+                child, classified() afterwards (hit counts bucketed as in AFL)
+  VirginMap     global "seen so far" state; update() reports new edges/buckets
+
+The segment is marked for removal right after it is attached (Linux still
+lets children attach it by id), so nothing leaks if a worker is killed.
+The map size is AFL_MAP_SIZE, as for afl-fuzz (4 MiB for the mapsize22 build).
+"""
+import ctypes
+import ctypes.util
+import os
+
+MAP_SIZE = int(os.environ.get("AFL_MAP_SIZE", str(1 << 22)))
+SHM_ENV_VAR = "__AFL_SHM_ID"
+
+IPC_PRIVATE = 0
+IPC_RMID = 0
+IPC_CREAT = 0o1000
+IPC_EXCL = 0o2000
+
+# AFL's count classes: 0, 1, 2, 3, 4-7, 8-15, 16-31, 32-127, 128-255
+COUNT_CLASS = bytes(
+    0 if n == 0 else 1 if n == 1 else 2 if n == 2 else 4 if n == 3 else
+    8 if n <= 7 else 16 if n <= 15 else 32 if n <= 31 else 64 if n <= 127 else 128
+    for n in range(256))
+# Any hit -> 1, for counting edges independently of their hit counts
+EDGE_BIT = bytes(0 if n == 0 else 1 for n in range(256))
+
+_libc = None
+
+
+def _lib():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        _libc.shmget.argtypes = (ctypes.c_int, ctypes.c_size_t, ctypes.c_int)
+        _libc.shmget.restype = ctypes.c_int
+        _libc.shmat.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_int)
+        _libc.shmat.restype = ctypes.c_void_p
+        _libc.shmdt.argtypes = (ctypes.c_void_p,)
+        _libc.shmctl.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_void_p)
+    return _libc
+
+
+class SharedMap:
+    def __init__(self, size=MAP_SIZE):
+        libc = _lib()
+        self.size = size
+        self.shm_id = libc.shmget(IPC_PRIVATE, size, IPC_CREAT | IPC_EXCL | 0o600)
+        if self.shm_id < 0:
+            raise OSError(ctypes.get_errno(), "shmget failed")
+        addr = libc.shmat(self.shm_id, None, 0)
+        if addr in (None, ctypes.c_void_p(-1).value):
+            raise OSError(ctypes.get_errno(), "shmat failed")
+        self.addr = addr
+        libc.shmctl(self.shm_id, IPC_RMID, None)
+
+    def env(self, base=None):
+        env = dict(os.environ if base is None else base)
+        env[SHM_ENV_VAR] = str(self.shm_id)
+        env.setdefault("AFL_MAP_SIZE", str(self.size))
+        return env
+
+    def clear(self):
+        ctypes.memset(self.addr, 0, self.size)
+
+    def raw(self) -> bytes:
+        return ctypes.string_at(self.addr, self.size)
+
+    def classified(self) -> bytes:
+        return self.raw().translate(COUNT_CLASS)
+
+    def close(self):
+        if self.addr is not None:
+            _lib().shmdt(self.addr)
+            self.addr = None
+
+
+_worker_map = None
+
+
+def worker_map() -> SharedMap:
+    """The calling process's own map (one per pool worker, created on first use)."""
+    global _worker_map
+    if _worker_map is None or _worker_map.pid != os.getpid():
+        _worker_map = SharedMap()
+        _worker_map.pid = os.getpid()
+    return _worker_map
+
+
+class VirginMap:
+    """
+    Everything seen so far, as big ints over the classified map bytes. Like
+    AFL's virgin_bits the ints hold what has *not* been seen yet, so the usual
+    case (nothing new) costs one conversion and one AND.
+    """
+
+    def __init__(self, size=MAP_SIZE):
+        self.size = size
+        self.full = (1 << (8 * size)) - 1
+        self.edge_mask = int.from_bytes(b"\x01" * size, "little")
+        self.unseen = self.full         # bucket bits never seen: new edge or new hit-count bucket
+        self.unhit = self.edge_mask     # edges never hit (bit 0 of each map byte)
+
+    def update(self, classified: bytes):
+        """Returns (new_edges, new_buckets) for one classified map and folds it in."""
+        fresh = int.from_bytes(classified, "little") & self.unseen
+        if not fresh:
+            return 0, 0
+        self.unseen ^= fresh
+        new_edges = int.from_bytes(classified.translate(EDGE_BIT), "little") & self.unhit
+        self.unhit ^= new_edges
+        return new_edges.bit_count(), fresh.bit_count()
+
+    def edge_count(self) -> int:
+        return self.size - self.unhit.bit_count()
+
+    def save(self, path):
+        tmp = str(path) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write((self.unseen ^ self.full).to_bytes(self.size, "little"))
+        os.replace(tmp, path)
+
+    def load(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) != self.size:
+            raise ValueError(f"{path}: map of {len(data)} bytes, expected {self.size}")
+        self.unseen = int.from_bytes(data, "little") ^ self.full
+        self.unhit = int.from_bytes(data.translate(EDGE_BIT), "little") ^ self.edge_mask
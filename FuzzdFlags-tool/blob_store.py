@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+blob_store.py - content-addressed store for program and compiler outputs.
+
+Usage:
+  blob_store.py cat <store_dir> <sha256>
+  blob_store.py stats <store_dir>
+
+A blob is filed under the sha256 of the whole stream it came from, as
+<store_dir>/<sha[:2]>/<sha[2:]>, so an output that many runs produced (the
+same "Segmentation fault", the same 40 MB of printf) is stored once however
+often it is put. Streams are captured up to a byte cap; a blob holding only
+the first bytes of a longer stream is filed as <sha[2:]>.head instead, and
+is replaced if the whole stream is put later. Blobs are written to a temp
+file and renamed, so concurrent writers and interrupted runs never leave a
+partial blob under a final name.
+"""
+import hashlib
+import os
+import sys
+import tempfile
+
+
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+        self.written = 0
+        self.bytes_written = 0
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, sha, complete=True):
+        return os.path.join(self.root, sha[:2], sha[2:] + ("" if complete else ".head"))
+
+    def has(self, sha, head=False):
+        """True if the whole stream with this hash is stored (with head=True, a head-only blob counts)."""
+        return os.path.exists(self.path(sha)) or (head and os.path.exists(self.path(sha, complete=False)))
+
+    def put(self, sha, data, complete=True):
+        """Stores data (the stream with hash sha, or its first bytes); no-op if already there."""
+        final = self.path(sha, complete)
+        if os.path.exists(final) or (not complete and self.has(sha)):
+            return final
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(final), prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, final)
+        if complete:
+            try:
+                os.remove(self.path(sha, complete=False))
+            except FileNotFoundError:
+                pass
+        self.written += 1
+        self.bytes_written += len(data)
+        return final
+
+    def get(self, sha):
+        """(bytes, complete) of a stored stream, or (None, False)."""
+        for complete in (True, False):
+            try:
+                with open(self.path(sha, complete), "rb") as f:
+                    return f.read(), complete
+            except FileNotFoundError:
+                pass
+        return None, False
+
+
+def sha256_hex(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "cat":
+        data, complete = BlobStore(sys.argv[2]).get(sys.argv[3])
+        if data is None:
+            print(f"no blob {sys.argv[3]}", file=sys.stderr)
+            sys.exit(1)
+        sys.stdout.buffer.write(data)
+        if not complete:
+            print("\n[... head only; the stream was longer ...]", file=sys.stderr)
+    elif len(sys.argv) == 3 and sys.argv[1] == "stats":
+        count = heads = size = 0
+        for dirpath, _, files in os.walk(sys.argv[2]):
+            for name in files:
+                if name.startswith(".tmp-"):
+                    continue
+                count += 1
+                heads += name.endswith(".head")
+                size += os.path.getsize(os.path.join(dirpath, name))
+        print(f"{count} blobs ({heads} head-only), {size / 1e6:.1f} MB")
+    else:
+        print("Usage: blob_store.py cat <store_dir> <sha256> | stats <store_dir>")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
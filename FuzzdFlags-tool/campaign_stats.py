@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+campaign_stats.py - fuzzer_stats / plot_data across instances, repetitions and experiments.
+
+Usage:
+  campaign_stats.py summary <name>=<dir>... [--out summary.csv]
+  campaign_stats.py series  <name>=<dir>... [--step 60] [--metrics m1,m2,...] [--out series.csv]
+
+Each <dir> is one experiment (AFL vanilla, NRS, FuzzdFlags, ...) holding one
+subdirectory per repetition (fuzz01..fuzz05, as the setup-machine.sh scripts
+leave them). A repetition is either
+
+  - AFL++ output: every directory below it holding fuzzer_stats or plot_data
+    is one instance (default/, secondary fuzzers, ...), or
+  - an NRS output directory (results.bin, checkpoint.json).
+
+Instances of one repetition are combined (counters summed, coverage maxed);
+repetitions are then aggregated into mean and 95% confidence interval.
+
+`summary` writes the fuzzer_stats fields of extract_fuzz_stat_dir.sh, one row
+per repetition plus mean and ci95 rows per experiment. `series` writes a
+long-format CSV
+
+  experiment,metric,time_s,reps,mean,ci95
+
+with every repetition resampled onto a common grid of --step seconds (a
+repetition leaves the mean once its campaign has ended; `reps` says how many
+are left). plot_data is read through mmap and thinned to one row per step
+while it is parsed, so months of it load in seconds.
+
+NRS logs have no timestamps: a record's time is its cumulative compile time
+scaled to the wall-clock time in checkpoint.json, saved_crashes counts crash
+records, and there is no edges_found.
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_right
+
+from fuzz_report import parse_fuzzer_stats
+from result_log import OUTCOME_CODE, read_header, record_struct
+
+SUMMARY_FIELDS = (
+    "corpus_count", "saved_crashes", "saved_hangs", "run_time", "execs_done",
+    "execs_per_sec", "pending_total", "max_depth", "bitmap_cvg", "edges_found",
+    "total_edges", "var_byte_count",
+)
+# Fields that add up across the instances of one repetition; the rest are maxed
+SUM_FIELDS = {"corpus_count", "saved_crashes", "saved_hangs", "execs_done", "execs_per_sec",
+              "pending_total", "total_execs"}
+SERIES_METRICS = ("execs_per_sec", "edges_found", "saved_crashes")
+# Older AFL/AFL++ plot_data column names
+PLOT_ALIASES = {"unique_crashes": "saved_crashes", "unique_hangs": "saved_hangs",
+                "paths_total": "corpus_count", "cur_path": "cur_item"}
+NRS_CHUNK_RECORDS = 1 << 16
+
+# Two-sided 95% t quantiles by degrees of freedom; 1.96 beyond the table
+T95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+       2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+       2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def mean_ci(values):
+    """(mean, 95% CI half-width) of a sample; the half-width is 0 for a single value."""
+    n = len(values)
+    mean = sum(values) / n
+    if n < 2:
+        return mean, 0.0
+    sd = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+    t = T95[n - 2] if n - 2 < len(T95) else 1.96
+    return mean, t * sd / math.sqrt(n)
+
+
+def _number(text):
+    try:
+        return float(text.strip().rstrip("%"))
+    except ValueError:
+        return None
+
+
+# -----------------------------------------------------------------------------
+# Discovery
+# -----------------------------------------------------------------------------
+
+def is_afl_instance(path):
+    return (os.path.isfile(os.path.join(path, "fuzzer_stats"))
+            or os.path.isfile(os.path.join(path, "plot_data")))
+
+
+def is_nrs_output(path):
+    return os.path.isfile(os.path.join(path, "results.bin"))
+
+
+def find_instances(rep_dir, depth=3):
+    """AFL instance directories below rep_dir (the walk stops at the first level holding one)."""
+    if is_afl_instance(rep_dir):
+        return [rep_dir]
+    if depth == 0:
+        return []
+    found = []
+    with os.scandir(rep_dir) as it:
+        subdirs = sorted(e.path for e in it if e.is_dir() and not e.name.startswith("."))
+    for sub in subdirs:
+        found += find_instances(sub, depth - 1)
+    return found
+
+
+def find_repetitions(exp_dir):
+    """[(rep name, 'afl' | 'nrs', [instance dirs])] for the repetition subdirectories of exp_dir."""
+    reps = []
+    with os.scandir(exp_dir) as it:
+        subdirs = sorted((e.name, e.path) for e in it if e.is_dir() and not e.name.startswith("."))
+    for name, path in subdirs:
+        if is_nrs_output(path):
+            reps.append((name, "nrs", [path]))
+        else:
+            instances = find_instances(path)
+            if instances:
+                reps.append((name, "afl", instances))
+    return reps
+
+
+# -----------------------------------------------------------------------------
+# Loading
+# -----------------------------------------------------------------------------
+
+def load_plot_data(path, metrics, step=None):
+    """
+    {"time": array, metric: array, ...} from an AFL plot_data file; times are
+    seconds since the first row. With `step`, only the last row of every
+    step-second bucket is kept. Metrics the file does not have are left out.
+    """
+    series = {"time": array("d")}
+    if os.path.getsize(path) == 0:
+        return series
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header = mm.readline().decode().lstrip("#").split(",")
+        names = [PLOT_ALIASES.get(h.strip(), h.strip()) for h in header]
+        cols = [(m, names.index(m)) for m in metrics if m in names]
+        for m, _ in cols:
+            series[m] = array("d")
+        start = None
+        pending = None
+        bucket = None
+        for line in iter(mm.readline, b""):
+            fields = line.split(b",")
+            if len(fields) < len(names):
+                continue    # torn last line of a running fuzzer
+            t = float(fields[0])
+            if start is None:
+                start = t
+            t -= start
+            row = (t, [_number(fields[i].decode()) for _, i in cols])
+            if step:
+                b = int(t // step)
+                if bucket is not None and b != bucket:
+                    _append_row(series, cols, pending)
+                bucket, pending = b, row
+            else:
+                _append_row(series, cols, row)
+        if pending is not None:
+            _append_row(series, cols, pending)
+    return series
+
+
+def _append_row(series, cols, row):
+    t, values = row
+    series["time"].append(t)
+    for (m, _), v in zip(cols, values):
+        series[m].append(float("nan") if v is None else v)
+
+
+def _nrs_outcomes(mm, offset, rs):
+    """(outcome code, compile seconds) of every complete record, unpacked a chunk at a time."""
+    end = offset + (len(mm) - offset) // rs.size * rs.size
+    chunk = NRS_CHUNK_RECORDS * rs.size
+    with memoryview(mm) as view:
+        for pos in range(offset, end, chunk):
+            for _, _, code, wall, _, _ in rs.iter_unpack(view[pos:min(pos + chunk, end)]):
+                yield code, wall
+
+
+def load_nrs_series(out_dir, step=None):
+    """time / total_execs / execs_per_sec / saved_crashes / saved_hangs series from an NRS results.bin."""
+    log = os.path.join(out_dir, "results.bin")
+    header, offset = read_header(log)
+    rs = record_struct(header["mask_bytes"])
+    crash, hang, invalid = OUTCOME_CODE["crash"], OUTCOME_CODE["hang"], OUTCOME_CODE["invalid"]
+    series = {m: array("d") for m in ("time", "total_execs", "execs_per_sec", "saved_crashes", "saved_hangs")}
+    with open(log, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # first pass: total compile time, to map it onto the campaign's wall-clock time
+        total_wall = sum(wall for code, wall in _nrs_outcomes(mm, offset, rs) if code != invalid)
+        scale = 1.0
+        checkpoint = os.path.join(out_dir, "checkpoint.json")
+        if total_wall and os.path.isfile(checkpoint):
+            with open(checkpoint) as cf:
+                scale = json.load(cf).get("elapsed", total_wall) / total_wall
+
+        def emit(t, execs, crashes, hangs):
+            last_t = series["time"][-1] if series["time"] else 0.0
+            last_execs = series["total_execs"][-1] if series["total_execs"] else 0
+            series["time"].append(t)
+            series["total_execs"].append(execs)
+            series["execs_per_sec"].append((execs - last_execs) / (t - last_t) if t > last_t else 0.0)
+            series["saved_crashes"].append(crashes)
+            series["saved_hangs"].append(hangs)
+
+        wall = 0.0
+        execs = crashes = hangs = 0
+        bucket = pending = None
+        for code, seconds in _nrs_outcomes(mm, offset, rs):
+            if code == invalid:
+                continue
+            wall += seconds
+            execs += 1
+            crashes += code == crash
+            hangs += code == hang
+            row = (wall * scale, execs, crashes, hangs)
+            if step:
+                b = int(row[0] // step)
+                if bucket is not None and b != bucket:
+                    emit(*pending)
+                bucket, pending = b, row
+            else:
+                emit(*row)
+        if pending is not None:
+            emit(*pending)
+    return series
+
+
+def resample(series, metric, grid):
+    """Step-function value of `metric` at each grid time; None past the end of the series."""
+    times, values = series["time"], series.get(metric)
+    if values is None or not times:
+        return [None] * len(grid)
+    end = times[-1]
+    out = []
+    for t in grid:
+        if t > end:
+            out.append(None)
+            continue
+        i = bisect_right(times, t) - 1
+        out.append(values[i] if i >= 0 else 0.0)
+    return out
+
+
+def combine(metric, columns):
+    """Combines the resampled columns of one repetition's instances."""
+    combined = []
+    for values in zip(*columns):
+        live = [v for v in values if v is not None and not math.isnan(v)]
+        if not live:
+            combined.append(None)
+        else:
+            combined.append(sum(live) if metric in SUM_FIELDS else max(live))
+    return combined
+
+
+def rep_series(kind, instances, metrics, step):
+    if kind == "nrs":
+        return [load_nrs_series(instances[0], step)]
+    return [load_plot_data(os.path.join(d, "plot_data"), metrics, step)
+            for d in instances if os.path.isfile(os.path.join(d, "plot_data"))]
+
+
+def experiment_series(exp_dir, metrics=SERIES_METRICS, step=60.0):
+    """{metric: (grid, reps, mean, ci95)} for one experiment directory."""
+    reps = [rep_series(kind, inst, metrics, step) for _, kind, inst in find_repetitions(exp_dir)]
+    reps = [r for r in reps if r]
+    end = max((s["time"][-1] for r in reps for s in r if s["time"]), default=0.0)
+    grid = [i * step for i in range(int(end // step) + 1)]
+    result = {}
+    for metric in metrics:
+        per_rep = [combine(metric, [resample(s, metric, grid) for s in r]) for r in reps]
+        n_col, mean_col, ci_col = [], [], []
+        for values in zip(*per_rep):
+            live = [v for v in values if v is not None]
+            if live:
+                mean, ci = mean_ci(live)
+            else:
+                mean, ci = None, None
+            n_col.append(len(live))
+            mean_col.append(mean)
+            ci_col.append(ci)
+        if any(n_col):
+            result[metric] = (grid, n_col, mean_col, ci_col)
+    return result
+
+
+def rep_summary(kind, instances):
+    """{field: float} of one repetition's final stats."""
+    if kind == "nrs":
+        path = os.path.join(instances[0], "checkpoint.json")
+        if not os.path.isfile(path):
+            return {}
+        with open(path) as f:
+            state = json.load(f)
+        elapsed = state.get("elapsed", 0.0)
+        return {"saved_crashes": state["crashes"], "saved_hangs": state["hangs"],
+                "run_time": elapsed, "execs_done": state["iterations"],
+                "execs_per_sec": state["iterations"] / elapsed if elapsed else 0.0}
+    combined = {}
+    for d in instances:
+        for field, text in parse_fuzzer_stats(os.path.join(d, "fuzzer_stats")).items():
+            value = _number(text)
+            if field not in SUMMARY_FIELDS or value is None:
+                continue
+            if field in combined:
+                value = combined[field] + value if field in SUM_FIELDS else max(combined[field], value)
+            combined[field] = value
+    return combined
+
+
+# -----------------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------------
+
+def _fmt(v):
+    if v is None:
+        return ""
+    return f"{v:.6g}"
+
+
+def write_summary(experiments, out):
+    out.write("experiment,rep," + ",".join(SUMMARY_FIELDS) + "\n")
+    for name, exp_dir in experiments:
+        rows = [rep_summary(kind, inst) for _, kind, inst in find_repetitions(exp_dir)]
+        for (rep, _, _), row in zip(find_repetitions(exp_dir), rows):
+            out.write(f"{name},{rep}," + ",".join(_fmt(row.get(f)) for f in SUMMARY_FIELDS) + "\n")
+        stats = {}
+        for f in SUMMARY_FIELDS:
+            values = [row[f] for row in rows if f in row]
+            stats[f] = mean_ci(values) if values else (None, None)
+        out.write(f"{name},mean," + ",".join(_fmt(stats[f][0]) for f in SUMMARY_FIELDS) + "\n")
+        out.write(f"{name},ci95," + ",".join(_fmt(stats[f][1]) for f in SUMMARY_FIELDS) + "\n")
+
+
+def write_series(experiments, metrics, step, out):
+    out.write("experiment,metric,time_s,reps,mean,ci95\n")
+    for name, exp_dir in experiments:
+        for metric, (grid, n_col, mean_col, ci_col) in experiment_series(exp_dir, metrics, step).items():
+            for t, n, mean, ci in zip(grid, n_col, mean_col, ci_col):
+                if n:
+                    out.write(f"{name},{metric},{t:g},{n},{_fmt(mean)},{_fmt(ci)}\n")
+
+
+def parse_experiment(text):
+    name, sep, path = text.partition("=")
+    if not sep:
+        name, path = os.path.basename(os.path.normpath(text)), text
+    if not os.path.isdir(path):
+        raise argparse.ArgumentTypeError(f"not a directory: {path}")
+    return name, path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate fuzzing campaigns across instances and repetitions")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for cmd in ("summary", "series"):
+        p = sub.add_parser(cmd)
+        p.add_argument("experiments", nargs="+", type=parse_experiment, metavar="name=dir")
+        p.add_argument("--out", help="CSV file (default: stdout)")
+        if cmd == "series":
+            p.add_argument("--step", type=float, default=60.0, help="grid step in seconds")
+            p.add_argument("--metrics", default=",".join(SERIES_METRICS),
+                           help="comma-separated plot_data columns")
+    args = parser.parse_args()
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        if args.cmd == "summary":
+            write_summary(args.experiments, out)
+        else:
+            write_series(args.experiments, args.metrics.split(","), args.step, out)
+    finally:
+        if args.out:
+            out.close()
+            print(f"[*]Written {args.cmd} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+corpus_index.py - one-time per-source feature index for a reindexed C corpus.
+
+Usage:
+  corpus_index.py build <corpus_dir> [--out <index.tsv>] [--clang <clang_path>] [--jobs N]
+  corpus_index.py show <index.tsv> <test_N.c>
+
+The index is a small tab-separated table, one row per test_N.c:
+
+  name  size  asm  typeof  argv1  libm  o0_ms
+
+  asm/typeof : source uses inline asm / typeof (nrs-semi-smart guards)
+  argv1      : program reads argv[1], spacing allowed (dt-hash passes an argument;
+               check-O0.sh keeps its literal 'argv[1]' grep)
+  libm       : source includes math.h (coverage scripts add -lm)
+  o0_ms      : baseline '-O0 -c' compile time in ms with --clang, else -1
+
+By default it is written next to the corpus as <corpus_dir>.features.tsv (not
+inside it, since several scripts treat every file in the corpus dir as a test).
+Drivers load it once at start-up so their hot loops do no source I/O or regex
+work; CORPUS_INDEX overrides the location.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+COLUMNS = ("name", "size", "asm", "typeof", "argv1", "libm", "o0_ms")
+SourceFeatures = namedtuple("SourceFeatures", COLUMNS)
+
+# Same patterns the drivers used to apply per iteration
+ASM_RE = re.compile(r'\b(__)?asm\b')
+TYPEOF_RE = re.compile(r'\btypeof\b')
+ARGV1_RE = re.compile(r'\bargv\s*\[\s*1\s*\]')
+LIBM_RE = re.compile(r'math\.h')
+
+BASELINE_TIMEOUT = 500
+
+
+def baseline_flags():
+    """Fixed flags clang-options always adds (see getFixedFlags())."""
+    includes_dir = os.environ.get("INCLUDES_DIR", "/users/user42/llvmSS-include")
+    return [
+        "-c", "-fpermissive", "-w",
+        "-Wno-implicit-function-declaration", "-Wno-return-type", "-Wno-builtin-redeclared",
+        "-Wno-implicit-int", "-Wno-int-conversion",
+        "-march=native", "-I/usr/include", f"-I{includes_dir}",
+    ]
+
+
+def default_index_path(corpus_dir):
+    env = os.environ.get("CORPUS_INDEX")
+    if env:
+        return env
+    return os.path.normpath(corpus_dir) + ".features.tsv"
+
+
+def source_index(name):
+    """'test_12.c' -> 12 (None if the name does not follow the reindex scheme)."""
+    m = re.match(r'test_(\d+)\.c$', os.path.basename(name))
+    return int(m.group(1)) if m else None
+
+
+def scan_source(path, clang=None):
+    """Computes the feature row for one source file."""
+    with open(path, "r", encoding="utf8", errors="ignore") as f:
+        text = f.read()
+    o0_ms = -1
+    if clang:
+        cmd = [clang, "-x", "c", "-O0", *baseline_flags(), path, "-o", os.devnull]
+        start = time.monotonic()
+        try:
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           timeout=BASELINE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            pass
+        o0_ms = int((time.monotonic() - start) * 1000)
+    return SourceFeatures(
+        name=os.path.basename(path),
+        size=os.path.getsize(path),
+        asm=bool(ASM_RE.search(text)),
+        typeof=bool(TYPEOF_RE.search(text)),
+        argv1=bool(ARGV1_RE.search(text)),
+        libm=bool(LIBM_RE.search(text)),
+        o0_ms=o0_ms,
+    )
+
+
+def _scan_one(job):
+    return scan_source(*job)
+
+
+def list_sources(corpus_dir):
+    names = [f for f in os.listdir(corpus_dir) if f.endswith(".c")]
+    # numeric order for test_N.c, lexical for anything else
+    return sorted(names, key=lambda n: (source_index(n) is None, source_index(n) or 0, n))
+
+
+def scan_corpus(corpus_dir, clang=None, jobs=1):
+    """Returns {name: SourceFeatures} for every .c file in corpus_dir."""
+    jobs_list = [(os.path.join(corpus_dir, n), clang) for n in list_sources(corpus_dir)]
+    if jobs == 1:
+        rows = map(_scan_one, jobs_list)
+        return {r.name: r for r in rows}
+    with ProcessPoolExecutor(max_workers=jobs or None) as pool:
+        return {r.name: r for r in pool.map(_scan_one, jobs_list, chunksize=16)}
+
+
+def write_index(index, out_path):
+    tmp = out_path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write("\t".join(COLUMNS) + "\n")
+        for r in index.values():
+            f.write(f"{r.name}\t{r.size}\t{int(r.asm)}\t{int(r.typeof)}\t"
+                    f"{int(r.argv1)}\t{int(r.libm)}\t{r.o0_ms}\n")
+    os.replace(tmp, out_path)
+
+
+def load_index(path):
+    """Loads an index written by write_index() into {name: SourceFeatures}."""
+    index = {}
+    with open(path, "r") as f:
+        header = f.readline().rstrip("\n").split("\t")
+        if tuple(header) != COLUMNS:
+            raise ValueError(f"{path}: unexpected index header {header}")
+        for line in f:
+            name, size, asm, typeof, argv1, libm, o0_ms = line.rstrip("\n").split("\t")
+            index[name] = SourceFeatures(name, int(size), asm == "1", typeof == "1",
+                                         argv1 == "1", libm == "1", int(o0_ms))
+    return index
+
+
+def load_or_scan(corpus_dir):
+    """Loads the corpus index if it has been built, otherwise scans the corpus once in memory."""
+    path = default_index_path(corpus_dir)
+    if os.path.isfile(path):
+        return load_index(path)
+    print(f"[!]No corpus index at {path}; scanning {corpus_dir} once "
+          f"(run 'corpus_index.py build {corpus_dir}' to persist it).", file=sys.stderr)
+    return scan_corpus(corpus_dir, jobs=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-source feature index for a C corpus")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="scan a corpus and write its feature index")
+    b.add_argument("corpus_dir")
+    b.add_argument("--out", help="index path (default: <corpus_dir>.features.tsv)")
+    b.add_argument("--clang", help="also record baseline -O0 compile time with this clang")
+    b.add_argument("--jobs", type=int, default=0, help="parallel scanners (0 = one per CPU core)")
+    s = sub.add_parser("show", help="print the row of one source")
+    s.add_argument("index")
+    s.add_argument("name")
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        out = args.out or default_index_path(args.corpus_dir)
+        index = scan_corpus(args.corpus_dir, clang=args.clang, jobs=args.jobs)
+        write_index(index, out)
+        print(f"[*]Indexed {len(index)} sources -> {out}")
+    else:
+        row = load_index(args.index).get(os.path.basename(args.name))
+        if row is None:
+            print(f"[!]{args.name} not in {args.index}")
+            sys.exit(1)
+        for col in COLUMNS:
+            print(f"{col:7}: {getattr(row, col)}")
+
+
+if __name__ == "__main__":
+    main()
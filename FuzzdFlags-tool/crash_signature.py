@@ -0,0 +1,251 @@
+"""
+crash_signature.py - bounded stderr capture and crash bucketing for compiler runs.
+
+A crashing clang prints something like
+
+  PLEASE submit a bug report to https://github.com/llvm/llvm-project/issues/ ...
+  Stack dump:
+  0.  Program arguments: /users/user42/build-clang17/bin/clang ...
+  1.  <eof> parser at end of file
+  2.  Code generation
+  3.  Running pass 'X86 DAG->DAG Instruction Selection' on function '@main'
+   #0 0x000055d0c1f2a1b2 llvm::sys::PrintStackTrace(llvm::raw_ostream&, int) (/.../clang+0x2b2a1b2)
+   #1 ...
+
+signature() normalises that (drops addresses, offsets, paths, line numbers,
+function/module names and the signal-handling frames) and hashes the top frames
+together with the crashing pass and any assertion / LLVM ERROR message. Two
+crashes with the same signature are taken to be the same bug. Failures without
+a stack dump get a weaker signature from their first error line.
+
+CrashBuckets keeps a live bucket table (and one exemplar per bucket) on disk.
+"""
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from collections import namedtuple
+
+# How much of a process's stderr is kept: the first HEAD_BYTES and the last TAIL_BYTES
+HEAD_BYTES = 16 * 1024
+TAIL_BYTES = 48 * 1024
+TOP_FRAMES = 6
+
+Signature = namedtuple("Signature", "hash kind title")
+
+FRAME_RE = re.compile(r'^\s*#\d+\s+0x[0-9a-fA-F]+\s+(.*)$')
+# "3.  Running pass 'X' on function '@main'" lines of the stack dump header
+CONTEXT_RE = re.compile(r'^\s*\d+\.\s+(.+?)\s*$')
+CONTEXT_TARGET_RE = re.compile(r"\s+on (function|module|loop|basic block|machine function)\b.*$")
+ASSERT_RE = re.compile(r"Assertion `(.+)' failed")
+LLVM_ERROR_RE = re.compile(r'LLVM ERROR: (.+)')
+UNREACHABLE_RE = re.compile(r'(UNREACHABLE executed.*)')
+ERROR_RE = re.compile(r'error: (.+)')
+# Frames that only show the crash being reported, not where it happened: function
+# names matched exactly, and name prefixes of whole families of such functions
+NOISE_FRAMES = {
+    "llvm::sys::PrintStackTrace", "PrintStackTraceSignalHandler", "llvm::sys::RunSignalHandlers",
+    "SignalHandler", "__restore_rt", "raise", "abort", "__assert_fail", "__assert_fail_base",
+    "llvm::llvm_unreachable_internal", "llvm::report_fatal_error", "CrashRecoverySignalHandler",
+    "__pthread_kill", "__pthread_kill_implementation", "__pthread_kill_internal", "pthread_kill",
+    "gsignal", "llvm::sys::CleanupOnSignal", "_start",
+}
+NOISE_PREFIXES = ("llvm::sys::", "llvm::CrashRecoveryContext::", "__libc_", "_Unwind_", "__GI_")
+
+
+def run_bounded(cmd, timeout=None, stdin=subprocess.DEVNULL, cwd=None, env=None):
+    """
+    Runs cmd with stdout discarded and stderr spooled to a temp file, so a chatty
+    compiler never fills memory. Returns (returncode, stderr_excerpt);
+    returncode is None on timeout.
+    """
+    with tempfile.TemporaryFile() as err:
+        try:
+            rc = subprocess.run(cmd, stdin=stdin, stdout=subprocess.DEVNULL, stderr=err,
+                                timeout=timeout, cwd=cwd, env=env).returncode
+        except subprocess.TimeoutExpired:
+            rc = None
+        return rc, read_bounded(err)
+
+
+def read_bounded(f):
+    """Head + tail of an open binary file, decoded."""
+    size = f.seek(0, os.SEEK_END)
+    f.seek(0)
+    if size <= HEAD_BYTES + TAIL_BYTES:
+        data = f.read()
+    else:
+        head = f.read(HEAD_BYTES)
+        f.seek(size - TAIL_BYTES)
+        data = head + f"\n[... {size - HEAD_BYTES - TAIL_BYTES} bytes omitted ...]\n".encode() + f.read()
+    return data.decode("utf8", errors="replace")
+
+
+def normalize_frame(text):
+    text = re.sub(r'\s*\((/|\.\.\.)[^)]*\)\s*$', '', text)     # (/path/to/clang+0x1234)
+    text = re.sub(r'\s+\S+\+0x[0-9a-fA-F]+$', '', text)      # module+offset
+    text = re.sub(r'0x[0-9a-fA-F]+', '', text)
+    text = re.sub(r'\s+/\S+:\d+(:\d+)?$', '', text)           # file:line(:col) suffix
+    return text.strip()
+
+
+def normalize_message(text):
+    text = re.sub(r'/\S+', '<path>', text)
+    text = re.sub(r'0x[0-9a-fA-F]+', '<hex>', text)
+    text = re.sub(r'\b\d+\b', '<n>', text)
+    text = re.sub(r"'[^']*'", "'<id>'", text) if "Assertion" not in text else text
+    return text.strip()
+
+
+def frame_function(frame):
+    """Bare function name of a normalised frame (no arguments, return type, location, anonymous ns)."""
+    name = re.sub(r'\s+\S+:\d+(:\d+)?$', '', frame)   # relative file:line(:col) (./nptl/raise.c:27:6)
+    name = name.replace("(anonymous namespace)::", "").split("(", 1)[0].strip()
+    return name.split()[-1] if name else ""
+
+
+def _is_noise(frame):
+    name = frame_function(frame) if frame else ""
+    return not name or name in NOISE_FRAMES or name.startswith(NOISE_PREFIXES)
+
+
+def signature(stderr_text, rc=None):
+    """Returns Signature(hash, kind, title) for a failing compiler run."""
+    lines = stderr_text.splitlines()
+    parts = []
+    title = None
+    kind = "unknown"
+
+    for rx, k in ((ASSERT_RE, "assert"), (UNREACHABLE_RE, "unreachable"), (LLVM_ERROR_RE, "fatal")):
+        for line in lines:
+            m = rx.search(line)
+            if m:
+                title = normalize_message(m.group(1))
+                parts.append(f"{k}:{title}")
+                kind = k
+                break
+        if title:
+            break
+
+    contexts = [m.group(1) for m in map(CONTEXT_RE.match, lines) if m]
+    contexts = [c for c in contexts if not c.startswith("Program arguments")]
+    if contexts:
+        context = CONTEXT_TARGET_RE.sub("", contexts[-1])
+        context = re.sub(r'\S*/\S+|\S+\.c(:\d+)*:?', '<src>', context)
+        parts.append("context:" + context)
+
+    frames = [normalize_frame(m.group(1)) for m in (FRAME_RE.match(l) for l in lines) if m]
+    frames = [f for f in frames if not _is_noise(f)][:TOP_FRAMES]
+    if frames:
+        parts.extend(frames)
+        if kind == "unknown":
+            kind = "stack"
+            title = frames[0]
+
+    if not parts:
+        for line in lines:
+            m = ERROR_RE.search(line)
+            if m:
+                title = normalize_message(re.sub(r'^.*?:\d+:\d+:\s*', '', m.group(1)))
+                parts.append("error:" + title)
+                kind = "error"
+                break
+    if not parts:
+        kind = "signal" if rc is not None and (rc < 0 or rc >= 128) else "unknown"
+        title = f"rc={rc}"
+        parts.append(title)
+
+    digest = hashlib.sha1("\n".join(parts).encode()).hexdigest()[:16]
+    return Signature(digest, kind, title or parts[0])
+
+
+# Signature kinds that mean the compiler itself crashed (not just rejected the source)
+CRASH_KINDS = ("stack", "assert", "unreachable", "fatal", "signal")
+
+
+def is_compiler_crash(sig: Signature) -> bool:
+    return sig.kind in CRASH_KINDS
+
+
+class CrashBuckets:
+    """
+    Live crash buckets under <root>/:
+      buckets.tsv          hash, kind, count, title (rewritten on save())
+      members.tsv          hash, case id (appended per crash)
+      <hash>/stderr.txt    exemplar stderr of the first crash in the bucket
+      <hash>/case.txt      exemplar case description (source + flags)
+    With append=True existing buckets are loaded, so a resumed campaign keeps
+    counting; otherwise the table starts empty. truncate_at (a size returned by
+    tell()) rolls the buckets back to that point: members.tsv is cut there, the
+    counts are taken from what is left, and buckets left without members are
+    dropped with their exemplars.
+    """
+
+    def __init__(self, root, append=True, truncate_at=None):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.buckets = {}  # hash -> [kind, count, title]
+        path = os.path.join(root, "buckets.tsv")
+        if append and os.path.exists(path):
+            with open(path) as f:
+                next(f, None)
+                for line in f:
+                    h, kind, count, title = line.rstrip("\n").split("\t", 3)
+                    self.buckets[h] = [kind, int(count), title]
+        members = os.path.join(root, "members.tsv")
+        self._members = open(members, "a" if append else "w")
+        if append and truncate_at is not None:
+            self._rollback(members, truncate_at)
+
+    def _rollback(self, members, size):
+        if self._members.tell() > size:
+            self._members.truncate(size)
+        counts = {}
+        with open(members) as f:
+            for line in f:
+                h = line.split("\t", 1)[0]
+                counts[h] = counts.get(h, 0) + 1
+        for h in list(self.buckets):
+            if h in counts:
+                self.buckets[h][1] = counts[h]
+            else:
+                del self.buckets[h]
+                shutil.rmtree(os.path.join(self.root, h), ignore_errors=True)
+        self.save()
+
+    def add(self, sig: Signature, case_id: str, stderr_text: str, case_text: str) -> bool:
+        """Counts one crash; returns True if it opened a new bucket."""
+        self._members.write(f"{sig.hash}\t{case_id}\n")
+        entry = self.buckets.get(sig.hash)
+        if entry:
+            entry[1] += 1
+            return False
+        self.buckets[sig.hash] = [sig.kind, 1, sig.title.replace("\t", " ")]
+        ex = os.path.join(self.root, sig.hash)
+        os.makedirs(ex, exist_ok=True)
+        with open(os.path.join(ex, "stderr.txt"), "w") as f:
+            f.write(stderr_text)
+        with open(os.path.join(ex, "case.txt"), "w") as f:
+            f.write(case_text)
+        self.save()
+        return True
+
+    def save(self):
+        self._members.flush()
+        tmp = os.path.join(self.root, "buckets.tsv.tmp")
+        with open(tmp, "w") as f:
+            f.write("hash\tkind\tcount\ttitle\n")
+            for h, (kind, count, title) in sorted(self.buckets.items(), key=lambda kv: -kv[1][1]):
+                f.write(f"{h}\t{kind}\t{count}\t{title}\n")
+        os.replace(tmp, os.path.join(self.root, "buckets.tsv"))
+
+    def tell(self):
+        """Size of members.tsv so far, for truncate_at."""
+        self._members.flush()
+        return self._members.tell()
+
+    def close(self):
+        self.save()
+        self._members.close()
@@ -0,0 +1,215 @@
+"""
+ddmin.py - delta debugging (ddmin) over an ordered flag list, and parallel
+candidate evaluation for the flag minimisers.
+
+ddmin(flags, test) shrinks a failing flag list to a 1-minimal one: test() still
+fails on the result, and fails on no list with one flag fewer. It is Zeller's
+ddmin: split the list into n chunks, keep any chunk that still fails, else any
+complement (the list without one chunk) that still fails, else double n. A
+crash that needs k of n flags costs O(k log n) tests in the usual case instead
+of the C(n, k) compiles the exhaustive combination search needs (34,220 for
+k = 3 out of 60 flags); the worst case is O(n^2).
+
+Subsets keep the flags in their original order (the last -O wins, -fno-x after
+-fx, ...), and every subset is tested at most once.
+
+With jobs > 1 a round's chunks and complements are tested together on a
+thread pool (each test is a compiler subprocess). The first failing candidate
+in the serial order is taken, so the result does not depend on jobs, and the
+candidates not started by then are cancelled. ordered_map() does the same for
+the exhaustive search: results come back in input order whatever finishes
+first. Each worker thread compiles in its own ScratchDirs directory, so
+neither concurrent candidates nor two minimisers started in the same
+directory overwrite each other's executables.
+
+CrashIndex keeps the crashing combinations found so far as bitmasks over the
+flag list, so the exhaustive search skips a combination that contains one
+before it spawns clang. Each crashing flag of n removes n - 1 pairs and
+(n - 1)(n - 2)/2 triples (59 and 1,711 for n = 60); triggers found at size 1
+and 2 together often take out much of the size-3 search.
+"""
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def split(items, n):
+    """items cut into n contiguous chunks of near-equal size."""
+    size, extra = divmod(len(items), n)
+    chunks, start = [], 0
+    for i in range(n):
+        end = start + size + (i < extra)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+class ScratchDirs:
+    """One private directory per worker thread under a fresh temp dir; close() removes them all."""
+
+    def __init__(self, prefix="fddebug-"):
+        self.base = tempfile.mkdtemp(prefix=prefix)
+        self.local = threading.local()
+        self.ids = itertools.count()
+
+    def get(self):
+        path = getattr(self.local, "path", None)
+        if path is None:
+            path = self.local.path = os.path.join(self.base, f"w{next(self.ids)}")
+            os.mkdir(path)
+        return path
+
+    def close(self):
+        shutil.rmtree(self.base, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def ordered_map(fn, items, jobs=1):
+    """Yields (item, fn(item)) in input order, running up to `jobs` calls at once."""
+    if jobs <= 1:
+        for item in items:
+            yield item, fn(item)
+        return
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append((item, pool.submit(fn, item)))
+                if len(pending) >= 2 * jobs:
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            while pending:
+                item, future = pending.popleft()
+                yield item, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+class CrashIndex:
+    """Known crashing flag sets, as bitmasks over `flags`; prune() drops combinations containing one."""
+
+    def __init__(self, flags):
+        self.bit = {f: 1 << i for i, f in enumerate(flags)}
+        self.masks = []
+        self.skipped = 0
+
+    def mask(self, combo):
+        m = 0
+        for f in combo:
+            m |= self.bit[f]
+        return m
+
+    def add(self, combo):
+        self.masks.append(self.mask(combo))
+
+    def covers(self, combo):
+        m = self.mask(combo)
+        return any(known & m == known for known in self.masks)
+
+    def prune(self, combos):
+        """Yields the combos not containing a known crashing set, counting the others in `skipped`."""
+        for combo in combos:
+            if self.masks and self.covers(combo):
+                self.skipped += 1
+            else:
+                yield combo
+
+
+class DeltaDebugger:
+    """
+    test(subset) -> outcome, run on worker threads when jobs > 1;
+    verdict(outcome) -> True when the subset still fails. on_result(subset,
+    outcome), if given, is called on the calling thread, in candidate order,
+    for every outcome ddmin looks at (the place to print and log). Verdicts
+    are memoised by subset, and `tests` counts the outcomes looked at.
+    """
+
+    def __init__(self, test, jobs=1, verdict=bool, on_result=None):
+        self.test = test
+        self.verdict = verdict
+        self.on_result = on_result
+        self.jobs = jobs
+        self.pool = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        self.results = {}
+        self.tests = 0
+
+    def close(self):
+        if self.pool:
+            self.pool.shutdown(cancel_futures=True)
+
+    def _record(self, key, outcome):
+        self.tests += 1
+        if self.on_result:
+            self.on_result(list(key), outcome)
+        self.results[key] = bool(self.verdict(outcome))
+
+    def fails(self, subset):
+        key = tuple(subset)
+        if key not in self.results:
+            self._record(key, self.test(list(key)))
+        return self.results[key]
+
+    def first_failing(self, candidates):
+        """Index of the first failing candidate (None if none fails)."""
+        if self.pool is None:
+            return next((i for i, c in enumerate(candidates) if self.fails(c)), None)
+        keys = [tuple(c) for c in candidates]
+        futures = {}
+        for key in keys:
+            if key not in self.results and key not in futures:
+                futures[key] = self.pool.submit(self.test, list(key))
+        try:
+            for i, key in enumerate(keys):
+                if key in futures:
+                    self._record(key, futures.pop(key).result())
+                if self.results[key]:
+                    return i
+            return None
+        finally:
+            # A smaller failing candidate makes the rest redundant
+            for future in futures.values():
+                future.cancel()
+
+    def ddmin(self, items):
+        """1-minimal failing sublist of items (items itself must fail)."""
+        items = list(items)
+        n = 2
+        while len(items) >= 2:
+            chunks = split(items, n)
+            complements = [[f for j, c in enumerate(chunks) if j != i for f in c]
+                           for i in range(len(chunks))]
+            if self.pool is None:
+                i = self.first_failing(chunks)
+                if i is None:
+                    i = self.first_failing(complements)
+                    i = None if i is None else len(chunks) + i
+            else:
+                i = self.first_failing(chunks + complements)
+            if i is not None and i < len(chunks):
+                items, n = chunks[i], 2
+            elif i is not None:
+                items, n = complements[i - len(chunks)], max(n - 1, 2)
+            elif n >= len(items):
+                break
+            else:
+                n = min(len(items), 2 * n)
+        return items
+
+
+def ddmin(items, test, jobs=1):
+    """(1-minimal failing sublist of items, number of tests run)."""
+    dd = DeltaDebugger(test, jobs)
+    try:
+        return dd.ddmin(items), dd.tests
+    finally:
+        dd.close()
@@ -27,10 +27,6 @@ mkdir -p "$CRASH_DIR" "$HANG_DIR" "$MISMATCH_DIR"
 ################################################################################
 # CONFIG
 ################################################################################
-if [ -z "${INSTRUMENTED_CLANG_OPTIONS_PATH:-}" ]; then
-      echo "[!]Please set INSTRUMENTED_CLANG_OPTIONS_PATH env variable, e.g. /users/user42/build-test/bin/clang-options => export INSTRUMENTED_CLANG_OPTIONS_PATH="/users/user42/build-test/bin/clang-options""
-      exit 1
-fi
 if [ -z "${CFILES_DIR:-}" ]; then
       echo "[!]Please set CFILES_DIR env variable, e.g. /users/user42/llvmSS-reindex-cfiles => export CFILES_DIR="/users/user42/llvmSS-reindex-cfiles""
       exit 1
@@ -40,8 +36,9 @@ if [ -z "${INCLUDES_DIR:-}" ]; then
       echo "[!]Please set INCLUDES_DIR env variable, e.g. /users/user42/llvmSS-include => export INCLUDES_DIR="/users/user42/llvmSS-include""
       exit 1
 fi
-echo "[*]INSTRUMENTED_CLANG_OPTIONS_PATH is [$INSTRUMENTED_CLANG_OPTIONS_PATH]"
-CLANG_OPTIONS_BIN="$INSTRUMENTED_CLANG_OPTIONS_PATH"
+# Queue inputs are decoded in-process by queue_decode.py (same format as clang-options --checker)
+FUZZDFLAGS_TOOL_DIR="${FUZZDFLAGS_TOOL_DIR:-$(dirname "$(readlink -f "$0")")}"
+QUEUE_DECODE="$FUZZDFLAGS_TOOL_DIR/queue_decode.py"
 echo "[*]CFILES_DIR is [$CFILES_DIR]"
 echo "[*]INCLUDES_DIR is [$INCLUDES_DIR]"
 
@@ -274,16 +271,9 @@ do_compile_and_run() {
 ################################################################################
 # MAIN
 ################################################################################
-for f in "$FUZZED_DIR"/*; do
-  if [ -d "$f" ] || [ "$(basename "$f")" == "README" ]; then
-    continue
-  fi
-
-  # decode with clang-options
-  checker_out=$($CLANG_OPTIONS_BIN --filebin "$f" --checker 2>/dev/null || true)
-  local_source=$(echo "$checker_out" | grep -F "[Checker] Source File:" | cut -d':' -f2- | xargs)
-  local_flags=$(echo "$checker_out" | grep -F "[Checker] Flags:" | cut -d':' -f2- | xargs)
-
+# The whole directory is decoded up front: one "path<TAB>source<TAB>flags" line per input,
+# read on fd 3 so the compilers and test binaries below cannot consume it
+while IFS=$'\t' read -r f local_source local_flags <&3; do
   if [ -z "$local_source" ] || [ ! -f "$local_source" ]; then
     echo "=== Skipping $f: no valid Source File found! ===" >> "$DIFF_REPORT"
     continue
@@ -564,4 +554,4 @@ if [ "$mismatch_detected" -eq 1 ]; then
 else
   echo "**All matched among those successfully compiled**" >> "$DIFF_REPORT"
 fi
-done
+done 3< <(python3 "$QUEUE_DECODE" decode "$FUZZED_DIR")
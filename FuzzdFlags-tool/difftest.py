@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+difftest.py - concurrent differential testing of decoded queue inputs (FuzzdFlags -difftest).
+
+Usage:
+  difftest.py <fuzzed_queue_dir> <diff_out_dir> <target_name> <target_cmp_path>
+              [--jobs N] [--export] [--gcc PATH] [--clang19 PATH]
+              [--golden] [--ref-store PATH]
+
+Every input is decoded in-process (queue_decode.py) and compiled and run with
+gcc-14 (base flags only), clang-19 and the target (base + mutated flags), as
+diff-test.sh did one step at a time. Here every (input x compiler) compile
+and run is an asyncio subprocess, and up to --jobs of them (default: one per
+core) run at once; a compile or run that outlives its timeout is killed with
+its whole process group.
+
+Outcomes are the ones diff-test.sh printed: OK, Fail(rc), Timeout,
+Crashed-with-signal:N, UndefinedBehavior. An input's verdicts:
+
+  crash     a compile or run of any compiler crashed
+  hang      a compile or run of any compiler timed out
+  mismatch  two compilers that ran disagree: crash vs. no crash, timeout vs.
+            no timeout, or different output (stdout+stderr, compared by hash)
+
+Results stream to <diff_out_dir>/results.jsonl, one JSON line per input in
+queue order (written as soon as the input and all before it are done), and
+the per-input blocks of diff_test_summary.txt follow in the same order.
+--export also writes diff-test.sh's Crashes/, Hangs/ and MismatchLogs/
+folders (compile and run logs of all compilers plus a mini-report.txt) for
+every input with that verdict. Program output is hashed as it streams; only
+the first LOG_HEAD bytes are kept for the logs.
+
+The reference compilers (gcc-14, and with --golden the -O0 build of
+check-O0.sh) never see the mutated flags, so their outcome depends on the
+source alone: each test_N.c is compiled and run by them once, shared by every
+input that decodes to it, and kept in the reference store
+(reference_store.py; <CFILES_DIR>.references.jsonl unless --ref-store or
+REFERENCE_STORE say otherwise, --ref-store '' keeps it in memory) for later
+runs with the same compiler build and source contents. Such results carry
+"reference": "computed" or "reused" in results.jsonl.
+
+The clangs compile the canonical form of the flags (flag_canon.py: no
+repeated or overridden flags), and inputs in flight at the same time whose
+source and canonical flags are the same share one compile and run
+("shared": true). Every compile and run is first looked up in the shared
+outcome cache (outcome_cache.py; OUTCOME_CACHE=off disables it), so an
+(input, compiler) pair any earlier run tested is not compiled again
+("cached": true).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import signal
+import sys
+import time
+
+from queue_decode import CFILES_DIR, INCLUDES_DIR, decode_paths, queue_files
+from flag_canon import canonical_flags, canonical_key
+from outcome_cache import OutcomeCache
+from reference_store import ReferenceStore, compiler_build, config_id, source_digest, trim_logs
+from timeout_model import TimeoutModel
+
+GCC_14 = "/opt/gcc-14/bin/gcc"
+CLANG_19 = "/opt/llvm-19/bin/clang-19"
+COMPILE_TIMEOUT = 30   # ceiling for the per-source timeout from timeout_model.py
+RUN_TIMEOUT = 20
+RUN_ARGS = ["10000000"]
+LOG_HEAD = 64 * 1024
+# Cases in flight at once (each holds up to one subprocess per compiler)
+CASE_WINDOW = 4
+
+BASE_FLAGS_GCC = [
+    "-O2", "-fpermissive", "-w",
+    "-Wno-implicit-function-declaration", "-Wno-implicit-int", "-Wno-return-type",
+    "-Wno-builtin-declaration-mismatch", "-Wno-int-conversion",
+    "-march=native", "-lm", "-I/usr/include", f"-I{INCLUDES_DIR}",
+]
+BASE_FLAGS_CLANG = [
+    "-fpermissive", "-w",
+    "-Wno-implicit-function-declaration", "-Wno-implicit-int", "-Wno-return-type",
+    "-Wno-builtin-redeclared", "-Wno-int-conversion",
+    "-march=native", "-I/usr/include", f"-I{INCLUDES_DIR}",
+]
+# The -O0 golden reference of check-O0.sh
+GOLDEN_FLAGS = [
+    "-O0", "-std=gnu89", "-fpermissive", "-w",
+    "-Wno-implicit-function-declaration", "-Wno-implicit-int", "-Wno-return-type",
+    "-Wno-builtin-declaration-mismatch", "-Wno-int-conversion",
+    "-march=native", "-lm", "-I/usr/include", f"-I{INCLUDES_DIR}",
+]
+
+
+class Capture:
+    """Streamed process output: sha256 of all of it, the first LOG_HEAD bytes, and the diff-test.sh greps."""
+
+    def __init__(self):
+        self.sha = hashlib.sha256()
+        self.head = bytearray()
+        self.size = 0
+        self.error = False        # "error:" anywhere
+        self.ub = False           # "undefined behavior", any case
+        self.tail = b""
+
+    def feed(self, chunk):
+        self.sha.update(chunk)
+        self.size += len(chunk)
+        if len(self.head) < LOG_HEAD:
+            self.head += chunk[:LOG_HEAD - len(self.head)]
+        window = (self.tail + chunk).lower()
+        self.error = self.error or b"error:" in window
+        self.ub = self.ub or b"undefined behavior" in window
+        self.tail = chunk[-32:]
+
+    def text(self):
+        more = f"\n[... {self.size - len(self.head)} bytes omitted ...]\n" if self.size > len(self.head) else ""
+        return self.head.decode("utf8", errors="replace") + more
+
+    def first_lines(self, n):
+        return "\n".join(self.text().splitlines()[:n])
+
+
+async def run_bounded(cmd, timeout, cwd=None):
+    """(returncode or None on timeout, Capture of stdout+stderr, seconds)."""
+    start = time.monotonic()
+    out = Capture()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT, cwd=cwd, start_new_session=True)
+    except OSError as e:
+        out.feed(f"{cmd[0]}: {e}\n".encode())
+        return 127, out, 0.0
+
+    async def pump():
+        while True:
+            chunk = await proc.stdout.read(65536)
+            if not chunk:
+                break
+            out.feed(chunk)
+        await proc.wait()
+
+    try:
+        await asyncio.wait_for(pump(), timeout)
+        rc = proc.returncode
+    except asyncio.TimeoutError:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+        rc = None
+    return rc, out, time.monotonic() - start
+
+
+def interpret(rc, out):
+    """diff-test.sh's interpret_result (plus its 'error:' => Fail(0) override)."""
+    if rc is None or rc == 124:
+        return "Timeout"
+    if rc < 0 or rc > 128:
+        return f"Crashed-with-signal:{-rc if rc < 0 else rc - 128}"
+    if out.ub:
+        return "UndefinedBehavior"
+    if out.error:
+        return "Fail(0)"
+    return "OK" if rc == 0 else f"Fail({rc})"
+
+
+class Compiler:
+    def __init__(self, name, path, mutated, base=None):
+        self.name = name
+        self.path = path
+        self.mutated = mutated    # gets the input's mutated flags (the clangs), or base flags only (references)
+        self.base = base or (BASE_FLAGS_CLANG if mutated else BASE_FLAGS_GCC)
+        self.build = None if mutated else compiler_build(path)
+        self.config = config_id(self.base, RUN_ARGS, RUN_TIMEOUT)
+
+    def command(self, source, flags, exe):
+        # The clangs get the canonical form of base + mutated flags (flag_canon.py)
+        final = canonical_flags(self.base + flags) if self.mutated else self.base
+        return [self.path, *(f for f in final if f != "-c"), source, "-o", exe]
+
+    def reference_key(self, source):
+        """Reference store key of source, or None when results depend on the input's flags."""
+        if self.build is None:
+            return None
+        return self.build, self.config, os.path.basename(source), source_digest(source)
+
+
+class Engine:
+    def __init__(self, compilers, out_dir, jobs, timeouts, references, cache=None):
+        self.compilers = compilers
+        self.out_dir = out_dir
+        self.work_dir = os.path.join(os.path.abspath(out_dir), ".work")
+        self.slots = asyncio.Semaphore(jobs)
+        self.timeouts = timeouts
+        self.references = references
+        self.cache = cache
+        self.reference_tasks = {}   # key -> task of this run's one compile+run of a reference
+        self.reference_counts = {"computed": 0, "reused": 0}
+        self.in_flight = {}         # (compiler, source, canonical flags) -> task
+        self.shared = 0
+
+    async def reference(self, source, cc):
+        """compile_and_run() of a reference compiler, once per source across inputs and runs."""
+        key = cc.reference_key(source)
+        stored = self.references.get(key)
+        if stored is not None:
+            self.reference_counts["reused"] += 1
+            return dict(stored, reference="reused")
+        task = self.reference_tasks.get(key)
+        if task is None:
+            task = self.reference_tasks[key] = asyncio.create_task(self._compute_reference(key, source, cc))
+            how = "computed"
+        else:
+            how = "reused"
+        self.reference_counts[how] += 1
+        return dict(await task, reference=how)
+
+    async def _compute_reference(self, key, source, cc):
+        res = trim_logs(await self.compile_and_run("ref_" + key[2], source, [], cc))
+        self.references.put(key, res)
+        return res
+
+    async def mutated(self, case, source, flags, cc):
+        """compile_and_run(), shared by the inputs in flight with the same source and canonical flags."""
+        key = (cc.name, source, canonical_key(flags))
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.shared += 1
+            return dict(await task, shared=True)
+        task = self.in_flight[key] = asyncio.create_task(self.compile_and_run(case, source, flags, cc))
+        task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return await task
+
+    async def compile_and_run(self, case, source, flags, cc):
+        """
+        Result dict of one compiler on one input (the compile/run log texts
+        under _logs), from the outcome cache when any earlier run did the same
+        compile and run ("cached": true).
+        """
+        compile_timeout = self.timeouts.timeout(os.path.basename(source))
+        key = None
+        if self.cache:
+            key = self.cache.key(cc.path, source, cc.command(source, flags, "a.out")[1:-3], RUN_ARGS)
+            hit = self.cache.get(key, compile_timeout, RUN_TIMEOUT)
+            if hit is not None and "difftest" in hit.extra:
+                return dict(hit.extra["difftest"], cached=True)
+        res = await self._compile_and_run(case, source, flags, cc, compile_timeout)
+        if key and "Timeout" not in (res["compile"], res["exec"]):
+            exec_ms = None if res["exec_s"] is None else int(res["exec_s"] * 1000)
+            self.cache.put(key, res["compile_rc"], int(res["compile_s"] * 1000), res["exec_rc"], exec_ms,
+                           hashes={"output": res["output_sha256"]} if res["output_sha256"] else None,
+                           extra={"difftest": trim_logs(res)})
+        return res
+
+    async def _compile_and_run(self, case, source, flags, cc, compile_timeout):
+        workdir = os.path.join(self.work_dir, f"{case}-{cc.name}")
+        os.makedirs(workdir, exist_ok=True)
+        exe = os.path.join(workdir, "a.out")
+        cmd = cc.command(source, flags, exe)
+        res = {"compile": None, "compile_rc": None, "compile_s": None,
+               "exec": None, "exec_rc": None, "exec_s": None, "output_sha256": None}
+        try:
+            async with self.slots:
+                rc, out, secs = await run_bounded(cmd, compile_timeout)
+            res.update(compile=interpret(rc, out), compile_rc=rc, compile_s=round(secs, 3))
+            compile_log = (f"[*] Compiling with {cc.name}\nCommand: {' '.join(cmd)}\n" + out.text())
+            res["_logs"] = {"compile": compile_log, "compile_head": out.first_lines(4)}
+            if res["compile"] != "OK" and not res["compile"].startswith("UndefinedBehavior"):
+                return res
+            async with self.slots:
+                rc, out, secs = await run_bounded([exe, *RUN_ARGS], RUN_TIMEOUT, cwd=workdir)
+            res.update({"exec": interpret(rc, out), "exec_rc": rc, "exec_s": round(secs, 3),
+                        "output_sha256": out.sha.hexdigest()})
+            res["_logs"].update(run=out.text(), run_head=out.first_lines(4))
+            return res
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    async def run_case(self, index, path, source, flags):
+        case = "case_" + "".join(c if c.isalnum() or c in "._-" else "_" for c in os.path.basename(path))
+        rec = {"index": index, "input": path, "source": source, "flags": flags,
+               "canonical_flags": canonical_flags(flags), "case": case}
+        if not source or not os.path.isfile(source):
+            rec["skipped"] = True
+            return rec
+        results = await asyncio.gather(*(self.reference(source, cc) if cc.reference_key(source)
+                                         else self.mutated(case, source, flags, cc)
+                                         for cc in self.compilers))
+        rec["compilers"] = {cc.name: r for cc, r in zip(self.compilers, results)}
+        rec.update(verdicts(rec["compilers"]))
+        return rec
+
+
+def is_crash(outcome):
+    return bool(outcome) and outcome.startswith("Crashed-with-signal")
+
+
+def is_timeout(outcome):
+    return outcome == "Timeout"
+
+
+def verdicts(compilers):
+    """crash/hang flags and the pairwise mismatches of diff-test.sh for one input."""
+    outcomes = [(r["compile"], r["exec"]) for r in compilers.values()]
+    crash = any(is_crash(c) or is_crash(e) for c, e in outcomes)
+    hang = any(is_timeout(c) or is_timeout(e) for c, e in outcomes)
+    ran = [name for name, r in compilers.items() if r["exec"] is not None]
+    mismatches = []
+    for i, a in enumerate(ran):
+        for b in ran[i + 1:]:
+            ea, eb = compilers[a]["exec"], compilers[b]["exec"]
+            if (is_crash(ea) or is_crash(eb)) and ea != eb:
+                mismatches.append([a, b, "crash vs non-crash"])
+            elif (is_timeout(ea) or is_timeout(eb)) and ea != eb:
+                mismatches.append([a, b, "timeout vs non-timeout"])
+            elif compilers[a]["output_sha256"] != compilers[b]["output_sha256"]:
+                mismatches.append([a, b, "output"])
+    tags = [t for t, hit in (("crash", crash), ("hang", hang), ("mismatch", bool(mismatches))) if hit]
+    return {"verdicts": tags, "ran": ran, "mismatches": mismatches}
+
+
+def summary_block(rec):
+    """The per-input block diff-test.sh wrote to diff_test_summary.txt."""
+    if rec.get("skipped"):
+        return f"=== Skipping {rec['input']}: no valid Source File found! ===\n"
+    lines = ["", "=" * 99,
+             f"Fuzzed Input: {rec['input']}",
+             f"Decoded Source: {rec['source']}",
+             f"Mutated Flags (no clang fixed): {' '.join(rec['flags'])}",
+             "", "Compilation " + "-" * 87]
+    ccs = rec["compilers"]
+    for name, r in ccs.items():
+        lines.append(f"   {name} => {r['compile']}")
+    for name, r in ccs.items():
+        if r["compile"].startswith(("Fail", "Timeout", "Crashed")):
+            lines += ["-" * 99, f"why {name} could not compile?"]
+            if r["compile"].startswith("Fail"):
+                lines += [f"{r['compile']} => (Reason)", r["_logs"]["compile_head"]]
+            else:
+                lines.append(r["compile"])
+    lines += ["", "Execution " + "-" * 89]
+    for name, r in ccs.items():
+        lines.append(f"   {name} => {r['exec'] or '(No-Execution)'}")
+    for name, r in ccs.items():
+        e = r["exec"]
+        if e is None:
+            lines += ["-" * 99, f"why {name} had no execution? => possibly compilation failed", ""]
+        elif e.startswith(("Fail", "Timeout", "Crashed")):
+            lines += ["-" * 99, f"why {name} could not execute?"]
+            if e.startswith("Fail"):
+                lines += [f"{e} => (Reason)", r["_logs"].get("run_head", "")]
+            else:
+                lines.append(e)
+            lines.append("")
+    for a, b, why in rec["mismatches"]:
+        lines.append(f"[Mismatch] {a} vs {b}" + ("" if why == "output" else f" ({why})"))
+    if rec["mismatches"]:
+        lines.append(f"[Mismatch found for case {rec['case']}]")
+    else:
+        lines.append("**All matched among those successfully compiled**")
+    return "\n".join(lines) + "\n"
+
+
+def export_case(rec, out_dir):
+    """diff-test.sh's Crashes/<case>, Hangs/<case> and MismatchLogs/<case> folders."""
+    folders = {"crash": ("Crashes", "Crash"), "hang": ("Hangs", "Hang"), "mismatch": ("MismatchLogs", "Mismatch")}
+    for verdict in rec["verdicts"]:
+        sub, title = folders[verdict]
+        folder = os.path.join(out_dir, sub, rec["case"])
+        os.makedirs(folder, exist_ok=True)
+        report = [f"=== {title} mini-report for case {rec['case']} ==="]
+        if verdict == "mismatch":
+            report += [f"All compilers in run_compilers: {' '.join(rec['ran'])}",
+                       f"Storing compile + run logs for each to {folder}", ""]
+        else:
+            report.append("All compiler outcomes for this case:")
+        for name, r in rec["compilers"].items():
+            logs = r.get("_logs", {})
+            base = os.path.join(folder, f"{rec['case']}-{name}")
+            for kind in ("compile", "run"):
+                if kind in logs:
+                    with open(f"{base}.{kind}.log", "w") as f:
+                        f.write(logs[kind])
+            report += [f"Compiler: {name}",
+                       f"  Compilation => {r['compile']}",
+                       f"  Execution   => {r['exec'] or ''}", "",
+                       f"---- {name} compile log (first 10 lines) ----",
+                       "\n".join(logs.get("compile", "").splitlines()[:10]), "",
+                       f"---- {name} run log (first 10 lines) ----",
+                       "\n".join(logs.get("run", "").splitlines()[:10]), ""]
+        report.append(f"  Input C File => {rec['source']}")
+        with open(os.path.join(folder, "mini-report.txt"), "a") as f:
+            f.write("\n".join(report) + "\n")
+
+
+class OrderedWriter:
+    """Writes finished inputs to results.jsonl / the summary (and exports) in queue order."""
+
+    def __init__(self, out_dir, export):
+        self.out_dir = out_dir
+        self.export = export
+        self.results = open(os.path.join(out_dir, "results.jsonl"), "w")
+        self.summary = open(os.path.join(out_dir, "diff_test_summary.txt"), "a")
+        self.waiting = {}
+        self.next = 0
+        self.counts = {"inputs": 0, "skipped": 0, "crash": 0, "hang": 0, "mismatch": 0}
+
+    def add(self, rec):
+        self.waiting[rec["index"]] = rec
+        while self.next in self.waiting:
+            self._write(self.waiting.pop(self.next))
+            self.next += 1
+        self.results.flush()
+        self.summary.flush()
+
+    def _write(self, rec):
+        self.counts["inputs"] += 1
+        if rec.get("skipped"):
+            self.counts["skipped"] += 1
+        else:
+            for v in rec["verdicts"]:
+                self.counts[v] += 1
+            if self.export and rec["verdicts"]:
+                export_case(rec, self.out_dir)
+        self.summary.write(summary_block(rec))
+        public = dict(rec)
+        if "compilers" in rec:
+            public["compilers"] = {n: {k: v for k, v in r.items() if k != "_logs"}
+                                   for n, r in rec["compilers"].items()}
+        self.results.write(json.dumps(public) + "\n")
+
+    def close(self):
+        self.results.close()
+        self.summary.close()
+
+
+async def run(inputs, engine, writer, jobs):
+    window = max(1, jobs * CASE_WINDOW // max(1, len(engine.compilers)))
+    pending = set()
+    for index, (path, source, flags) in enumerate(inputs):
+        if len(pending) >= window:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                writer.add(task.result())
+        pending.add(asyncio.create_task(engine.run_case(index, path, source, flags)))
+    for task in asyncio.as_completed(pending):
+        writer.add(await task)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent differential testing of FuzzdFlags queue inputs")
+    parser.add_argument("queue_dir")
+    parser.add_argument("out_dir")
+    parser.add_argument("target_name")
+    parser.add_argument("target_cmp")
+    parser.add_argument("--jobs", type=int, default=0, help="concurrent compiles/runs (0 = one per CPU core)")
+    parser.add_argument("--export", action="store_true",
+                        help="also write the Crashes/ Hangs/ MismatchLogs/ folders of diff-test.sh")
+    parser.add_argument("--gcc", default=GCC_14)
+    parser.add_argument("--clang19", default=CLANG_19)
+    parser.add_argument("--golden", action="store_true",
+                        help="also compare against the -O0 golden build of check-O0.sh (with --gcc)")
+    parser.add_argument("--ref-store", default=None,
+                        help="reference store file (default <CFILES_DIR>.references.jsonl; '' = memory only)")
+    args = parser.parse_args()
+
+    jobs = args.jobs or os.cpu_count() or 1
+    os.makedirs(args.out_dir, exist_ok=True)
+    compilers = [Compiler("gcc-14", args.gcc, False),
+                 Compiler("clang-19", args.clang19, True),
+                 Compiler(args.target_name, args.target_cmp, True)]
+    if args.golden:
+        compilers.insert(1, Compiler("gcc-14-O0", args.gcc, False, GOLDEN_FLAGS))
+    timeouts = TimeoutModel.for_corpus(CFILES_DIR, COMPILE_TIMEOUT)
+    if args.ref_store is None:
+        references = ReferenceStore.for_corpus(CFILES_DIR)
+    else:
+        references = ReferenceStore(args.ref_store or None)
+
+    print(f"[*]CFILES_DIR is [{CFILES_DIR}]")
+    print(f"[*]INCLUDES_DIR is [{INCLUDES_DIR}]")
+    inputs = decode_paths(queue_files(args.queue_dir))
+    print(f"[*]{len(inputs)} inputs x {len(compilers)} compilers, {jobs} jobs")
+    if references.path:
+        print(f"[*]Reference store: {references.path} ({len(references.entries)} stored results)")
+
+    with open(os.path.join(args.out_dir, "diff_test_summary.txt"), "w") as f:
+        f.write("# " + "=" * 97 + "\n"
+                f"#              Differential Testing Report - ({', '.join(c.name for c in compilers)})\n"
+                "# " + "=" * 97 + "\n\n"
+                f"Fuzzed input dir: {args.queue_dir}\nOutput dir: {args.out_dir}\n\n")
+    writer = OrderedWriter(args.out_dir, args.export)
+    cache = OutcomeCache.default()
+    engine = Engine(compilers, args.out_dir, jobs, timeouts, references, cache)
+    start = time.monotonic()
+    try:
+        asyncio.run(run(inputs, engine, writer, jobs))
+    except KeyboardInterrupt:
+        print("\n[!]Interrupted; results.jsonl holds every input finished so far")
+        sys.exit(130)
+    finally:
+        writer.close()
+        references.close()
+        shutil.rmtree(engine.work_dir, ignore_errors=True)
+
+    c = writer.counts
+    print(f"[*]{c['inputs']} inputs in {time.monotonic() - start:.1f}s: {c['crash']} crash, "
+          f"{c['hang']} hang, {c['mismatch']} mismatch, {c['skipped']} skipped")
+    r = engine.reference_counts
+    print(f"[*]Reference results: {r['computed']} computed, {r['reused']} reused")
+    print(f"[*]Compiles shared by inputs with equivalent flags: {engine.shared}")
+    if cache:
+        print(f"[*]Outcome cache: {cache.summary()}")
+    print(f"[*]Results: {os.path.join(args.out_dir, 'results.jsonl')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,31 +4,77 @@ import sys
 import subprocess
 import itertools
 import os
+import time
+from collections import namedtuple
+
+from crash_signature import run_bounded, signature
+from ddmin import CrashIndex, DeltaDebugger, ScratchDirs, ordered_map
+from flag_canon import canonical_flags
+from outcome_cache import OutcomeCache
+from timeout_model import TimeoutModel
+
+# One compiled (and, if it compiled, run) flag subset
+Outcome = namedtuple("Outcome", "flags cmd compile_rc stderr sig run_rc")
 
 def main():
     """
     Usage:
-      f_deltadebug.py <clang_path> <test_c_file> <combination_sizes> <flags...>
+      f_deltadebug.py [--same-crash] [--jobs N] <clang_path> <test_c_file> <combination_sizes|ddmin> <flags...>
 
     Example:
       ./f_deltadebug.py /opt/llvm-19/bin/clang /path/to/test.c "1,2" -O1 -O2 -fno-strict-return ...
     
     <clang_path>        : Full path to the clang binary
     <test_c_file>       : Path to the test C source file
-    <combination_sizes> : Comma-separated list of combination sizes (e.g. "1,2,3")
+    <combination_sizes> : Comma-separated list of combination sizes (e.g. "1,2,3"),
+                          or "ddmin" to minimise the full flag set instead (ddmin.py)
     <flags...>          : All possible flags, each as a separate argument
+    --same-crash        : Only log combinations that reproduce the crash of the full
+                          flag set: the same compiler stack signature (crash_signature.py)
+                          for a compile crash, the same return code for a runtime crash
+    --jobs N            : Compile and run up to N combinations at once (default 1). Every
+                          worker builds in its own scratch directory; the output and the
+                          logs stay in combination order.
     
     This script:
-      1) Removes duplicate flags.
+      1) Reduces the flags to their canonical form: removes duplicates and the
+         flags a later one overrides (flag_canon.py).
       2) For each combination size specified, tries all subsets of that size.
       3) Compiles and runs the test file with those flags plus some constant flags.
       4) If a crash occurs (typically return code higher than 128), it logs the result
          (return code and flags) to a file named "<base_of_test_file>_<combo_size>.log".
+         Larger combinations containing a logged crash are skipped without compiling
+         (the skip count is printed per size).
+
+    With "ddmin" in place of the sizes, steps 2-4 become one delta debugging run
+    from the full flag set: every crashing subset it tries is logged to
+    "<base_of_test_file>_ddmin.log", followed by the 1-minimal crashing subset.
+    That takes O(k log n) compiles for a crash needing k of n flags, where the
+    exhaustive search compiles every subset of each size.
+
+    Subsets this or any other driver compiled before with the same clang build
+    and source are answered from the shared outcome cache (outcome_cache.py,
+    OUTCOME_CACHE=off to disable) without compiling.
     """
 
-    if len(sys.argv) < 5:
-        print(f"Usage: {sys.argv[0]} <clang_path> <test_c_file> <combination_sizes> <flags...>")
+    # Options come before the positional arguments (the flags themselves start with '-')
+    args = sys.argv[1:]
+    same_crash = False
+    jobs = 1
+    while args and args[0].startswith("--"):
+        opt = args.pop(0)
+        if opt == "--same-crash":
+            same_crash = True
+        elif opt == "--jobs" and args and args[0].isdigit():
+            jobs = max(1, int(args.pop(0)))
+        else:
+            print(f"Error: unknown option '{opt}'")
+            sys.exit(1)
+
+    if len(args) < 4:
+        print(f"Usage: {sys.argv[0]} [--same-crash] [--jobs N] <clang_path> <test_c_file> <combination_sizes|ddmin> <flags...>")
         print("  e.g. './f_deltadebug.py /opt/llvm-19/bin/clang mytest.c \"1,2\" -O1 -O2 -fno-strict-return'")
+        print("       './f_deltadebug.py /opt/llvm-19/bin/clang mytest.c ddmin -O1 -O2 -fno-strict-return'")
         sys.exit(1)
     
     # 1) Check that INCLUDES_DIR env is defined
@@ -38,31 +84,27 @@ def main():
         print('   export INCLUDES_DIR="/users/user42/llvmSS-include"')
         sys.exit(1)
     
-    clang_path = sys.argv[1]
-    test_c_path = sys.argv[2]
-    combination_sizes_str = sys.argv[3]  # e.g. "1,2,3"
+    clang_path = args[0]
+    test_c_path = args[1]
+    combination_sizes_str = args[2]  # e.g. "1,2,3"
     
-    # Parse combination sizes (e.g. "1,2,3" -> [1,2,3])
-    try:
-        combination_sizes = [int(x.strip()) for x in combination_sizes_str.split(",")]
-    except ValueError:
-        print(f"Error: combination_sizes ('{combination_sizes_str}') must be integer(s).")
-        sys.exit(1)
+    # Parse combination sizes (e.g. "1,2,3" -> [1,2,3]); "ddmin" selects minimisation
+    use_ddmin = combination_sizes_str.strip() == "ddmin"
+    combination_sizes = []
+    if not use_ddmin:
+        try:
+            combination_sizes = [int(x.strip()) for x in combination_sizes_str.split(",")]
+        except ValueError:
+            print(f"Error: combination_sizes ('{combination_sizes_str}') must be integer(s) or 'ddmin'.")
+            sys.exit(1)
 
     # The remaining arguments are possible flags
-    raw_flags = sys.argv[4:]
+    raw_flags = args[3:]
     
-    # Remove duplicates using a set, then sort for consistency
-    unique_flags_dict = {}
-    for flag in raw_flags:
-        # If we've seen this flag before, remove it so when we re-add below
-        # it appears at the end in insertion order (Python 3.7+).
-        if flag in unique_flags_dict:
-            del unique_flags_dict[flag]
-        unique_flags_dict[flag] = True
-
-    # Now the dictionary keys are in the order of their *final* appearance.
-    unique_flags = list(unique_flags_dict.keys())
+    # Canonical form (flag_canon.py): duplicates and flags a later one overrides
+    # (-O2 ... -O3, -fwrapv ... -fno-wrapv) are dropped, so no two combinations
+    # tested below compile the same thing
+    unique_flags = canonical_flags(raw_flags)
     
 
     # Constant flags always included in every compilation
@@ -84,15 +126,32 @@ def main():
         print(" ", f)
     print()
 
-    print("[*]Unique flags given (duplicates removed)")
+    print("[*]Unique flags given (canonical form: duplicates and overridden flags removed)")
     for f in unique_flags:
         print(" ", f)
     print()
 
-    print(f"[*]Combination sizes specified: {combination_sizes}")
+    if use_ddmin:
+        print("[*]Mode: ddmin (minimise the full flag set)")
+    else:
+        print(f"[*]Combination sizes specified: {combination_sizes}")
     print()
 
-    temp_executable = "./temp_executable"
+    # Executables go to a private scratch directory per worker, never to the current directory
+    scratch = ScratchDirs(prefix=f"f_deltadebug-{os.getpid()}-")
+    # Parallel runs would interleave the test programs' output, so it is dropped there
+    run_stdout = None if jobs == 1 else subprocess.DEVNULL
+
+    # Per-source compile timeout when a timeout model exists next to the corpus (none otherwise)
+    timeouts = TimeoutModel.for_corpus(os.path.dirname(os.path.abspath(test_c_path)), ceiling=500)
+    compile_timeout = None
+    if timeouts.rows:
+        compile_timeout = timeouts.timeout(os.path.basename(test_c_path))
+        print(f"[*]Compile timeout from {timeouts.path}: {compile_timeout:.1f}s")
+        print()
+    if jobs > 1:
+        print(f"[*]Testing {jobs} combinations at a time")
+        print()
 
     # Derive the base name of the test C file (e.g. "test" from "test.c")
     test_c_basename = os.path.splitext(os.path.basename(test_c_path))[0]
@@ -103,62 +162,147 @@ def main():
     def is_crash(return_code: int) -> bool:
         return (return_code < 0) or (return_code >= 128)
 
-    # Iterate over each combination size
-    for size in combination_sizes:
-        if size <= 0:
-            print(f"[!][Warning] Invalid combination size: {size}, skipping.")
-            continue
-
-        print(f"[*]Now checking {size}-flag combinations")
-        
-        # Prepare a log file for segfault occurrences
-        log_filename = f"{test_c_basename}_{size}.log"
-        # Open in write mode (overwrites each time you run)
-        with open(log_filename, "w") as log_file:
-            # Use combinations() from itertools
-            combos = itertools.combinations(unique_flags, size)
-
-            # We'll go through each combination of this size
-            for combo in combos:
-                total_combo_count += 1
-                combo_flags = list(combo)
-
-                # Build the clang command
-                cmd = [
-                    clang_path,
-                    *constant_flags_list,
-                    *combo_flags,
-                    test_c_path,
-                    "-o", temp_executable
-                ]
-
-                print(f"[#{total_combo_count}] Compiling (size={size}) -> {' '.join(cmd)}")
-                compile_proc = subprocess.run(cmd, capture_output=True)
-
-                if compile_proc.returncode != 0:
-                    print(f"  -> Compilation error (return code={compile_proc.returncode}).")
-                    print(f"  -> stderr:\n{compile_proc.stderr.decode('utf-8')}")
-                    print()
-                    if is_crash(compile_proc.returncode):
-                        print(f"  -> COMPILE CRASH (returncode={compile_proc.returncode})")
-                        log_file.write(f"COMPILE CRASH (rc={compile_proc.returncode}) with flags: {combo_flags}\n")
-                    continue
-
-                # If compilation succeeded, run the binary
-                run_proc = subprocess.run([temp_executable, "10000000"])
-                if is_crash(run_proc.returncode):
-                    print(f"  -> RUNTIME CRASH! (execution returncode={run_proc.returncode})")
-                    log_file.write(f"RUNTIME CRASH (rc={run_proc.returncode}) with flags: {combo_flags}\n")
+    cache = OutcomeCache.default()
+
+    def evaluate(flags):
+        """Compiles and runs one flag subset in this worker's scratch directory."""
+        workdir = scratch.get()
+        temp_executable = os.path.join(workdir, "temp_executable")
+        cmd = [clang_path, *constant_flags_list, *flags, test_c_path, "-o", temp_executable]
+        key = cache.key(clang_path, test_c_path, cmd[1:-3], ["10000000"]) if cache else None
+        hit = cache.get(key, compile_timeout) if cache else None
+        # A failed compile is only reusable with its stderr (the crash signature comes from it)
+        if hit is not None and (hit.compile_rc == 0 or "stderr" in hit.extra):
+            compile_rc, compile_stderr, run_rc = hit.compile_rc, hit.extra.get("stderr", ""), hit.exec_rc
+        else:
+            start = time.monotonic()
+            compile_rc, compile_stderr = run_bounded(cmd, timeout=compile_timeout)
+            compile_ms = int((time.monotonic() - start) * 1000)
+            run_rc = run_ms = None
+            if compile_rc == 0:
+                start = time.monotonic()
+                run_rc = subprocess.run([temp_executable, "10000000"], cwd=workdir, stdout=run_stdout).returncode
+                run_ms = int((time.monotonic() - start) * 1000)
+            if cache and compile_rc is not None:
+                cache.put(key, compile_rc, compile_ms, run_rc, run_ms,
+                          extra={"stderr": compile_stderr} if compile_rc != 0 else None)
+        sig = signature(compile_stderr, compile_rc) if compile_rc is not None and is_crash(compile_rc) else None
+        return Outcome(list(flags), cmd, compile_rc, compile_stderr, sig, run_rc)
+
+    def crash_key(outcome):
+        """('compile', signature) / ('runtime', rc) for a crash, None otherwise."""
+        if outcome.sig is not None:
+            return ("compile", outcome.sig.hash)
+        if outcome.run_rc is not None and is_crash(outcome.run_rc):
+            return ("runtime", outcome.run_rc)
+        return None
+
+    # With --same-crash, the full flag set's crash is the reference every combination must match
+    reference = None
+    if same_crash:
+        reference = crash_key(evaluate(unique_flags))
+        if reference:
+            print(f"[*]Reference crash of the full flag set: {reference[0]} {reference[1]}")
+        else:
+            print("[!][Warning] The full flag set does not crash; --same-crash ignored.")
+        print()
+
+    def is_hit(outcome) -> bool:
+        key = crash_key(outcome)
+        return key is not None and (reference is None or reference == key)
+
+    def report(outcome, label, log_file):
+        """Prints one tested subset and logs it if it is a (matching) crash."""
+        nonlocal total_combo_count
+        total_combo_count += 1
+        combo_flags, compile_rc = outcome.flags, outcome.compile_rc
+
+        print(f"[#{total_combo_count}] Compiling ({label}) -> {' '.join(outcome.cmd)}")
+        if compile_rc is None:
+            print(f"  -> Compilation timed out after {compile_timeout:.1f}s.")
+            print()
+            return
+
+        if compile_rc != 0:
+            print(f"  -> Compilation error (return code={compile_rc}).")
+            print(f"  -> stderr:\n{outcome.stderr}")
+            print()
+            if outcome.sig is not None:
+                sig = outcome.sig
+                if is_hit(outcome):
+                    print(f"  -> COMPILE CRASH (returncode={compile_rc}, signature={sig.hash})")
+                    log_file.write(f"COMPILE CRASH (rc={compile_rc}, sig={sig.hash}) with flags: {combo_flags}\n")
                 else:
-                    print(f"  -> Execution finished (returncode={run_proc.returncode}).")
+                    print(f"  -> Different compile crash (signature={sig.hash}), not logged")
+            return
+
+        run_rc = outcome.run_rc
+        if is_hit(outcome):
+            print(f"  -> RUNTIME CRASH! (execution returncode={run_rc})")
+            log_file.write(f"RUNTIME CRASH (rc={run_rc}) with flags: {combo_flags}\n")
+        elif is_crash(run_rc):
+            print(f"  -> Different runtime crash (returncode={run_rc}), not logged")
+        else:
+            print(f"  -> Execution finished (returncode={run_rc}).")
+
+        print()
+
+    try:
+        if use_ddmin:
+            log_filename = f"{test_c_basename}_ddmin.log"
+            with open(log_filename, "w") as log_file:
+                dd = DeltaDebugger(evaluate, jobs, verdict=is_hit,
+                                   on_result=lambda subset, outcome: report(
+                                       outcome, f"ddmin, size={len(subset)}", log_file))
+                try:
+                    if not dd.fails(unique_flags):
+                        print("[!]The full flag set does not crash; nothing to minimise.")
+                    else:
+                        minimal = dd.ddmin(unique_flags)
+                        print(f"[*]1-minimal crashing flags ({len(minimal)} of {len(unique_flags)}, "
+                              f"{dd.tests} compiles): {' '.join(minimal)}")
+                        log_file.write(f"MINIMAL ({len(minimal)} flags, {dd.tests} compiles) with flags: {minimal}\n")
+                finally:
+                    dd.close()
+            print(f"[*]Finished ddmin. Crashes (if any) are listed in '{log_filename}'.\n")
+
+        # Crashing combinations found so far; their supersets are not worth a compile
+        known = CrashIndex(unique_flags)
+
+        # Iterate over each combination size
+        for size in combination_sizes:
+            if size <= 0:
+                print(f"[!][Warning] Invalid combination size: {size}, skipping.")
+                continue
+
+            print(f"[*]Now checking {size}-flag combinations")
 
-                print()
+            # Prepare a log file for segfault occurrences
+            log_filename = f"{test_c_basename}_{size}.log"
+            # Open in write mode (overwrites each time you run)
+            with open(log_filename, "w") as log_file:
+                # Use combinations() from itertools, minus those containing a crash already found
+                skipped_before = known.skipped
+                combos = known.prune(itertools.combinations(unique_flags, size))
 
-        print(f"[*]Finished checking {size}-flag combinations. Crashes (if any) are listed in '{log_filename}'.\n")
+                # We'll go through each combination of this size (results come back in order)
+                crashing = []
+                for _, outcome in ordered_map(evaluate, combos, jobs):
+                    report(outcome, f"size={size}", log_file)
+                    if is_hit(outcome):
+                        crashing.append(outcome.flags)
+                for combo_flags in crashing:
+                    known.add(combo_flags)
 
-    # Cleanup: remove the temporary executable if it exists
-    if os.path.exists(temp_executable):
-        os.remove(temp_executable)
+            skipped = known.skipped - skipped_before
+            if skipped:
+                print(f"[*]Skipped {skipped} {size}-flag combinations containing a smaller crashing combination.")
+            print(f"[*]Finished checking {size}-flag combinations. Crashes (if any) are listed in '{log_filename}'.\n")
+        if cache:
+            print(f"[*]Outcome cache: {cache.summary()}")
+    finally:
+        # Cleanup: remove the scratch directories and their executables
+        scratch.close()
 
     print("All done.")
 
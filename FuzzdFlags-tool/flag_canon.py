@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+flag_canon.py - canonical form of a clang flag list.
+
+Usage:
+  flag_canon.py <flags...>      # prints the canonical form of the flags
+  flag_canon.py --table         # group and order class of every FLAG_LIST entry
+
+Decoded queue inputs and NRS subsets repeat flags and override them: several
+-O levels, two -ftls-model= values, -fwrapv ... -fno-wrapv, -march=x86-64
+then -march=x86-64-v3. clang keeps the last of each, so those lists compile
+to the same thing as a shorter one. canonical_flags() reduces a list to that
+shorter one, in a fixed order, so that equivalent lists get the same key:
+
+  1. aliases are spelled one way (-fno-signed-char is -funsigned-char,
+     -fno-lax-vector-conversions is -flax-vector-conversions=none, ...)
+  2. of every group of flags that set the same option, only the last one is
+     kept: -O*, -march=, each -fxxx= option, -fX / -fno-X, -mX / -mno-X, the
+     -fstack-protector family, char and bit-field signedness
+  3. the floating-point bundles (-ffast-math, -fno-fast-math,
+     -f[no-]unsafe-math-optimizations, -ffp-model=*) set several options at
+     once, so they are only dropped when the same bundle comes again later
+  4. flags clang reads with getLastArg() do not depend on their position and
+     are sorted (by FLAG_LIST index). The floating-point flags and -O levels
+     are applied one after another in argument order (-Ofast included), so
+     they keep their relative order, after all the others
+  5. flags it does not know (-w, -I..., -lm, -Wno-...) and every flag that
+     takes the next argument as its value (-Xclang, -mllvm, -x, ...), with
+     that argument, are kept as they are, first, in their order
+
+Every FLAG_LIST entry belongs to a group (flag_canon.py --table lists them).
+"""
+import sys
+
+from flag_table import FLAG_BIT, FLAG_LIST, flags_to_mask, mask_to_flags
+
+ALIASES = {
+    "-fno-signed-char": "-funsigned-char",
+    "-fno-unsigned-char": "-fsigned-char",
+    "-flax-vector-conversions": "-flax-vector-conversions=integer",
+    "-fno-lax-vector-conversions": "-flax-vector-conversions=none",
+}
+# Flags that are all one option, last one wins (after ALIASES)
+NAMED_GROUPS = {
+    "-fsigned-char": "char-signedness", "-funsigned-char": "char-signedness",
+    "-fsigned-bitfields": "bitfield-signedness", "-funsigned-bitfields": "bitfield-signedness",
+    "-fstack-protector": "stack-protector", "-fstack-protector-strong": "stack-protector",
+    "-fstack-protector-all": "stack-protector", "-fno-stack-protector": "stack-protector",
+}
+# Multi-option bundles: only an identical later bundle replaces one
+BUNDLES = ("-ffast-math", "-fno-fast-math", "-funsafe-math-optimizations",
+           "-fno-unsafe-math-optimizations", "-ffp-model=")
+# -fX / -fno-X options clang applies in argument order (RenderFloatingPointOptions)
+ORDERED_TOGGLES = {
+    "fast-math", "unsafe-math-optimizations", "finite-math-only", "honor-nans", "honor-infinities",
+    "math-errno", "associative-math", "reciprocal-math", "approx-func", "signed-zeros",
+    "trapping-math", "rounding-math", "signaling-math", "protect-parens",
+}
+ORDERED_VALUES = ("-ffp-", "-fdenormal-fp-math=", "-fexcess-precision=")
+# Flags whose value is the next argument; that argument is never a flag of its own
+SEPARATE_ARG = {"-Xclang", "-mllvm", "-Xlinker", "-Xassembler", "-Xpreprocessor", "-x", "-include",
+                "-I", "-isystem", "-L", "-l", "-D", "-U", "-o", "-MF", "-MT", "-target"}
+
+
+def flag_group(flag):
+    """
+    (group, ordered) of one flag (after ALIASES): flags of one group override
+    each other; ordered flags keep their position relative to each other.
+    group is None for a flag left as it is.
+    """
+    if flag in SEPARATE_ARG:
+        return None, False
+    if flag.startswith(BUNDLES):
+        return "bundle:" + flag, True
+    if flag in NAMED_GROUPS:
+        return NAMED_GROUPS[flag], False
+    if flag.startswith("-O"):
+        return "-O", True
+    if flag.startswith("-f") and "=" in flag:
+        name = flag.split("=", 1)[0]
+        return name, flag.startswith(ORDERED_VALUES)
+    if flag.startswith("-march=") or flag.startswith("-std="):
+        return flag.split("=", 1)[0], False
+    if flag.startswith("-f") and len(flag) > 2:
+        name = flag[5:] if flag.startswith("-fno-") else flag[2:]
+        return "-f" + name, name in ORDERED_TOGGLES
+    if flag.startswith("-m") and "=" not in flag and len(flag) > 2:
+        name = flag[5:] if flag.startswith("-mno-") else flag[2:]
+        return "-m" + name, False
+    return None, False
+
+
+def canonical_flags(flags):
+    """The canonical form of an argv flag list (a new list)."""
+    flags = [ALIASES.get(f, f) for f in flags]
+    kept, last, grouped = [], {}, []
+    takes_arg = False
+    for f in flags:
+        # A SEPARATE_ARG flag and its argument stay together, in place among the kept flags
+        group = None if takes_arg or f in SEPARATE_ARG else flag_group(f)[0]
+        takes_arg = not takes_arg and f in SEPARATE_ARG
+        if group is None:
+            kept.append(f)
+        else:
+            last[group] = len(grouped)
+            grouped.append((group, f))
+    survivors = [f for i, (group, f) in enumerate(grouped) if last[group] == i]
+    free = sorted((f for f in survivors if not flag_group(f)[1]),
+                  key=lambda f: (FLAG_BIT.get(f, len(FLAG_LIST)), f))
+    ordered = [f for f in survivors if flag_group(f)[1]]
+    return kept + free + ordered
+
+
+def canonical_key(flags):
+    """The canonical form as one string (a dict / cache key)."""
+    return " ".join(canonical_flags(flags))
+
+
+def canonical_mask(mask):
+    """Canonical form of a FLAG_LIST mask, flags applied in FLAG_LIST order as the NRS drivers do."""
+    return flags_to_mask(canonical_flags(mask_to_flags(mask)))
+
+
+def main():
+    args = sys.argv[1:]
+    if args == ["--table"]:
+        for f in FLAG_LIST:
+            group, ordered = flag_group(ALIASES.get(f, f))
+            print(f"{f}\t{group}\t{'ordered' if ordered else 'sorted'}")
+        return
+    if not args:
+        print("Usage: flag_canon.py <flags...> | --table")
+        sys.exit(1)
+    print(canonical_key(args))
+
+
+if __name__ == "__main__":
+    main()
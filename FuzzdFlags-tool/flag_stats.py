@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+flag_stats.py - flag co-occurrence and crash association over queue/crash/hang entries.
+
+Usage:
+  flag_stats.py <dir>... [--target crash|hang] [--min-count 5] [--top 30] [--order 3] [--csv pairs.csv]
+
+Each <dir> is an AFL++ output (any directory with instances below it holding
+queue/ crashes/ hangs/, decoded and cached with queue_decode.py) or an NRS
+output directory (results.bin: success -> queue, crash, hang; invalid is
+skipped). Entries of all directories are pooled.
+
+For every flag pair (a, b) and entry set S (queue, crash, hang) it counts the
+entries of S holding both flags. With the queue as baseline and T the target
+set (crash by default):
+
+  lift         P(a,b | T) / P(a,b | queue)
+  odds         odds ratio of (a,b) in T vs. the queue, 0.5 added to every cell
+  interaction  lift(a,b) / (lift(a) * lift(b)): > 1 when the pair does more
+               than its two flags do on their own
+
+--order 3 extends the --top pairs by every third flag and reports the
+triples whose lift beats their best pair.
+
+Entries are never looped over in Python for the counting. A flag's column
+is one int with a bit per entry, built from the packed masks by byte
+slicing and bytes.translate, and every count is a popcount of an AND of two
+or three columns with a set's column. A million entries is 122 ints of
+125 KB each, so millions of entries from many campaigns count in seconds.
+NumPy is not a dependency of these tools; Python's big ints are the vector
+unit here, as in afl_shm.VirginMap.
+"""
+import argparse
+import csv
+import os
+import sys
+
+from campaign_stats import is_nrs_output
+from flag_table import FLAG_COUNT, FLAG_LIST, MASK_BYTES, flags_to_mask, mask_to_bytes
+from queue_decode import DecodeCache
+from result_log import OUTCOME_CODE, read_header, record_struct
+
+SETS = ("queue", "crash", "hang")
+AFL_SUBDIRS = {"queue": "queue", "crash": "crashes", "hang": "hangs"}
+# NRS outcome -> entry set (invalid sets never compiled and are left out)
+NRS_SETS = {"success": "queue", "crash": "crash", "hang": "hang"}
+
+# BIT_TABLES[k][b] = bit k of byte b, as a 0/1 byte
+BIT_TABLES = [bytes((b >> k) & 1 for b in range(256)) for k in range(8)]
+
+
+def pack_bits(bits01: bytes) -> int:
+    """N bytes of 0/1 -> int whose bit e is bits01[e] (eight strided slices, no per-entry loop)."""
+    packed = 0
+    for k in range(8):
+        packed |= int.from_bytes(bits01[k::8], "little") << k
+    return packed
+
+
+class FlagColumns:
+    """
+    Per-flag bit columns over a pooled set of entries. Sources are added as
+    packed tables: `stride` bytes per entry, the flag_table mask (MASK_BYTES,
+    little-endian) at `mask_at`, a one-byte label at `label_at`.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.flag = [0] * FLAG_COUNT
+        self.sets = {s: 0 for s in SETS}
+
+    def add_table(self, data, stride, mask_at, label_at, label_sets):
+        """label_sets: {label byte value: set name}; entries with other labels are dropped."""
+        n = len(data) // stride
+        if not n:
+            return
+        shift = self.n
+        labels = data[label_at::stride][:n]
+        keep = bytearray(256)
+        for set_name in SETS:
+            table = bytearray(256)
+            for code, name in label_sets.items():
+                if name == set_name:
+                    table[code] = keep[code] = 1
+            self.sets[set_name] |= pack_bits(labels.translate(table)) << shift
+        kept = pack_bits(labels.translate(keep))
+        for j in range(MASK_BYTES):
+            column = data[mask_at + j::stride][:n]
+            for k in range(8):
+                i = 8 * j + k
+                if i < FLAG_COUNT:
+                    self.flag[i] |= (pack_bits(column.translate(BIT_TABLES[k])) & kept) << shift
+        self.n += n
+
+    def add_entries(self, entries):
+        """entries: iterable of (set name, [flags]) for sources decoded in Python (AFL dirs)."""
+        codes = {name: i for i, name in enumerate(SETS)}
+        rows = bytearray()
+        for set_name, flags in entries:
+            rows += mask_to_bytes(flags_to_mask(flags, ignore_unknown=True))
+            rows.append(codes[set_name])
+        self.add_table(bytes(rows), MASK_BYTES + 1, 0, MASK_BYTES, dict(enumerate(SETS)))
+
+    def set_sizes(self):
+        return {s: col.bit_count() for s, col in self.sets.items()}
+
+    def singles(self, set_name):
+        col = self.sets[set_name]
+        return [(f & col).bit_count() for f in self.flag]
+
+    def pairs(self, set_name):
+        """Upper-triangular pair counts: pairs[a][b] for a < b."""
+        col = self.sets[set_name]
+        masked = [f & col for f in self.flag]
+        return [[0] * (a + 1) + [(masked[a] & masked[b]).bit_count() for b in range(a + 1, FLAG_COUNT)]
+                for a in range(FLAG_COUNT)]
+
+    def count(self, set_name, *flags):
+        """Entries of a set holding all of `flags` (flag indices)."""
+        col = self.sets[set_name]
+        for i in flags:
+            col &= self.flag[i]
+        return col.bit_count()
+
+
+def add_afl_dir(columns, out_dir):
+    """Decodes (through the per-directory DecodeCache) queue/crashes/hangs of one AFL instance."""
+    for set_name, sub in AFL_SUBDIRS.items():
+        path = os.path.join(out_dir, sub)
+        if os.path.isdir(path):
+            cache = DecodeCache(os.path.join(out_dir, f"{sub}_decode.tsv"))
+            cache.update(path)
+            columns.add_entries((set_name, flags) for _, flags in cache.entries.values())
+
+
+def add_nrs_dir(columns, out_dir):
+    log = os.path.join(out_dir, "results.bin")
+    header, offset = read_header(log)
+    if header["flag_list"] != FLAG_LIST:
+        print(f"[!]{log}: written with another flag table, skipped")
+        return
+    rs = record_struct(header["mask_bytes"])
+    with open(log, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    # record: src_idx u16 | mask | outcome u8 | ...
+    columns.add_table(data, rs.size, 2, 2 + header["mask_bytes"],
+                      {OUTCOME_CODE[o]: s for o, s in NRS_SETS.items()})
+
+
+def find_afl_outputs(path, depth=3):
+    """AFL instance directories (holding queue/) at or below path."""
+    if os.path.isdir(os.path.join(path, "queue")):
+        return [path]
+    if depth == 0:
+        return []
+    with os.scandir(path) as it:
+        subdirs = sorted(e.path for e in it if e.is_dir() and not e.name.startswith("."))
+    return [d for sub in subdirs for d in find_afl_outputs(sub, depth - 1)]
+
+
+def load(paths):
+    columns = FlagColumns()
+    for path in paths:
+        if is_nrs_output(path):
+            add_nrs_dir(columns, path)
+            continue
+        instances = find_afl_outputs(path)
+        if not instances:
+            print(f"[!]{path}: no AFL instance or NRS results.bin found")
+        for d in instances:
+            add_afl_dir(columns, d)
+    return columns
+
+
+def ratio(a, n_a, b, n_b):
+    """Rate of a/n_a over rate of b/n_b, with 0.5 added to the counts (never 0 or inf)."""
+    return ((a + 0.5) / (n_a + 1)) / ((b + 0.5) / (n_b + 1))
+
+
+def odds_ratio(a, n_a, b, n_b):
+    return ((a + 0.5) / (n_a - a + 0.5)) / ((b + 0.5) / (n_b - b + 0.5))
+
+
+def pair_table(columns, target="crash", min_count=5):
+    """Rows (a, b, counts per set, lift, odds, interaction) for pairs seen >= min_count times in target."""
+    sizes = columns.set_sizes()
+    n_t, n_q = sizes[target], sizes["queue"]
+    pairs = {s: columns.pairs(s) for s in SETS}
+    single_t, single_q = columns.singles(target), columns.singles("queue")
+    single_lift = [ratio(single_t[i], n_t, single_q[i], n_q) for i in range(FLAG_COUNT)]
+    rows = []
+    for a in range(FLAG_COUNT):
+        for b in range(a + 1, FLAG_COUNT):
+            t, q = pairs[target][a][b], pairs["queue"][a][b]
+            if t < min_count:
+                continue
+            lift = ratio(t, n_t, q, n_q)
+            rows.append({
+                "flag_a": FLAG_LIST[a], "flag_b": FLAG_LIST[b], "a": a, "b": b,
+                **{s: pairs[s][a][b] for s in SETS},
+                "lift": lift, "odds": odds_ratio(t, n_t, q, n_q),
+                "interaction": lift / (single_lift[a] * single_lift[b]),
+            })
+    rows.sort(key=lambda r: r["odds"], reverse=True)
+    return rows
+
+
+def triple_table(columns, top_pairs, target="crash", min_count=5):
+    """Triples (a, b, c) extending top_pairs whose lift beats the best of their three pairs."""
+    sizes = columns.set_sizes()
+    n_t, n_q = sizes[target], sizes["queue"]
+    pair_lift = {}
+
+    def lift_of(*key):
+        if key not in pair_lift:
+            t = columns.count(target, *key)
+            q = columns.count("queue", *key)
+            pair_lift[key] = ratio(t, n_t, q, n_q)
+        return pair_lift[key]
+
+    seen, rows = set(), []
+    for p in top_pairs:
+        a, b = p["a"], p["b"]
+        for c in range(FLAG_COUNT):
+            key = tuple(sorted((a, b, c)))
+            if c in (a, b) or key in seen:
+                continue
+            seen.add(key)
+            t = columns.count(target, *key)
+            if t < min_count:
+                continue
+            q = columns.count("queue", *key)
+            lift = ratio(t, n_t, q, n_q)
+            best_pair = max(lift_of(key[0], key[1]), lift_of(key[0], key[2]), lift_of(key[1], key[2]))
+            if lift > best_pair:
+                rows.append({"flags": [FLAG_LIST[i] for i in key], target: t, "queue": q,
+                             "lift": lift, "gain": lift / best_pair})
+    rows.sort(key=lambda r: r["gain"], reverse=True)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flag co-occurrence and crash association")
+    parser.add_argument("dirs", nargs="+", help="AFL output / campaign dirs or NRS output dirs")
+    parser.add_argument("--target", choices=("crash", "hang"), default="crash")
+    parser.add_argument("--min-count", type=int, default=5, help="minimum target entries holding the pair")
+    parser.add_argument("--top", type=int, default=30, help="pairs (and triples) to print")
+    parser.add_argument("--order", type=int, choices=(2, 3), default=2)
+    parser.add_argument("--csv", help="write every pair row to this CSV")
+    args = parser.parse_args()
+
+    columns = load(args.dirs)
+    sizes = columns.set_sizes()
+    print(f"[*]Entries: {sum(sizes.values())} ({', '.join(f'{s} {n}' for s, n in sizes.items())})")
+    if not sizes[args.target] or not sizes["queue"]:
+        print(f"[!]Need both queue and {args.target} entries")
+        sys.exit(1)
+
+    rows = pair_table(columns, args.target, args.min_count)
+    if args.csv:
+        fields = ["flag_a", "flag_b", *SETS, "lift", "odds", "interaction"]
+        with open(args.csv, "w", newline="") as f:
+            w = csv.DictWriter(f, fields, extrasaction="ignore")
+            w.writeheader()
+            w.writerows(rows)
+        print(f"[*]Wrote {len(rows)} pairs to {args.csv}")
+
+    print(f"\n=== Flag pairs by {args.target} odds ratio (>= {args.min_count} {args.target} entries) ===")
+    print(f"{'flag_a':34} {'flag_b':34} {args.target:>7} {'queue':>7} {'lift':>7} {'odds':>7} {'inter':>6}")
+    for r in rows[:args.top]:
+        print(f"{r['flag_a']:34} {r['flag_b']:34} {r[args.target]:7} {r['queue']:7} "
+              f"{r['lift']:7.2f} {r['odds']:7.2f} {r['interaction']:6.2f}")
+
+    if args.order == 3:
+        triples = triple_table(columns, rows[:args.top], args.target, args.min_count)
+        print(f"\n=== Flag triples beating their best pair ({args.target}) ===")
+        for r in triples[:args.top]:
+            print(f"{' '.join(r['flags']):80} {r[args.target]:7} {r['queue']:7} "
+                  f"lift {r['lift']:6.2f} gain {r['gain']:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
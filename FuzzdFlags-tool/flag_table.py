@@ -0,0 +1,217 @@
+"""
+flag_table.py - the mutated flag table shared by the Python tools, and a
+compact bitmask encoding of flag sets over it.
+
+FLAG_LIST mirrors `flagList` in clang-options/afl-clang-lto/clang-options.cpp
+(the byte -> flag table the fuzzer decodes); keep the two in sync, since byte
+values and bit positions are both indices into it.
+
+A flag set is stored as a plain int whose bit i means FLAG_LIST[i] is present.
+Masks are hashable and cheap to compare, dedup and memoize; they are turned
+back into argv lists only when a compiler is actually spawned.
+"""
+import random
+
+FLAG_LIST = [
+ "-O0",
+ "-march=x86-64-v3",
+ "-march=x86-64-v2",
+ "-march=x86-64",
+ "-mavx",
+ "-mavx2",
+ "-mfma",
+ "-mbmi2",
+ "-msha",
+ "-maes",
+ "-fno-finite-loops",
+ "-fexcess-precision=fast",
+ "-fno-use-init-array",
+ "-faligned-allocation",
+ "-ftrapping-math",
+ "-fexcess-precision=standard",
+ "-fno-addrsig",
+ "-fno-honor-nans",
+ "-fno-unroll-loops",
+ "-fstrict-return",
+ "-fstack-protector-strong",
+ "-fno-honor-infinities",
+ "-Oz",
+ "-Og",
+ "-fsigned-zeros",
+ "-fno-unsafe-math-optimizations",
+ "-funsafe-math-optimizations",
+ "-fjump-tables",
+ "-O3",
+ "-fno-strict-overflow",
+ "-fno-associative-math",
+ "-ffp-exception-behavior=ignore",
+ "-fno-strict-aliasing",
+ "-funroll-loops",
+ "-ffinite-math-only",
+ "-fprotect-parens",
+ "-ftls-model=local-exec",
+ "-ffp-eval-method=source",
+ "-fdenormal-fp-math=positive-zero",
+ "-fdenormal-fp-math=preserve-sign",
+ "-fno-jump-tables",
+ "-femulated-tls",
+ "-fstrict-overflow",
+ "-ffast-math",
+ "-fno-trapping-math",
+ "-ffp-exception-behavior=strict",
+ "-fno-finite-math-only",
+ "-fno-keep-static-consts",
+ "-funsigned-bitfields",
+ "-ffp-model=precise",
+ "-fno-unsigned-char",
+ "-ftrapv",
+ "-fno-unique-section-names",
+ "-fno-signed-char",
+ "-flax-vector-conversions",
+ "-funique-section-names",
+ "-fno-rounding-math",
+ "-fassociative-math",
+ "-fsignaling-math",
+ "-fno-strict-return",
+ "-ftls-model=global-dynamic",
+ "-fstack-size-section",
+ "-fwrapv",
+ "-ffp-model=strict",
+ "-flax-vector-conversions=integer",
+ "-fstack-protector-all",
+ "-Os",
+ "-fno-math-errno",
+ "-fno-approx-func",
+ "-fno-protect-parens",
+ "-ftls-model=local-dynamic",
+ "-fno-fixed-point",
+ "-ffp-contract=off",
+ "-fno-align-functions",
+ "-fstrict-aliasing",
+ "-fno-stack-protector",
+ "-flax-vector-conversions=none",
+ "-falign-functions",
+ "-fno-strict-float-cast-overflow",
+ "-fvectorize",
+ "-faddrsig",
+ "-ffp-eval-method=double",
+ "-fapprox-func",
+ "-ffp-exception-behavior=maytrap",
+ "-fhonor-nans",
+ "-ftls-model=initial-exec",
+ "-ffinite-loops",
+ "-fkeep-static-consts",
+ "-fstrict-float-cast-overflow",
+ "-ffp-contract=fast",
+ "-fno-fast-math",
+ "-fno-reciprocal-math",
+ "-funsigned-char",
+ "-frounding-math",
+ "-fhonor-infinities",
+ "-fdenormal-fp-math=ieee",
+ "-ffixed-point",
+ "-fno-signaling-math",
+ "-fno-lax-vector-conversions",
+ "-fno-keep-persistent-storage-variables",
+ "-fkeep-persistent-storage-variables",
+ "-fstack-protector",
+ "-Ofast",
+ "-ffp-eval-method=extended",
+ "-O2",
+ "-ffp-contract=on",
+ "-fno-asm",
+ "-fno-wrapv",
+ "-fno-vectorize",
+ "-fsigned-char",
+ "-ffunction-sections",
+ "-fno-stack-size-section",
+ "-fno-signed-zeros",
+ "-O1",
+ "-funwind-tables",
+ "-fsigned-bitfields",
+ "-fno-unwind-tables",
+ "-fno-function-sections",
+ "-freciprocal-math",
+ "-fmath-errno",
+ "-fno-aligned-allocation",
+ "-ffp-model=fast"
+]
+
+FLAG_COUNT = len(FLAG_LIST)
+FLAG_BIT = {flag: i for i, flag in enumerate(FLAG_LIST)}
+ALL_MASK = (1 << FLAG_COUNT) - 1
+# Fixed width of a mask when packed into bytes (17 bytes for 122 flags)
+MASK_BYTES = (FLAG_COUNT + 7) // 8
+
+
+def flags_to_mask(flags, ignore_unknown=False) -> int:
+    """['-O2', '-fwrapv'] -> int mask. Unknown flags raise KeyError unless ignore_unknown."""
+    mask = 0
+    for flag in flags:
+        bit = FLAG_BIT.get(flag)
+        if bit is None:
+            if ignore_unknown:
+                continue
+            raise KeyError(f"flag not in FLAG_LIST: {flag}")
+        mask |= 1 << bit
+    return mask
+
+
+def mask_to_flags(mask: int) -> list[str]:
+    """int mask -> flag list in FLAG_LIST order (the order the NRS drivers always used)."""
+    flags = []
+    while mask:
+        low = mask & -mask
+        flags.append(FLAG_LIST[low.bit_length() - 1])
+        mask ^= low
+    return flags
+
+
+def mask_count(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+def mask_to_bytes(mask: int) -> bytes:
+    return mask.to_bytes(MASK_BYTES, "little")
+
+
+def mask_from_bytes(data: bytes) -> int:
+    return int.from_bytes(data, "little")
+
+
+def mask_to_hex(mask: int) -> str:
+    return f"{mask:0{MASK_BYTES * 2}x}"
+
+
+def mask_from_hex(text: str) -> int:
+    return int(text, 16)
+
+
+def sample_masks(n: int, rng=random) -> list[int]:
+    """
+    Draws n uniformly random non-empty flag subsets in one batch.
+
+    Every flag is included with probability 1/2 (one getrandbits call per set);
+    an all-zero draw gets a single random flag, as generate_random_flag_subset()
+    in the NRS drivers always did.
+    """
+    draw = rng.getrandbits
+    out = [draw(FLAG_COUNT) for _ in range(n)]
+    for i, m in enumerate(out):
+        if not m:
+            out[i] = 1 << rng.randrange(FLAG_COUNT)
+    return out
+
+
+class MaskSampler:
+    """Hands out random masks one at a time, refilling from sample_masks() in batches."""
+
+    def __init__(self, batch_size=4096, rng=random):
+        self.batch_size = batch_size
+        self.rng = rng
+        self._buf = []
+
+    def next(self) -> int:
+        if not self._buf:
+            self._buf = sample_masks(self.batch_size, self.rng)
+        return self._buf.pop()
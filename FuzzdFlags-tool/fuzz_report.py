@@ -1,14 +1,45 @@
 #!/usr/bin/env python3
-import sys
+import argparse
 import os
-import subprocess
+import time
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 fuzz_report.py <OUTPUT_DIR>")
-        sys.exit(1)
+from queue_decode import DecodeCache
 
-    output_dir = sys.argv[1]
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fuzzing summary and queue analysis for an AFL++ output directory",
+        usage="python3 fuzz_report.py <OUTPUT_DIR> [--watch SECONDS] [--jobs N]")
+    parser.add_argument("output_dir")
+    parser.add_argument("--watch", type=float, default=0,
+                        help="regenerate the report every SECONDS, decoding only new queue entries")
+    parser.add_argument("--jobs", type=int, default=0, help="decoding processes (0 = one per CPU core)")
+    parser.add_argument("--cache", help="decoded-queue cache (default: <OUTPUT_DIR>/queue_decode.tsv)")
+    args = parser.parse_args()
+
+    # Decoded queue entries persist across runs, so each run only decodes what AFL added since
+    cache = DecodeCache(args.cache or os.path.join(args.output_dir, "queue_decode.tsv"))
+    tally = new_queue_tally()
+    try:
+        while True:
+            generate_report(args.output_dir, cache, tally, args.jobs)
+            if not args.watch:
+                break
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        if not args.watch:
+            raise
+
+def new_queue_tally():
+    """Running queue counts; each queue entry is folded in once (see generate_report)."""
+    return {
+        "counted": set(),
+        "file_name_count": {},
+        "flag_count": {},
+        "seed_analysis": {},
+        "seed_flag_count": {},
+    }
+
+def generate_report(output_dir, cache, tally, jobs=0):
     parent_folder = os.path.basename(os.path.dirname(output_dir))
     timestamp = parent_folder.replace("Fuzz-output-", "")
     report_filename = f"fuzz_analysis_report_{timestamp}"
@@ -27,7 +58,8 @@ def main():
     hang_count = count_non_readme_files(hang_dir)
     queue_count = count_non_readme_files(queue_dir)
 
-    with open(report_file, "w") as rep:
+    # Written aside and renamed, so a --watch reader never sees a half-written report
+    with open(report_file + ".tmp", "w") as rep:
         rep.write("# ===============================================================================================\n")
         rep.write("#                                        Fuzzing Summary\n")
         rep.write("# ===============================================================================================\n")
@@ -113,8 +145,10 @@ def main():
             "-I/users/user42/llvmSS-include",
         }
 
-        file_name_count = {}  # e.g. {"/path/to/test_97.c": 3, ...}
-        flag_count = {}       # e.g. {"-O1": 10, ...}
+        # The counts live in `tally` and only entries not counted yet are folded in,
+        # so with --watch each refresh costs what AFL added since the last one.
+        file_name_count = tally["file_name_count"]  # e.g. {"/path/to/test_97.c": 3, ...}
+        flag_count = tally["flag_count"]            # e.g. {"-O1": 10, ...}
 
         # For seed analysis:
         # seed_analysis[<seedName>] = {
@@ -122,40 +156,20 @@ def main():
         #     "mutated_flags": set([...])
         # }
         # We'll also have a seed_flag_count for how many seeds contain each mutated flag
-        seed_analysis = {}
-        seed_flag_count = {}
+        seed_analysis = tally["seed_analysis"]
+        seed_flag_count = tally["seed_flag_count"]
 
         if os.path.isdir(queue_dir):
-            for fname in sorted_non_readme_files(queue_dir):
-                full_path = os.path.join(queue_dir, fname)
-                print(full_path)
+            # Decode new queue entries in-process (same format as clang-options --checker)
+            new_count = cache.update(queue_dir, jobs)
+            print(f"[*]Decoded {new_count} new queue entries ({len(cache.entries)} cached)")
+            counted = tally["counted"]
+            for fname in sorted(cache.entries.keys() - counted):
+                source_file, all_flags = cache.entries[fname]
+                counted.add(fname)
                 # Distinguish seeds by checking if the file name has e.g. "orig:seedX.bin"
                 # Adjust the pattern if your seeds differ (e.g. "orig:seed10.bin")
                 is_seed_file, seed_name = check_if_seed_file(fname)
-                clang_options_path = os.environ.get("INSTRUMENTED_CLANG_OPTIONS_PATH")
-                if not clang_options_path:
-                    print("[!]ERROR: Environment variable INSTRUMENTED_CLANG_OPTIONS_PATH is not set.")
-                    print("[!]Please set it, e.g.:")
-                    print("[!]export INSTRUMENTED_CLANG_OPTIONS_PATH=/path/to/clang-options")
-                    sys.exit(1)
-                # Run clang-options in checker mode
-                result = subprocess.run(
-                    [clang_options_path, "--checker", "--filebin", full_path],
-                    capture_output=True,
-                    text=True
-                )
-                stdout = result.stdout
-                if result.returncode != 0:
-                    print("clang-options call failed.")
-                    print("stderr:", result.stderr)
-                else:
-                    print(f"For {full_path} clang-options called successfully")
-
-                # Extract the lines for source file and flags
-                source_file, all_flags = parse_clang_options_checker(stdout)
-                if not source_file:
-                    # If no source found, skip
-                    continue
 
                 # Update global source file frequency
                 file_name_count[source_file] = file_name_count.get(source_file, 0) + 1
@@ -228,6 +242,7 @@ def main():
 
         rep.write("\nEnhanced fuzz report generated at ")
         rep.write(report_file + "\n")
+    os.replace(report_file + ".tmp", report_file)
 
 def parse_fuzzer_stats(fstats_path):
     """
@@ -279,34 +294,6 @@ def check_if_seed_file(queue_filename):
             return True, seed_name
     return False, None
 
-def parse_clang_options_checker(checker_stdout):
-    """
-    Given the stdout from 'clang-options --checker', extract:
-      [Checker] Source File: ...
-      [Checker] Flags: ...
-    Return: (source_file, [flag1, flag2, ...])
-    If not found, returns (None, []).
-    """
-    source_file = None
-    flags_line = None
-
-    for line in checker_stdout.splitlines():
-        line = line.strip()
-        if line.startswith("[Checker] Source File:"):
-            source_file = line.split(":", 1)[1].strip()
-        elif line.startswith("[Checker] Flags:"):
-            flags_line = line.split(":", 1)[1].strip()
-
-    if not source_file:
-        return (None, [])
-
-    if flags_line:
-        all_flags = flags_line.split()
-    else:
-        all_flags = []
-
-    return (source_file, all_flags)
-
 def count_non_readme_files(directory: str) -> int:
     """Returns the number of files in `directory` (excluding 'README') or 0 if missing."""
     if not os.path.isdir(directory):
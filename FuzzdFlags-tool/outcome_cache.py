@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+outcome_cache.py - shared on-disk cache of compile/run outcomes.
+
+Usage:
+  outcome_cache.py stats
+  outcome_cache.py evict [--max-mb N]
+  outcome_cache.py lookup <compiler> <source> <run_args> [--compile-timeout S] [--exec-timeout S] -- <flags...>
+  outcome_cache.py record <compiler> <source> <run_args> <compile_rc> <compile_ms> <exec_rc|-> <exec_ms|->
+                          [--hash kind=sha256]... -- <flags...>
+
+The drivers (difftest.py, f_deltadebug.py, fddebug_min*.py, dt-hash.sh)
+compile and run the same (compiler, source, flags) triples again and again:
+across sessions, and within a minimisation, where the sub-combinations of
+one program's mismatches overlap. Each of them looks the triple up here
+before it spawns a compiler, and records what it got after.
+
+An entry is keyed by the sha256 of
+
+  compiler  : sha256 of the binary's contents (hashed once per build; the
+              digest is kept in the binaries table by path, size and mtime)
+  source    : sha256 of the source file's contents
+  flags     : the canonical form (flag_canon.py) of the compile command's
+              flags, so lists that differ only in overridden or repeated
+              flags share an entry
+  run_args  : the arguments the executable was run with
+
+and holds the compile and run return codes (subprocess convention: -N for a
+signal; the lookup/record commands take and print the shell's 128+N), their
+wall-clock ms (exec_rc is NULL when it did not compile or was not run), the
+output hashes the driver computed ({"exec_stdout": ..., ...}; later records
+add to them) and a small driver-specific JSON payload. Runs that timed out are
+not recorded, and a lookup misses when the stored compile or run took longer
+than the caller's timeout, so a driver with a shorter timeout never reuses an
+outcome it would have timed out on.
+
+The cache is an SQLite database (WAL, safe to share between the threads and
+processes of several drivers), ~/.cache/fuzzdflags/outcomes.sqlite unless
+OUTCOME_CACHE names another file; OUTCOME_CACHE=off disables it. When the
+stored entries grow past OUTCOME_CACHE_MB (default 1024) the least recently
+used ones are evicted down to 90% of that.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from flag_canon import canonical_flags
+
+MAX_MB = float(os.environ.get("OUTCOME_CACHE_MB", "1024"))
+EVICT_EVERY = 512      # records between size checks
+TOUCH_AFTER = 3600     # seconds before a hit refreshes an entry's last-use time
+ROW_OVERHEAD = 128     # bytes counted per entry on top of its JSON
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outcomes (
+    key TEXT PRIMARY KEY,
+    compile_rc INTEGER NOT NULL,
+    compile_ms INTEGER,
+    exec_rc INTEGER,
+    exec_ms INTEGER,
+    hashes TEXT NOT NULL,
+    extra TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outcomes_used ON outcomes (used);
+CREATE TABLE IF NOT EXISTS binaries (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+"""
+
+Outcome = namedtuple("Outcome", "compile_rc compile_ms exec_rc exec_ms hashes extra")
+
+
+def default_cache_path():
+    env = os.environ.get("OUTCOME_CACHE")
+    if env:
+        return None if env == "off" else env
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "fuzzdflags", "outcomes.sqlite")
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def flag_key(flags):
+    return "\x1f".join(flags)
+
+
+class OutcomeCache:
+    def __init__(self, path, max_bytes=MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.digests = {}       # (path, size, mtime_ns) -> sha256, this process
+        self.records = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db().executescript(SCHEMA)
+
+    @classmethod
+    def default(cls):
+        """The shared cache, or None when OUTCOME_CACHE=off."""
+        path = default_cache_path()
+        return cls(path) if path else None
+
+    def db(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _digest(self, path, binary):
+        real = os.path.realpath(path)
+        st = os.stat(real)
+        stamp = (real, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            digest = self.digests.get(stamp)
+        if digest is not None:
+            return digest
+        if binary:
+            row = self.db().execute("SELECT digest FROM binaries WHERE path = ? AND size = ? AND mtime_ns = ?",
+                                    stamp).fetchone()
+            digest = row[0] if row else None
+        if digest is None:
+            digest = file_sha256(real)
+            if binary:
+                self.db().execute("INSERT OR REPLACE INTO binaries VALUES (?, ?, ?, ?)", (*stamp, digest))
+        with self.lock:
+            self.digests[stamp] = digest
+        return digest
+
+    def key(self, compiler, source, flags, run_args=()):
+        """Entry key of one compile (+ run), or None if the compiler or source cannot be read."""
+        try:
+            parts = [self._digest(shutil.which(compiler) or compiler, True),
+                     self._digest(source, False), flag_key(canonical_flags(flags)), flag_key(run_args)]
+        except OSError:
+            return None
+        return hashlib.sha256("\x1e".join(parts).encode()).hexdigest()
+
+    def get(self, key, compile_timeout=None, exec_timeout=None, need=()):
+        """
+        The stored Outcome, or None: no entry, an entry that took longer than
+        the given timeouts (seconds), or one missing a hash kind in need (exec_*
+        kinds are not needed when the program did not run).
+        """
+        if key is None:
+            return None
+        row = self.db().execute("SELECT compile_rc, compile_ms, exec_rc, exec_ms, hashes, extra, used "
+                                "FROM outcomes WHERE key = ?", (key,)).fetchone()
+        outcome = None
+        if row is not None:
+            outcome = Outcome(row[0], row[1], row[2], row[3], json.loads(row[4]), json.loads(row[5]))
+            if ((compile_timeout and (outcome.compile_ms or 0) > compile_timeout * 1000)
+                    or (exec_timeout and (outcome.exec_ms or 0) > exec_timeout * 1000)
+                    or any(k not in outcome.hashes for k in need
+                           if outcome.exec_rc is not None or not k.startswith("exec"))):
+                outcome = None
+            elif row[6] < time.time() - TOUCH_AFTER:
+                self.db().execute("UPDATE outcomes SET used = ? WHERE key = ?", (time.time(), key))
+        with self.lock:
+            if outcome is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return outcome
+
+    def put(self, key, compile_rc, compile_ms, exec_rc=None, exec_ms=None, hashes=None, extra=None):
+        """Records one outcome (callers do not record runs that timed out)."""
+        if key is None:
+            return
+        conn = self.db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT compile_rc, exec_rc, hashes, extra FROM outcomes WHERE key = ?",
+                               (key,)).fetchone()
+            # Another driver's record of the same outcome keeps its hashes; a different outcome replaces it
+            same = row is not None and (row[0], row[1]) == (compile_rc, exec_rc)
+            merged_hashes, merged_extra = (json.loads(row[2]), json.loads(row[3])) if same else ({}, {})
+            merged_hashes.update(hashes or {})
+            merged_extra.update(extra or {})
+            hashes_json, extra_json = json.dumps(merged_hashes), json.dumps(merged_extra)
+            conn.execute("INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (key, compile_rc, compile_ms, exec_rc, exec_ms, hashes_json, extra_json,
+                          len(hashes_json) + len(extra_json) + ROW_OVERHEAD, time.time()))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self.lock:
+            self.records += 1
+            check = self.records % EVICT_EVERY == 0
+        if check:
+            self.evict()
+
+    def size(self):
+        count, total = self.db().execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM outcomes").fetchone()
+        return count, total
+
+    def evict(self, max_bytes=None):
+        """Drops the least recently used entries once the cache is over max_bytes; returns how many."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        count, total = self.size()
+        if total <= max_bytes or not count:
+            return 0
+        target = int(0.9 * max_bytes)
+        drop = min(count, int((total - target) / (total / count)) + 1)
+        self.db().execute("DELETE FROM outcomes WHERE key IN "
+                          "(SELECT key FROM outcomes ORDER BY used LIMIT ?)", (drop,))
+        return drop
+
+    def summary(self):
+        return f"{self.hits} hits, {self.misses} misses, {self.records} recorded ({self.path})"
+
+
+def shell_rc(rc):
+    return "-" if rc is None else str(128 - rc if rc < 0 else rc)
+
+
+def from_shell_rc(text):
+    if text == "-":
+        return None
+    rc = int(text)
+    return 128 - rc if rc > 128 else rc
+
+
+def main():
+    # Flags start with '-', so everything after "--" is the flag list
+    argv = sys.argv[1:]
+    flags = []
+    if "--" in argv:
+        cut = argv.index("--")
+        argv, flags = argv[:cut], argv[cut + 1:]
+    parser = argparse.ArgumentParser(description="Shared compile/run outcome cache")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats")
+    p = sub.add_parser("evict")
+    p.add_argument("--max-mb", type=float, default=MAX_MB)
+    for name in ("lookup", "record"):
+        p = sub.add_parser(name)
+        p.add_argument("compiler")
+        p.add_argument("source")
+        p.add_argument("run_args", help="arguments of the run, as one (possibly empty) string")
+        if name == "lookup":
+            p.add_argument("--compile-timeout", type=float)
+            p.add_argument("--exec-timeout", type=float)
+            p.add_argument("--need", action="append", default=[], help="hash kinds the entry must have")
+        else:
+            p.add_argument("compile_rc")
+            p.add_argument("compile_ms")
+            p.add_argument("exec_rc")
+            p.add_argument("exec_ms")
+            p.add_argument("--hash", action="append", default=[], metavar="KIND=SHA256")
+    args = parser.parse_args(argv)
+
+    cache = OutcomeCache.default()
+    if cache is None:
+        sys.exit(1)
+    if args.cmd == "stats":
+        count, total = cache.size()
+        print(f"{cache.path}: {count} outcomes, {total / 1e6:.1f} MB of {cache.max_bytes / 1e6:.0f} MB")
+    elif args.cmd == "evict":
+        print(f"Evicted {cache.evict(args.max_mb * 1024 * 1024)} outcomes")
+    elif args.cmd == "lookup":
+        # Prints "compile_rc exec_rc kind=sha256..." (exec_rc '-' if not run); exit 1 on a miss
+        key = cache.key(args.compiler, args.source, flags, args.run_args.split())
+        o = cache.get(key, args.compile_timeout, args.exec_timeout, args.need)
+        if o is None:
+            sys.exit(1)
+        print(" ".join([shell_rc(o.compile_rc), shell_rc(o.exec_rc),
+                        *(f"{k}={v}" for k, v in sorted(o.hashes.items()))]))
+    else:
+        key = cache.key(args.compiler, args.source, flags, args.run_args.split())
+        hashes = dict(h.split("=", 1) for h in args.hash)
+        exec_ms = None if args.exec_ms == "-" else int(args.exec_ms)
+        cache.put(key, from_shell_rc(args.compile_rc), int(args.compile_ms),
+                  from_shell_rc(args.exec_rc), exec_ms, hashes)
+
+
+if __name__ == "__main__":
+    main()
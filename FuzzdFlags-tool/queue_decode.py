@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+queue_decode.py - decode AFL queue .bin inputs without launching clang-options.
+
+Usage:
+  queue_decode.py decode <queue_dir_or_file>... [--checker] [--jobs N]
+  queue_decode.py selfcheck <queue_dir> [--sample N] [--clang-options <path>]
+
+A FuzzdFlags input is decoded exactly as clang-options.cpp does it:
+
+  bytes 0-1 : little-endian 16-bit file index, mod FILE_COUNT -> $CFILES_DIR/test_<i>.c
+              (fewer than 2 bytes -> test_0.c)
+  bytes 2.. : one flag per byte, FLAG_LIST[b]; bytes >= len(FLAG_LIST) are ignored
+
+FILE_COUNT, CFILES_DIR and INCLUDES_DIR are read from the environment with the
+same defaults as clang-options. `decode` prints one line per input,
+path<TAB>source<TAB>flags, or with --checker the 'File:' header and the three
+'[Checker]' lines decrypt_queue.sh always wrote. `selfcheck` decodes a random
+sample of a queue both ways and reports any input where the two disagree.
+
+AFL never rewrites a queue entry once it is saved, so decoded entries can be
+cached by file name: DecodeCache keeps them in a TSV (name, source, flags)
+next to the queue and decodes only names it has not seen, spread across a
+worker pool. The header records CFILES_DIR and FILE_COUNT; a cache written
+with other values is discarded.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from flag_table import FLAG_COUNT, FLAG_LIST
+
+CFILES_DIR = os.environ.get("CFILES_DIR", "/users/user42/llvmSS-minimised-corpus")
+INCLUDES_DIR = os.environ.get("INCLUDES_DIR", "/users/user42/llvmSS-include")
+# clang-options reads FILE_COUNT into a uint16_t
+FILE_COUNT = int(os.environ.get("FILE_COUNT", "1811")) & 0xFFFF
+# Fewer new inputs than this are decoded in-process (a pool costs more than it saves)
+PARALLEL_MIN = 2000
+
+
+def fixed_flags():
+    """The flags clang-options adds to every compile (getFixedFlags())."""
+    return ("-c -fpermissive -w "
+            "-Wno-implicit-function-declaration -Wno-return-type -Wno-builtin-redeclared "
+            "-Wno-implicit-int -Wno-int-conversion "
+            "-march=native "
+            f"-I/usr/include -I{INCLUDES_DIR}")
+
+
+def source_index(data: bytes) -> int:
+    if len(data) < 2:
+        return 0
+    return (data[0] | data[1] << 8) % FILE_COUNT
+
+
+def decode(data: bytes):
+    """Raw input bytes -> (source file path, [mutated flags in input order])."""
+    source = f"{CFILES_DIR}/test_{source_index(data)}.c"
+    flags = [FLAG_LIST[b] for b in data[2:] if b < FLAG_COUNT]
+    return source, flags
+
+
+def decode_file(path):
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+def queue_names(queue_dir):
+    """Sorted input names of an AFL queue/crashes/hangs directory (README, dot files and subdirs skipped)."""
+    with os.scandir(queue_dir) as it:
+        return sorted(e.name for e in it
+                      if e.name != "README" and not e.name.startswith(".") and e.is_file())
+
+
+def queue_files(queue_dir):
+    return [os.path.join(queue_dir, n) for n in queue_names(queue_dir)]
+
+
+def _decode_one(path):
+    return (path, *decode_file(path))
+
+
+def decode_paths(paths, jobs=0):
+    """[(path, source, flags)] for `paths`, in order, across `jobs` processes (0 = one per core)."""
+    if jobs == 1 or len(paths) < PARALLEL_MIN:
+        return [_decode_one(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=jobs or None) as pool:
+        return list(pool.map(_decode_one, paths, chunksize=512))
+
+
+class DecodeCache:
+    def __init__(self, path):
+        self.path = path
+        self.header = f"# queue_decode CFILES_DIR={CFILES_DIR} FILE_COUNT={FILE_COUNT}"
+        self.entries = {}   # queue file name -> (source, [flags])
+        self.torn = False
+        if os.path.isfile(path):
+            self.load()
+
+    def load(self):
+        with open(self.path) as f:
+            if f.readline().rstrip("\n") != self.header:
+                print(f"[*]{self.path} was written for another corpus, re-decoding")
+                return
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) == 3 and line.endswith("\n"):
+                    self.entries[parts[0]] = (parts[1], parts[2].split())
+                else:
+                    self.torn = True    # interrupted write: rewrite the file on the next update
+
+    def update(self, queue_dir, jobs=0):
+        """Decodes and appends the inputs of queue_dir not cached yet; returns their number."""
+        entries = self.entries
+        new = [os.path.join(queue_dir, n) for n in queue_names(queue_dir) if n not in entries]
+        if not new:
+            return 0
+        fresh = not os.path.isfile(self.path) or not self.entries or self.torn
+        self.torn = False
+        with open(self.path, "w" if fresh else "a") as f:
+            if fresh:
+                f.write(self.header + "\n")
+                for name, (source, flags) in self.entries.items():
+                    f.write(f"{name}\t{source}\t{' '.join(flags)}\n")
+            for path, source, flags in decode_paths(new, jobs):
+                name = os.path.basename(path)
+                self.entries[name] = (source, flags)
+                f.write(f"{name}\t{source}\t{' '.join(flags)}\n")
+        return len(new)
+
+
+def parse_checker(checker_stdout):
+    """(source_file, [flags]) from 'clang-options --checker' output, (None, []) if absent."""
+    source_file = None
+    flags = []
+    for line in checker_stdout.splitlines():
+        line = line.strip()
+        if line.startswith("[Checker] Source File:"):
+            source_file = line.split(":", 1)[1].strip()
+        elif line.startswith("[Checker] Flags:"):
+            flags = line.split(":", 1)[1].split()
+    return source_file, flags
+
+
+def selfcheck(queue_dir, sample, clang_options, rng=random):
+    """Decodes `sample` random inputs both ways; returns the list of mismatching paths."""
+    paths = queue_files(queue_dir)
+    if sample and sample < len(paths):
+        paths = rng.sample(paths, sample)
+    mismatches = []
+    for path in paths:
+        result = subprocess.run([clang_options, "--checker", "--filebin", path],
+                                capture_output=True, text=True)
+        expected = parse_checker(result.stdout)
+        got = decode_file(path)
+        if result.returncode != 0 or expected != got:
+            mismatches.append(path)
+            print(f"[!]MISMATCH {path}")
+            print(f"   clang-options : {expected[0]} {' '.join(expected[1])}")
+            print(f"   queue_decode  : {got[0]} {' '.join(got[1])}")
+    return len(paths), mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode FuzzdFlags AFL inputs in-process")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    d = sub.add_parser("decode", help="decode queue directories or single inputs")
+    d.add_argument("paths", nargs="+")
+    d.add_argument("--checker", action="store_true", help="print decrypt_queue.sh style '[Checker]' blocks")
+    d.add_argument("--jobs", type=int, default=0, help="decoding processes (0 = one per CPU core)")
+    s = sub.add_parser("selfcheck", help="compare against clang-options --checker on a sample")
+    s.add_argument("queue_dir")
+    s.add_argument("--sample", type=int, default=200, help="inputs to check (0 = all)")
+    s.add_argument("--clang-options", default=os.environ.get("INSTRUMENTED_CLANG_OPTIONS_PATH"))
+    args = parser.parse_args()
+
+    if args.cmd == "selfcheck":
+        if not args.clang_options:
+            print("[!]ERROR: pass --clang-options or set INSTRUMENTED_CLANG_OPTIONS_PATH")
+            sys.exit(1)
+        checked, mismatches = selfcheck(args.queue_dir, args.sample, args.clang_options)
+        print(f"[*]Checked {checked} inputs, {len(mismatches)} mismatches")
+        sys.exit(1 if mismatches else 0)
+
+    out = sys.stdout
+    fixed = fixed_flags()
+    for p in args.paths:
+        entries = decode_paths(queue_files(p), args.jobs) if os.path.isdir(p) else [_decode_one(p)]
+        for path, source, flags in entries:
+            if args.checker:
+                out.write("----------------------------------------\n"
+                          f"File: {path}\n"
+                          f"[Checker] Source File: {source}\n"
+                          f"[Checker] Fixed Flags: {fixed}\n"
+                          f"[Checker] Flags: {' '.join(flags)}\n")
+            else:
+                out.write(f"{path}\t{source}\t{' '.join(flags)}\n")
+
+
+if __name__ == "__main__":
+    main()
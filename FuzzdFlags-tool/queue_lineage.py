@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+queue_lineage.py - lineage graph of an AFL queue and mutation yield per edge and seed.
+
+Usage:
+  queue_lineage.py summary <afl_out_dir> [--top 20]
+  queue_lineage.py subtree <afl_out_dir> <id>
+  queue_lineage.py prune   <afl_out_dir> [--min-cov 1]   # seeds whose subtree found < min-cov +cov entries
+
+AFL++ names every queue entry after its parent(s):
+
+  id:000000,time:0,execs:0,orig:seed1.bin                 seed
+  id:000123,src:000045,time:..,execs:..,op:havoc,rep:4,+cov
+  id:000124,src:000045+000087,...,op:splice,rep:2          (first src is the parent)
+  id:000125,sync:fuzzer02,src:000871                       imported: a root here
+
+and crashes/hangs the same way (id:..,sig:11,src:..). One pass over the names
+in id order (parents always have lower ids) builds the tree. Each entry's
+decoded contents (queue_decode.py, cached) are diffed against its parent's,
+so every edge is labelled with what the mutation changed: the source file,
+flags added, flags removed. '+cov' marks entries that found new edges, not
+just new hit counts.
+
+The tree is stored in pre-order (node i's subtree is the slice
+order[tin[i]:tin[i] + size[i]]), with prefix sums of the +cov, crash and
+hang counts over that order, so any subtree count is two lookups. This is
+fast enough for 100k+ node queues.
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+
+from flag_table import flags_to_mask, mask_to_flags
+from queue_decode import DecodeCache
+
+OBJECTIVE_SETS = ("crashes", "hangs")
+
+
+def parse_name(name):
+    """AFL queue/crash file name -> {field: value}; '+cov' becomes cov=True."""
+    fields = {}
+    for part in name.split(","):
+        key, sep, value = part.partition(":")
+        if sep:
+            fields[key] = value
+        elif part == "+cov":
+            fields["cov"] = True
+    return fields
+
+
+def parent_of(fields):
+    """Parent id of a parsed name, or None for seeds and entries synced from another fuzzer."""
+    src = fields.get("src")
+    if src is None or "sync" in fields:
+        return None
+    first = src.split("+", 1)[0]
+    return int(first) if first.isdigit() else None
+
+
+class Lineage:
+    def __init__(self):
+        self.ids = []          # AFL id per node
+        self.names = []
+        self.parent = []       # parent node, -1 for roots
+        self.op = []
+        self.cov = []
+        self.source = []
+        self.mask = []
+        self.change = []       # (source changed, flags added mask, flags removed mask), None for roots
+        self.crashes = []      # objectives whose src is this node
+        self.hangs = []
+        self.index = {}        # AFL id -> node
+        self.children = []
+
+    def add(self, name, source, flags):
+        """Adds one queue entry; entries must come in id order (one streaming pass)."""
+        fields = parse_name(name)
+        if "id" not in fields or not fields["id"].isdigit():
+            return
+        node = len(self.ids)
+        parent = self.index.get(parent_of(fields), -1)
+        mask = flags_to_mask(flags, ignore_unknown=True)
+        self.index[int(fields["id"])] = node
+        self.ids.append(int(fields["id"]))
+        self.names.append(name)
+        self.parent.append(parent)
+        self.op.append("seed" if "orig" in fields else "sync" if "sync" in fields else fields.get("op", "?"))
+        self.cov.append(bool(fields.get("cov")))
+        self.source.append(source)
+        self.mask.append(mask)
+        self.crashes.append(0)
+        self.hangs.append(0)
+        self.children.append([])
+        if parent >= 0:
+            self.children[parent].append(node)
+            pmask = self.mask[parent]
+            self.change.append((source != self.source[parent], mask & ~pmask, pmask & ~mask))
+        else:
+            self.change.append(None)
+
+    def add_objective(self, kind, name):
+        node = self.index.get(parent_of(parse_name(name)))
+        if node is not None:
+            (self.crashes if kind == "crashes" else self.hangs)[node] += 1
+
+    def finish(self):
+        """Builds the pre-order index and prefix sums; call after the last add."""
+        n = len(self.ids)
+        self.order, self.tin, self.size = [], [0] * n, [1] * n
+        for root in (i for i in range(n) if self.parent[i] < 0):
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                self.tin[node] = len(self.order)
+                self.order.append(node)
+                stack.extend(reversed(self.children[node]))
+        for node in reversed(range(n)):   # children have higher node numbers than parents
+            if self.parent[node] >= 0:
+                self.size[self.parent[node]] += self.size[node]
+        self.root = [0] * n
+        for node in range(n):
+            p = self.parent[node]
+            self.root[node] = node if p < 0 else self.root[p]
+        self.prefix = {}
+        for key, values in (("cov", self.cov), ("crashes", self.crashes), ("hangs", self.hangs)):
+            acc, total = [0], 0
+            for node in self.order:
+                total += values[node]
+                acc.append(total)
+            self.prefix[key] = acc
+
+    def subtree(self, node, key):
+        """Sum of cov/crashes/hangs over the subtree of node (node included)."""
+        acc = self.prefix[key]
+        return acc[self.tin[node] + self.size[node]] - acc[self.tin[node]]
+
+    def depth(self, node):
+        d = 0
+        while self.parent[node] >= 0:
+            node = self.parent[node]
+            d += 1
+        return d
+
+    def seeds(self):
+        return [i for i in range(len(self.ids)) if self.op[i] == "seed"]
+
+
+def build(out_dir, cache=None):
+    """Lineage of one AFL instance directory (queue/, crashes/, hangs/); `cache` if already updated."""
+    lineage = Lineage()
+    if cache is None:
+        cache = DecodeCache(os.path.join(out_dir, "queue_decode.tsv"))
+        cache.update(os.path.join(out_dir, "queue"))
+    for name in sorted(cache.entries):   # zero-padded ids: name order is id order
+        source, flags = cache.entries[name]
+        lineage.add(name, source, flags)
+    for kind in OBJECTIVE_SETS:
+        path = os.path.join(out_dir, kind)
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                if name != "README":
+                    lineage.add_objective(kind, name)
+    lineage.finish()
+    return lineage
+
+
+def edge_stats(lineage):
+    """Counters over all parent->child edges: by op, by kind of change, flags added on +cov edges."""
+    by_op, by_change, cov_added, added = Counter(), Counter(), Counter(), Counter()
+    for node, change in enumerate(lineage.change):
+        if change is None:
+            continue
+        src_changed, plus, minus = change
+        kind = ("source+flags" if src_changed and (plus or minus) else
+                "source" if src_changed else "flags" if plus or minus else "none")
+        cov = lineage.cov[node]
+        by_op[lineage.op[node], cov] += 1
+        by_change[kind, cov] += 1
+        for flag in mask_to_flags(plus):
+            added[flag] += 1
+            if cov:
+                cov_added[flag] += 1
+    return by_op, by_change, cov_added, added
+
+
+def seed_table(lineage):
+    """(name, descendants, +cov, crashes, hangs) per seed, most productive first."""
+    rows = []
+    for s in lineage.seeds():
+        rows.append((lineage.names[s], lineage.size[s] - 1, lineage.subtree(s, "cov"),
+                     lineage.subtree(s, "crashes"), lineage.subtree(s, "hangs")))
+    rows.sort(key=lambda r: (r[3], r[2], r[1]), reverse=True)
+    return rows
+
+
+def print_summary(lineage, top):
+    n = len(lineage.ids)
+    roots = sum(1 for p in lineage.parent if p < 0)
+    print(f"[*]Queue entries: {n}  roots: {roots}  +cov: {sum(lineage.cov)}  "
+          f"crashes: {sum(lineage.crashes)}  hangs: {sum(lineage.hangs)}")
+    by_op, by_change, cov_added, added = edge_stats(lineage)
+
+    print("\n=== Edges by mutation operator (entries, of which +cov) ===")
+    ops = sorted({op for op, _ in by_op}, key=lambda op: -(by_op[op, True] + by_op[op, False]))
+    for op in ops:
+        total = by_op[op, True] + by_op[op, False]
+        print(f"{op:16} {total:8} {by_op[op, True]:8}  ({100.0 * by_op[op, True] / total:5.1f}% +cov)")
+
+    print("\n=== Edges by what changed vs. the parent ===")
+    for kind in ("flags", "source", "source+flags", "none"):
+        total = by_change[kind, True] + by_change[kind, False]
+        if total:
+            print(f"{kind:16} {total:8} {by_change[kind, True]:8}  ({100.0 * by_change[kind, True] / total:5.1f}% +cov)")
+
+    print(f"\n=== Flags most often added on +cov edges (top {top}) ===")
+    for flag, count in cov_added.most_common(top):
+        print(f"{flag:36} {count:8} of {added[flag]:8} additions")
+
+    print(f"\n=== Seeds by productivity (top {top}) ===")
+    print(f"{'seed':60} {'desc':>8} {'+cov':>8} {'crash':>6} {'hang':>6}")
+    for name, desc, cov, crashes, hangs in seed_table(lineage)[:top]:
+        print(f"{name:60} {desc:8} {cov:8} {crashes:6} {hangs:6}")
+
+
+def print_subtree(lineage, afl_id):
+    node = lineage.index.get(afl_id)
+    if node is None:
+        print(f"[!]id {afl_id} not in the queue")
+        sys.exit(1)
+    print(f"Entry      : {lineage.names[node]}")
+    print(f"Source     : {lineage.source[node]}")
+    print(f"Flags      : {' '.join(mask_to_flags(lineage.mask[node]))}")
+    print(f"Depth      : {lineage.depth(node)}")
+    print(f"Root       : {lineage.names[lineage.root[node]]}")
+    print(f"Descendants: {lineage.size[node] - 1}")
+    print(f"+cov       : {lineage.subtree(node, 'cov')}")
+    print(f"Crashes    : {lineage.subtree(node, 'crashes')}")
+    print(f"Hangs      : {lineage.subtree(node, 'hangs')}")
+    change = lineage.change[node]
+    if change:
+        src_changed, plus, minus = change
+        print(f"From parent: {lineage.names[lineage.parent[node]]}")
+        print(f"  source {'changed' if src_changed else 'kept'}; "
+              f"+[{' '.join(mask_to_flags(plus))}] -[{' '.join(mask_to_flags(minus))}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AFL queue lineage and mutation yield")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("summary")
+    s.add_argument("out_dir")
+    s.add_argument("--top", type=int, default=20)
+    t = sub.add_parser("subtree")
+    t.add_argument("out_dir")
+    t.add_argument("id", type=int)
+    p = sub.add_parser("prune", help="print seeds whose subtree is unproductive")
+    p.add_argument("out_dir")
+    p.add_argument("--min-cov", type=int, default=1,
+                   help="keep seeds whose subtree has at least this many +cov entries (or any crash)")
+    args = parser.parse_args()
+
+    lineage = build(args.out_dir)
+    if args.cmd == "summary":
+        print_summary(lineage, args.top)
+    elif args.cmd == "subtree":
+        print_subtree(lineage, args.id)
+    else:
+        for name, desc, cov, crashes, hangs in seed_table(lineage):
+            if cov < args.min_cov and not crashes and not hangs:
+                print(parse_name(name).get("orig", name))
+
+
+if __name__ == "__main__":
+    main()
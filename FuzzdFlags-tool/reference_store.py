@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+reference_store.py - persistent per-source results of the reference compilers.
+
+Usage:
+  reference_store.py show <store.jsonl> [<test_N.c>]
+  reference_store.py prune <store.jsonl> <compiler_path>... [--corpus <dir>]
+      # keep only these builds (and, with --corpus, sources still as in <dir>)
+
+The reference compilers of a differential test (gcc-14 with its base flags
+only, the -O0 golden build of check-O0.sh) see the same command for every
+queue input that decodes to the same test_N.c, so their compile/run outcome
+is a property of the source, not of the input. difftest.py computes it once
+per (compiler build, flag set, source) and keeps it here, one JSON line per
+result, appended as it is computed:
+
+  {"build": ..., "config": ..., "source": "test_N.c", "sha256": ..., "result": {...}}
+
+  build  : hash of the compiler binary's real path, size and mtime, so a
+           rebuilt or replaced compiler gets fresh results
+  config : hash of the base flags, run arguments and run timeout
+  sha256 : of the source's contents; every corpus has a test_N.c, and an
+           edited or regenerated corpus keeps the names, so the name alone
+           does not identify the program (lines without it are never used)
+
+Timeouts are not stored (they depend on the machine's load at the time);
+they are computed again by the next run. Logs are kept to their first
+STORED_LOG bytes. By default the store lives next to the corpus as
+<corpus_dir>.references.jsonl; REFERENCE_STORE overrides the location.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+from outcome_cache import file_sha256
+
+STORED_LOG = 4096
+
+
+def default_store_path(corpus_dir):
+    env = os.environ.get("REFERENCE_STORE")
+    if env:
+        return env
+    return os.path.normpath(str(corpus_dir)) + ".references.jsonl"
+
+
+def compiler_build(path):
+    """Identity of the compiler binary at path (None if there is none)."""
+    exe = shutil.which(path) or path
+    try:
+        real = os.path.realpath(exe)
+        st = os.stat(real)
+    except OSError:
+        return None
+    return hashlib.sha256(f"{real}:{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()[:16]
+
+
+_digests = {}   # (real path, size, mtime_ns) -> sha256
+
+
+def source_digest(path):
+    """sha256 of a source file's contents (computed once per file version)."""
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    stamp = (real, st.st_size, st.st_mtime_ns)
+    if stamp not in _digests:
+        _digests[stamp] = file_sha256(real)
+    return _digests[stamp]
+
+
+def config_id(*parts):
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:16]
+
+
+def is_timeout(result):
+    return "Timeout" in (result.get("compile"), result.get("exec"))
+
+
+def trim_logs(result):
+    logs = result.get("_logs")
+    if not logs:
+        return result
+    trimmed = {}
+    for kind, text in logs.items():
+        if len(text) > STORED_LOG:
+            text = text[:STORED_LOG] + f"\n[... {len(text) - STORED_LOG} characters not stored ...]\n"
+        trimmed[kind] = text
+    return dict(result, _logs=trimmed)
+
+
+def load_store(path):
+    """{(build, config, source, sha256): result} (the last line wins)."""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue   # torn last line of an interrupted run
+            entries[rec["build"], rec["config"], rec["source"], rec.get("sha256")] = rec["result"]
+    return entries
+
+
+class ReferenceStore:
+    """Results keyed by (build, config, source, sha256); path None keeps them in memory only."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = load_store(path) if path else {}
+        self.added = 0
+        self.file = None
+
+    @classmethod
+    def for_corpus(cls, corpus_dir):
+        return cls(default_store_path(corpus_dir))
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, result):
+        if is_timeout(result):
+            return
+        result = trim_logs(result)
+        self.entries[key] = result
+        self.added += 1
+        if self.path:
+            if self.file is None:
+                self.file = open(self.path, "a")
+            self.file.write(record_line(key, result))
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def record_line(key, result):
+    build, config, source, sha = key
+    return json.dumps({"build": build, "config": config, "source": source, "sha256": sha,
+                       "result": result}) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the difftest reference store")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("show")
+    p.add_argument("store")
+    p.add_argument("source", nargs="?")
+    p = sub.add_parser("prune")
+    p.add_argument("store")
+    p.add_argument("compilers", nargs="+")
+    p.add_argument("--corpus", help="also drop results whose source differs from (or is missing in) this corpus")
+    args = parser.parse_args()
+
+    entries = load_store(args.store)
+    if args.cmd == "show":
+        for (build, config, source, sha), r in sorted(entries.items(), key=lambda e: e[0][2]):
+            if args.source and source != os.path.basename(args.source):
+                continue
+            print(f"{source}\t{(sha or '-')[:16]}\t{build}\t{config}\t{r['compile']}\t{r['exec'] or '-'}")
+        print(f"[*]{len(entries)} stored results", file=sys.stderr)
+    else:
+        keep = {compiler_build(c) for c in args.compilers} - {None}
+        kept = {k: r for k, r in entries.items() if k[0] in keep and k[3]}
+        if args.corpus:
+            def current(source, sha):
+                path = os.path.join(args.corpus, source)
+                return os.path.isfile(path) and source_digest(path) == sha
+            kept = {k: r for k, r in kept.items() if current(k[2], k[3])}
+        tmp = args.store + ".tmp"
+        with open(tmp, "w") as f:
+            for key, r in kept.items():
+                f.write(record_line(key, r))
+        os.replace(tmp, args.store)
+        print(f"[*]Kept {len(kept)} of {len(entries)} stored results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+result_log.py - compact append-only result log for NRS campaigns.
+
+Usage:
+  result_log.py legacy <results.bin> <out_dir>   # write seeds_log.txt / crash_flags.txt / hang_flags.txt
+  result_log.py summary <results.bin>            # outcome counts
+  result_log.py jsonl <results.bin>              # one JSON object per record on stdout
+
+File layout:
+  b"FDFLOG1\\n" | u32 header length | JSON header | fixed-size records...
+
+The JSON header is written once and holds what the text logs used to repeat
+for every iteration (plugin flags, flag table, corpus path pattern). Each
+record is RECORD_FMT, little-endian:
+
+  src_idx  u16    index of test_<N>.c
+  mask     bytes  flag set as a flag_table bitmask (header "mask_bytes" wide)
+  outcome  u8     OUTCOMES index (success / crash / hang / invalid)
+  wall     f32    wall-clock seconds of the compile
+  rc       i16    compiler return code (negative = killed by a signal)
+  signal   i8     terminating signal, 0 if none
+
+Writes are buffered and flushed every FLUSH_BYTES or FLUSH_SECONDS, so a
+crash of the driver loses at most a few seconds of records.
+"""
+import json
+import os
+import struct
+import sys
+import time
+from collections import Counter, namedtuple
+
+from flag_table import FLAG_LIST, MASK_BYTES, mask_to_flags
+
+MAGIC = b"FDFLOG1\n"
+OUTCOMES = ("success", "crash", "hang", "invalid")
+OUTCOME_CODE = {name: i for i, name in enumerate(OUTCOMES)}
+FLUSH_BYTES = 64 * 1024
+FLUSH_SECONDS = 5.0
+
+Record = namedtuple("Record", "src_idx mask outcome wall rc signal")
+
+
+def record_struct(mask_bytes):
+    return struct.Struct(f"<H{mask_bytes}sBfhb")
+
+
+def exit_signal(rc):
+    """Signal number behind a return code: negative rc from Popen, or 128+N from a shell/timeout."""
+    if rc < 0:
+        return -rc
+    if rc > 128:
+        return rc - 128
+    return 0
+
+
+class ResultLog:
+    """
+    Buffered writer. Opening an existing log appends to it after checking its
+    header; truncate_at (a size returned by tell()) drops everything after it.
+    """
+
+    def __init__(self, path, plugin_flags, source_pattern, append=False, truncate_at=None):
+        self.path = path
+        self.struct = record_struct(MASK_BYTES)
+        self.header = {
+            "version": 1,
+            "mask_bytes": MASK_BYTES,
+            "flag_list": FLAG_LIST,
+            "plugin_flags": list(plugin_flags),
+            "source_pattern": source_pattern,
+        }
+        self._buf = bytearray()
+        self._last_flush = time.monotonic()
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            old, offset = read_header(path)
+            if old["flag_list"] != FLAG_LIST or old["mask_bytes"] != MASK_BYTES:
+                raise ValueError(f"{path}: written with a different flag table, cannot append")
+            self._f = open(path, "ab")
+            # drop records past truncate_at and a torn trailing record left by an unclean stop
+            size = os.path.getsize(path)
+            if truncate_at is not None and offset <= truncate_at < size:
+                size = truncate_at
+            torn = (size - offset) % self.struct.size
+            if size - torn != os.path.getsize(path):
+                self._f.truncate(size - torn)
+                self._f.seek(0, os.SEEK_END)
+        else:
+            self._f = open(path, "wb")
+            meta = json.dumps(self.header).encode()
+            self._f.write(MAGIC + struct.pack("<I", len(meta)) + meta)
+
+    def write(self, src_idx, mask, outcome, wall, rc=0):
+        rc = max(-32768, min(32767, rc))
+        self._buf += self.struct.pack(src_idx, mask.to_bytes(MASK_BYTES, "little"),
+                                      OUTCOME_CODE[outcome], wall, rc, exit_signal(rc))
+        if len(self._buf) >= FLUSH_BYTES or time.monotonic() - self._last_flush >= FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._f.write(self._buf)
+            self._buf.clear()
+        self._f.flush()
+        self._last_flush = time.monotonic()
+
+    def tell(self):
+        """Size of the log once buffered records are flushed."""
+        return self._f.tell() + len(self._buf)
+
+    def close(self):
+        self.flush()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_header(path):
+    """Returns (header dict, offset of the first record)."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a result log")
+        (n,) = struct.unpack("<I", f.read(4))
+        return json.loads(f.read(n)), len(MAGIC) + 4 + n
+
+
+def read_log(path):
+    """Returns (header, [Record, ...]); a torn trailing record is ignored."""
+    header, offset = read_header(path)
+    rs = record_struct(header["mask_bytes"])
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    data = memoryview(data)[:len(data) - len(data) % rs.size]
+    records = [Record(src, int.from_bytes(mask, "little"), OUTCOMES[code], wall, rc, sig)
+               for src, mask, code, wall, rc, sig in rs.iter_unpack(data)]
+    return header, records
+
+
+def header_flags(header, mask):
+    """Flags of a mask, decoded with the flag table stored in the log itself."""
+    if header["flag_list"] == FLAG_LIST:
+        return mask_to_flags(mask)
+    table = header["flag_list"]
+    return [table[i] for i in range(len(table)) if mask >> i & 1]
+
+
+def legacy_entry(header, rec, with_result):
+    """One '[Checker]' block exactly as the NRS drivers used to write it."""
+    entry = ("----------------------------------------\n"
+             f"[Checker] Source File: {header['source_pattern'].format(rec.src_idx)}\n"
+             f"[Checker] Fixed Flags: {' '.join(header['plugin_flags'])}\n"
+             f"[Checker] Flags: {' '.join(header_flags(header, rec.mask))}\n")
+    if with_result:
+        entry += f"[Checker] Result: {rec.outcome}\n"
+    return entry
+
+
+def to_legacy(path, out_dir):
+    """Writes seeds_log.txt, crash_flags.txt and hang_flags.txt for existing scripts."""
+    header, records = read_log(path)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "seeds_log.txt"), "w") as log_s, \
+            open(os.path.join(out_dir, "crash_flags.txt"), "w") as log_c, \
+            open(os.path.join(out_dir, "hang_flags.txt"), "w") as log_h:
+        for rec in records:
+            if rec.outcome == "invalid":
+                continue
+            log_s.write(legacy_entry(header, rec, True))
+            if rec.outcome == "crash":
+                log_c.write(legacy_entry(header, rec, False))
+            elif rec.outcome == "hang":
+                log_h.write(legacy_entry(header, rec, False))
+    return len(records)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("legacy", "summary", "jsonl"):
+        print(__doc__.split("\n\n")[1])
+        sys.exit(1)
+    cmd, path = sys.argv[1], sys.argv[2]
+    if cmd == "legacy":
+        if len(sys.argv) != 4:
+            print("Usage: result_log.py legacy <results.bin> <out_dir>")
+            sys.exit(1)
+        n = to_legacy(path, sys.argv[3])
+        print(f"[*]Wrote {n} records as legacy text logs to {sys.argv[3]}")
+    elif cmd == "summary":
+        header, records = read_log(path)
+        counts = Counter(r.outcome for r in records)
+        print(f"Records        : {len(records)}")
+        for name in OUTCOMES:
+            print(f"{name:15}: {counts.get(name, 0)}")
+        print(f"Compile seconds: {sum(r.wall for r in records):.1f}")
+    else:
+        header, records = read_log(path)
+        for r in records:
+            print(json.dumps({"src_idx": r.src_idx, "flags": header_flags(header, r.mask),
+                              "outcome": r.outcome, "wall": round(r.wall, 3),
+                              "rc": r.rc, "signal": r.signal}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+timeout_model.py - per-source compile timeouts learned from baseline and observed compile times.
+
+Usage:
+  timeout_model.py baseline <corpus_dir> --clang <clang_path> [--levels O0,O3] [--jobs N] [--model <model.tsv>]
+  timeout_model.py show <model.tsv> [<test_N.c>]
+  timeout_model.py export <model.tsv> [--ceiling S]   # name<TAB>seconds, for the shell drivers
+
+The model is a tab-separated table, one row per source:
+
+  name  o0_ms  o3_ms  max_ok_ms  runs
+
+  o0_ms/o3_ms : baseline compile time at -O0 / -O3 (-1 if not measured)
+  max_ok_ms   : slowest compile of this source that finished, as seen by drivers
+  runs        : finished compiles folded into max_ok_ms
+
+A source's timeout is TIMEOUT_MULTIPLE x its slowest known compile, clamped to
+[TIMEOUT_FLOOR, ceiling]. Each driver passes its old fixed timeout as the
+ceiling (500s for NRS, 60s for the fddebug scripts, ...), so the model only
+ever shortens timeouts, and sources it knows nothing about keep the old value.
+By default the model lives next to the corpus as <corpus_dir>.timeouts.tsv;
+TIMEOUT_MODEL overrides the location.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from corpus_index import baseline_flags, list_sources
+
+COLUMNS = ("name", "o0_ms", "o3_ms", "max_ok_ms", "runs")
+SourceTimes = namedtuple("SourceTimes", COLUMNS)
+
+TIMEOUT_MULTIPLE = float(os.environ.get("TIMEOUT_MULTIPLE", "10"))
+TIMEOUT_FLOOR = float(os.environ.get("TIMEOUT_FLOOR", "10"))
+BASELINE_TIMEOUT = 500
+
+
+def default_model_path(corpus_dir):
+    env = os.environ.get("TIMEOUT_MODEL")
+    if env:
+        return env
+    return os.path.normpath(str(corpus_dir)) + ".timeouts.tsv"
+
+
+def time_compile(clang, path, level):
+    """Wall-clock ms of one '-<level> -c' compile (BASELINE_TIMEOUT on a hang)."""
+    cmd = [clang, "-x", "c", f"-{level}", *baseline_flags(), path, "-o", os.devnull]
+    start = time.monotonic()
+    try:
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       timeout=BASELINE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        pass
+    return int((time.monotonic() - start) * 1000)
+
+
+def _baseline_one(job):
+    clang, path, levels = job
+    times = {level: time_compile(clang, path, level) for level in levels}
+    return os.path.basename(path), times.get("O0", -1), times.get("O3", -1)
+
+
+class TimeoutModel:
+    def __init__(self, path, ceiling, multiple=TIMEOUT_MULTIPLE, floor=TIMEOUT_FLOOR):
+        self.path = path
+        self.ceiling = ceiling
+        self.multiple = multiple
+        self.floor = min(floor, ceiling)
+        self.rows = {}
+        self.dirty = False
+        if os.path.isfile(path):
+            self.rows = load_model(path)
+
+    @classmethod
+    def for_corpus(cls, corpus_dir, ceiling, **kw):
+        return cls(default_model_path(corpus_dir), ceiling, **kw)
+
+    def known_ms(self, name):
+        """Slowest known compile of a source in ms, or None."""
+        row = self.rows.get(name)
+        if row is None:
+            return None
+        ms = max(row.o0_ms, row.o3_ms, row.max_ok_ms)
+        return ms if ms >= 0 else None
+
+    def timeout(self, name):
+        """Compile timeout in seconds for a source name (e.g. 'test_12.c')."""
+        ms = self.known_ms(name)
+        if ms is None:
+            return self.ceiling
+        return max(self.floor, min(self.ceiling, self.multiple * ms / 1000.0))
+
+    def observe(self, name, seconds):
+        """Folds in a compile of `name` that finished (success or crash) in `seconds`."""
+        ms = int(seconds * 1000)
+        row = self.rows.get(name) or SourceTimes(name, -1, -1, -1, 0)
+        self.rows[name] = row._replace(max_ok_ms=max(row.max_ok_ms, ms), runs=row.runs + 1)
+        self.dirty = True
+
+    def save(self):
+        if self.dirty:
+            write_model(self.rows, self.path)
+            self.dirty = False
+
+
+def write_model(rows, out_path):
+    tmp = out_path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write("\t".join(COLUMNS) + "\n")
+        for r in rows.values():
+            f.write(f"{r.name}\t{r.o0_ms}\t{r.o3_ms}\t{r.max_ok_ms}\t{r.runs}\n")
+    os.replace(tmp, out_path)
+
+
+def load_model(path):
+    rows = {}
+    with open(path, "r") as f:
+        header = f.readline().rstrip("\n").split("\t")
+        if tuple(header) != COLUMNS:
+            raise ValueError(f"{path}: unexpected timeout model header {header}")
+        for line in f:
+            name, o0_ms, o3_ms, max_ok_ms, runs = line.rstrip("\n").split("\t")
+            rows[name] = SourceTimes(name, int(o0_ms), int(o3_ms), int(max_ok_ms), int(runs))
+    return rows
+
+
+def build_baseline(corpus_dir, clang, levels, jobs, out_path):
+    """Measures baseline compile times and merges them into the model at out_path."""
+    rows = load_model(out_path) if os.path.isfile(out_path) else {}
+    work = [(clang, os.path.join(corpus_dir, n), levels) for n in list_sources(corpus_dir)]
+    with ProcessPoolExecutor(max_workers=jobs or None) as pool:
+        for name, o0_ms, o3_ms in pool.map(_baseline_one, work, chunksize=4):
+            row = rows.get(name) or SourceTimes(name, -1, -1, -1, 0)
+            rows[name] = row._replace(o0_ms=o0_ms if o0_ms >= 0 else row.o0_ms,
+                                      o3_ms=o3_ms if o3_ms >= 0 else row.o3_ms)
+    write_model(rows, out_path)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-source compile timeout model")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("baseline", help="measure baseline compile times for a corpus")
+    b.add_argument("corpus_dir")
+    b.add_argument("--clang", required=True)
+    b.add_argument("--levels", default="O0,O3", help="comma-separated optimisation levels")
+    b.add_argument("--jobs", type=int, default=0, help="parallel compiles (0 = one per CPU core)")
+    b.add_argument("--model", help="model path (default: <corpus_dir>.timeouts.tsv)")
+    s = sub.add_parser("show", help="print the model, or the row and timeout of one source")
+    s.add_argument("model")
+    s.add_argument("name", nargs="?")
+    s.add_argument("--ceiling", type=float, default=BASELINE_TIMEOUT)
+    e = sub.add_parser("export", help="print name<TAB>timeout seconds for every source")
+    e.add_argument("model")
+    e.add_argument("--ceiling", type=float, default=BASELINE_TIMEOUT)
+    args = parser.parse_args()
+
+    if args.cmd == "baseline":
+        out = args.model or default_model_path(args.corpus_dir)
+        n = build_baseline(args.corpus_dir, args.clang, args.levels.split(","), args.jobs, out)
+        print(f"[*]Baseline compile times for {n} sources -> {out}")
+        return
+
+    model = TimeoutModel(args.model, args.ceiling)
+    if args.cmd == "export":
+        for name in model.rows:
+            print(f"{name}\t{int(round(model.timeout(name)))}")
+    elif args.name:
+        row = model.rows.get(os.path.basename(args.name))
+        if row is None:
+            print(f"[!]{args.name} not in {args.model}")
+            sys.exit(1)
+        for col in COLUMNS:
+            print(f"{col:9}: {getattr(row, col)}")
+        print(f"{'timeout':9}: {model.timeout(row.name):.1f}s")
+    else:
+        for name in model.rows:
+            print(f"{name}\t{model.timeout(name):.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,9 +25,25 @@ echo "--> COMPILING "$testcaseDir" ITERATION "$itr" with compiler info. "$compil
 export GCOV_PREFIX=$working_folder/coverage_gcda_files/application_run
 compile_line_lib_default="-c -fpermissive -w -Wno-implicit-function-declaration -Wno-return-type -Wno-builtin-redeclared -Wno-implicit-int -Wno-int-conversion -march=native -I/usr/include -I/users/user42/llvmSS-include"
 echo "Folder: $testcaseDir"
+
+# Per-source feature index (FuzzdFlags-tool/corpus_index.py build $testcaseDir),
+# loaded once instead of grepping every source for math.h
+corpus_index="${CORPUS_INDEX:-${testcaseDir%/}.features.tsv}"
+declare -A needs_libm=()
+if [[ -f "$corpus_index" ]]; then
+	while IFS=$'\t' read -r name _size _asm _typeof _argv1 libm _o0_ms; do
+		needs_libm[$name]=$libm
+	done < <(tail -n +2 "$corpus_index")
+fi
+
 for testcaseFile in $testcaseDir/* ; do
 	compiler_flag="$opt"
-	is_math=`grep "math.h" $testcaseFile | wc -l`
+	testcaseName=$(basename "$testcaseFile")
+	if [[ -n "${needs_libm[$testcaseName]:-}" ]]; then
+		is_math=${needs_libm[$testcaseName]}
+	else
+		is_math=`grep "math.h" $testcaseFile | wc -l`
+	fi
 	if [[ $is_math -gt 0 ]]; then
 		compiler_flag=""$opt" -lm"
 	fi
@@ -1,5 +1,12 @@
+import os
 import sys
 import re
+from pathlib import Path
+
+# Shared FuzzdFlags modules (../FuzzdFlags-tool in a checkout)
+sys.path.insert(1, os.environ.get("FUZZDFLAGS_TOOL_DIR",
+                                  str(Path(__file__).resolve().parent.parent / "FuzzdFlags-tool")))
+from flag_canon import canonical_key, canonical_mask
 
 def remove_duplicates(input_file, output_file):
     with open(input_file, 'r') as file:
@@ -16,7 +23,8 @@ def remove_duplicates(input_file, output_file):
         if source_match and flags_match:
             source = source_match.group(1).strip()
             flags = flags_match.group(1).strip()
-            key = (source, flags)
+            # Flag lists that differ only in repeated or overridden flags are the same entry
+            key = (source, canonical_key(flags.split()))
 
             if key not in unique_entries:
                 unique_entries.add(key)
@@ -27,12 +35,38 @@ def remove_duplicates(input_file, output_file):
 
     print(f"Duplicate entries removed. Output written to {output_file}")
 
+def remove_duplicates_bin(input_file, output_file):
+    # results.bin from the NRS drivers: dedupe on (source, canonical flag mask, outcome)
+    # without parsing any text, then write the surviving entries in the text format
+    from result_log import legacy_entry, read_log
+
+    header, records = read_log(input_file)
+    unique_entries = set()
+    final_entries = []
+
+    for rec in records:
+        if rec.outcome == 'invalid':
+            continue
+        key = (rec.src_idx, canonical_mask(rec.mask), rec.outcome)
+        if key not in unique_entries:
+            unique_entries.add(key)
+            entry = legacy_entry(header, rec, True)
+            final_entries.append(entry.split('----------------------------------------\n', 1)[1].strip())
+
+    with open(output_file, 'w') as file:
+        file.write('\n----------------------------------------\n'.join(final_entries))
+
+    print(f"Duplicate entries removed. Output written to {output_file}")
+
 if __name__ == "__main__":
     if len(sys.argv) != 3:
-        print("Usage: python remove_duplicates.py <input_file> <output_file>")
+        print("Usage: python remove_duplicates.py <input_file|results.bin> <output_file>")
         sys.exit(1)
     
     input_file = sys.argv[1]
     output_file = sys.argv[2]
 
-    remove_duplicates(input_file, output_file)
+    if input_file.endswith('.bin'):
+        remove_duplicates_bin(input_file, output_file)
+    else:
+        remove_duplicates(input_file, output_file)
@@ -4,9 +4,10 @@
 # Usage:
 #   ./decrypt_queue.sh <queue_directory> <output_file.txt>
 #
-# This script iterates over the AFL queue files (mutated binary seed files),
-# runs clang-options with --filebin and --checker to extract the decrypted content,
-# and appends the output to a single text file.
+# This script decodes the AFL queue files (mutated binary seed files) with
+# queue_decode.py, which prints what clang-options --filebin --checker would,
+# for the whole directory in one process, into a single text file.
+# CFILES_DIR / FILE_COUNT / INCLUDES_DIR are honoured as by clang-options.
 
 # Check for correct usage
 if [ $# -ne 2 ]; then
@@ -28,16 +29,15 @@ fi
 
 echo "Processing AFL queue files in '$QUEUE_DIR'..." | tee -a "$OUTPUT_FILE"
 
-# Iterate over all files in the queue directory
-for file in "$QUEUE_DIR"/*; do
-    if [ -f "$file" ]; then
-        echo "----------------------------------------" | tee -a "$OUTPUT_FILE"
-        echo "File: $file" | tee -a "$OUTPUT_FILE"
-        # Run clang-options to "decrypt" the binary file.
-        # This should print the fixed flags, mutated flags, and source info.
-        result=$(~/build-clang-options/bin/clang-options --filebin "$file" --checker)
-        echo "$result" | tee -a "$OUTPUT_FILE"
-    fi
-done
+# queue_decode.py lives in FuzzdFlags-tool/ (or next to this script)
+SCRIPT_DIR="$(dirname "$(readlink -f "$0")")"
+if [ -z "${FUZZDFLAGS_TOOL_DIR:-}" ]; then
+    FUZZDFLAGS_TOOL_DIR="$SCRIPT_DIR/FuzzdFlags-tool"
+    [ -f "$FUZZDFLAGS_TOOL_DIR/queue_decode.py" ] || FUZZDFLAGS_TOOL_DIR="$SCRIPT_DIR"
+fi
+
+# Decode every file in the queue directory in one pass
+python3 "$FUZZDFLAGS_TOOL_DIR/queue_decode.py" decode --checker "$QUEUE_DIR" >> "$OUTPUT_FILE" || exit 1
+echo "Decoded $(grep -c '^File: ' "$OUTPUT_FILE") files."
 
 echo "Decryption complete. Results saved in '$OUTPUT_FILE'."
@@ -0,0 +1,86 @@
+"""
+Coverage-feedback mode for the NRS drivers (--coverage).
+
+Each compile runs the AFL-instrumented clang with its own shared-memory edge
+map (afl_shm.py). The campaign folds every map into a global virgin map, and
+a (source, flag set) pair that reaches new edges or new hit-count buckets is
+retained in a queue. next_case() then draws from the queue with probability
+MUTATE_PROB and mutates the draw:
+
+  - flip 1..MAX_FLIPS random flags of its flag set, or
+  - (SPLICE_PROB) keep the flag set and move it to a random other source.
+
+Otherwise the case is a fresh random one, as in plain NRS. Queue entries are
+weighted by the new edges they found and decay with how often they were
+picked, so this sits between pure random search and full AFL++.
+
+State lives in <out_dir>/coverage/: virgin.bin (the global map) and
+queue.tsv (src_idx, mask hex, new edges, picks), saved with each checkpoint
+and reloaded on --resume.
+"""
+import os
+import random
+from pathlib import Path
+
+from afl_shm import VirginMap
+from flag_table import FLAG_COUNT, mask_from_hex, mask_to_hex
+
+MUTATE_PROB = 0.8
+SPLICE_PROB = 0.2
+MAX_FLIPS = 4
+
+# Instrumented clang (build-clang17-clang-options.sh builds it in ~/build)
+INSTRUMENTED_CLANG = os.environ.get("INSTRUMENTED_CLANG_PATH", "/users/user42/build/bin/clang")
+
+
+class CoverageFeedback:
+    def __init__(self, output_dir: Path, num_sources: int, rng=random):
+        self.dir = output_dir / 'coverage'
+        self.dir.mkdir(exist_ok=True)
+        self.num_sources = num_sources
+        self.rng = rng
+        self.virgin = VirginMap()
+        self.queue = []   # [src_idx, mask, new_edges, picks]
+        self.retained = 0
+
+    def load(self):
+        virgin = self.dir / 'virgin.bin'
+        if virgin.exists():
+            self.virgin.load(virgin)
+        queue = self.dir / 'queue.tsv'
+        if queue.exists():
+            with queue.open() as f:
+                for line in f:
+                    src_idx, mask, new_edges, picks = line.split()
+                    self.queue.append([int(src_idx), mask_from_hex(mask), int(new_edges), int(picks)])
+
+    def save(self):
+        self.virgin.save(self.dir / 'virgin.bin')
+        tmp = self.dir / 'queue.tsv.tmp'
+        with tmp.open('w') as f:
+            for src_idx, mask, new_edges, picks in self.queue:
+                f.write(f"{src_idx}\t{mask_to_hex(mask)}\t{new_edges}\t{picks}\n")
+        os.replace(tmp, self.dir / 'queue.tsv')
+
+    def next_case(self):
+        """(src_idx, mask) mutated from the queue, or None for a fresh random case."""
+        rng = self.rng
+        if not self.queue or rng.random() >= MUTATE_PROB:
+            return None
+        weights = [(1 + new_edges) / (1 + picks) for _, _, new_edges, picks in self.queue]
+        entry = rng.choices(self.queue, weights)[0]
+        entry[3] += 1
+        src_idx, mask = entry[0], entry[1]
+        if rng.random() < SPLICE_PROB:
+            return rng.randrange(self.num_sources), mask
+        for _ in range(rng.randint(1, MAX_FLIPS)):
+            mask ^= 1 << rng.randrange(FLAG_COUNT)
+        return src_idx, mask or 1 << rng.randrange(FLAG_COUNT)
+
+    def observe(self, src_idx: int, mask: int, classified: bytes):
+        """Folds one compile's classified map in; retains the case if it found anything new."""
+        new_edges, new_buckets = self.virgin.update(classified)
+        if new_buckets:
+            self.queue.append([src_idx, mask, new_edges, 0])
+            self.retained += 1
+        return new_edges
@@ -0,0 +1,164 @@
+"""
+Declarative flag-conflict rules for the NRS drivers.
+
+A rule table is a list of three kinds of rules over FLAG_LIST:
+
+  exclude(trigger, drop)   if any trigger flag is present, drop every `drop` flag
+  implies(trigger, add)    if any trigger flag is present, add every `add` flag
+  guard(feature, drop)     for sources with a corpus_index feature (e.g. 'asm'),
+                           drop every `drop` flag
+
+Flag names may be fnmatch patterns ('-ffp-eval-method=*') and are expanded
+against FLAG_LIST; names outside FLAG_LIST are ignored, so rules may mention
+flags the fuzzer never produces. Each rule compiles to a (trigger, clear, set)
+triple of bitmasks, so repairing a sampled set costs one AND/OR per rule and
+the table can grow to hundreds of rules without slowing the sampler.
+
+RuleTable.sample() repairs a random mask into a valid, non-empty set directly
+instead of redrawing until sanitisation leaves something behind.
+"""
+import fnmatch
+import random
+from collections import namedtuple
+
+from flag_table import FLAG_COUNT, FLAG_LIST, flags_to_mask
+
+Rule = namedtuple("Rule", "kind trigger target reason")
+
+# Fast bundles/subflags for sanitisation
+FAST_BUNDLES = ["-ffast-math", "-Ofast", "-fast"]
+FAST_SUBFLAGS = [
+    '-fapprox-func', '-fno-approx-func',
+    '-freciprocal-math', '-fno-reciprocal-math',
+    '-fassociative-math', '-fno-associative-math',
+    '-ffp-contract=fast', '-ffp-contract=off',
+    '-funsafe-math-optimizations', '-fno-unsafe-math-optimizations',
+]
+
+
+def exclude(trigger, drop, reason=""):
+    return Rule("exclude", tuple(trigger), tuple(drop), reason)
+
+
+def implies(trigger, add, reason=""):
+    return Rule("implies", tuple(trigger), tuple(add), reason)
+
+
+def guard(feature, drop, reason=""):
+    return Rule("guard", (feature,), tuple(drop), reason)
+
+
+# The rules nrs-semi-smart.py used to hard-code in sanitise_flags()
+DEFAULT_RULES = [
+    guard("asm", ['-fno-asm', '-fno-asm-blocks'],
+          "inline asm does not parse with -fno-asm"),
+    exclude(FAST_BUNDLES + FAST_SUBFLAGS, ['-ffp-eval-method=*'],
+            "fast-math bundles reject an explicit -ffp-eval-method"),
+]
+
+
+def expand_mask(patterns) -> int:
+    """Flag names / fnmatch patterns -> mask over FLAG_LIST (unknown names ignored)."""
+    mask = 0
+    for pat in patterns:
+        if any(ch in pat for ch in "*?["):
+            mask |= flags_to_mask(fnmatch.filter(FLAG_LIST, pat))
+        else:
+            mask |= flags_to_mask([pat], ignore_unknown=True)
+    return mask
+
+
+class RuleTable:
+    def __init__(self, rules=(), max_passes=4):
+        self.rules = []
+        self.max_passes = max_passes
+        self._compiled = []   # (trigger, clear, set) for exclude/implies
+        self._guards = []     # (feature, clear)
+        self._forbidden = {}  # feature tuple -> guard mask
+        self._singletons = {} # feature tuple -> bits that survive repair on their own
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: Rule):
+        if rule.kind == "guard":
+            self._guards.append((rule.trigger[0], expand_mask(rule.target)))
+        else:
+            trig = expand_mask(rule.trigger)
+            target = expand_mask(rule.target)
+            if not trig or not target:
+                return False  # rule does not touch FLAG_LIST
+            if trig & target:
+                raise ValueError(f"rule {rule} triggers on a flag it also rewrites")
+            if rule.kind == "exclude":
+                self._compiled.append((trig, target, 0))
+            elif rule.kind == "implies":
+                self._compiled.append((trig, 0, target))
+            else:
+                raise ValueError(f"unknown rule kind: {rule.kind}")
+        self.rules.append(rule)
+        self._forbidden.clear()
+        self._singletons.clear()
+        return True
+
+    def _feature_key(self, features):
+        if features is None:
+            return ()
+        return tuple(f for f, _ in self._guards if getattr(features, f, False))
+
+    def forbidden(self, features=None) -> int:
+        key = self._feature_key(features)
+        mask = self._forbidden.get(key)
+        if mask is None:
+            mask = 0
+            for feature, clear in self._guards:
+                if feature in key:
+                    mask |= clear
+            self._forbidden[key] = mask
+        return mask
+
+    def repair(self, mask: int, features=None) -> int:
+        """Applies every rule until nothing changes (bounded by max_passes)."""
+        forbidden = self.forbidden(features)
+        mask &= ~forbidden
+        for _ in range(self.max_passes):
+            before = mask
+            for trig, clear, add in self._compiled:
+                if mask & trig:
+                    mask = (mask & ~clear) | add
+            mask &= ~forbidden
+            if mask == before:
+                break
+        return mask
+
+    def is_valid(self, mask: int, features=None) -> bool:
+        return mask != 0 and self.repair(mask, features) == mask
+
+    def sample(self, sampler, features=None, rng=random) -> int:
+        """Draws one valid, non-empty flag set for a source with `features`."""
+        mask = self.repair(sampler.next(), features)
+        if mask:
+            return mask
+        key = self._feature_key(features)
+        bits = self._singletons.get(key)
+        if bits is None:
+            bits = [b for b in range(FLAG_COUNT) if self.repair(1 << b, features)]
+            self._singletons[key] = bits
+        return self.repair(1 << rng.choice(bits), features)
+
+    # Rules learned from clang's own rejections are kept next to the run output
+    def load_learned(self, path):
+        if not path.exists():
+            return 0
+        n = 0
+        with path.open() as f:
+            for line in f:
+                kind, trigger, target, reason = line.rstrip("\n").split("\t", 3)
+                n += self.add(Rule(kind, tuple(trigger.split()), tuple(target.split()), reason))
+        return n
+
+    def learn(self, rule: Rule, path):
+        if rule in self.rules or not self.add(rule):
+            return False
+        with path.open("a") as f:
+            f.write(f"{rule.kind}\t{' '.join(rule.trigger)}\t{' '.join(rule.target)}\t{rule.reason}\n")
+        return True
@@ -1,30 +1,47 @@
+import argparse
+import functools
+import os
 import random
 import re
 import subprocess
+import sys
 from pathlib import Path
-from datetime import datetime, timedelta
+
+# Shared FuzzdFlags modules (same directory when deployed, ../FuzzdFlags-tool in a checkout)
+sys.path.insert(1, os.environ.get("FUZZDFLAGS_TOOL_DIR",
+                                  str(Path(__file__).resolve().parent.parent / "FuzzdFlags-tool")))
+from afl_shm import worker_map
+from corpus_index import load_or_scan
+from coverage_feedback import INSTRUMENTED_CLANG, CoverageFeedback
+from crash_signature import run_bounded, signature
+from flag_table import FLAG_BIT, MaskSampler, mask_from_hex, mask_to_flags, mask_to_hex
+from flag_rules import DEFAULT_RULES, RuleTable, exclude
+from nrs_campaign import CompileResult, add_campaign_args, run_campaign
+from source_bandit import SourceBandit, default_yield_path
+from timeout_model import TimeoutModel
 
 # Parameters
 NUM_TEST_PROGRAMS = 1811
 DURATION_HOURS = 24
 REPEAT_LIMIT = float('inf')   # Number of iterations 50
+CORPUS_DIR = Path("/users/user42/llvmSS-minimised-corpus")
+COMPILE_TIMEOUT = 500   # fixed timeout, and the ceiling with --adaptive-timeouts
 
 # Output directory
 OUTPUT_DIR = Path("output-nrs")
 OUTPUT_DIR.mkdir(exist_ok=True)
 
-# Regex for guards
-ASM_RE = re.compile(r'\b(__)?asm\b')
-TYPEOF_RE = re.compile(r'\btypeof\b')
-
-def needs_asm(src_text: str) -> bool:
-    return bool(ASM_RE.search(src_text))
+# Per-source features (asm/typeof use, ...), loaded once in main()
+FEATURES = {}
 
-def needs_typeof(src_text: str) -> bool:
-    return bool(TYPEOF_RE.search(src_text))
-
-def read_source(path: Path) -> str:
-    return path.read_text(encoding='utf8', errors='ignore')
+# Flag-conflict rules (flag_rules.py) plus the ones learned from clang during this run
+RULES = RuleTable(DEFAULT_RULES)
+LEARNED_RULES = OUTPUT_DIR / 'learned_rules.tsv'
+# Flag sets clang's driver rejected; never sent to a full compile again
+INVALID_LOG = OUTPUT_DIR / 'invalid_combos.txt'
+INVALID = set()
+CLANG = "/users/user42/build-clang17/bin/clang"
+NOT_ALLOWED_RE = re.compile(r"invalid argument '([^']+)' not allowed with '([^']+)'")
 
 # Always-used flags
 PLUGIN_FLAGS = [
@@ -36,225 +53,102 @@ PLUGIN_FLAGS = [
     '-I/users/user42/llvmSS-include'
 ]
 
-# Candidate flags
-FLAG_LIST = [
-    "-O0",
- "-march=x86-64-v3",
- "-march=x86-64-v2",
- "-march=x86-64",
- "-mavx",
- "-mavx2",
- "-mfma", 
- "-mbmi2",    
- "-msha",      
- "-maes",
- "-fno-finite-loops",
- "-fexcess-precision=fast",
- "-fno-use-init-array",
- "-faligned-allocation",
- "-ftrapping-math",
- "-fexcess-precision=standard",
- "-fno-addrsig",
- "-fno-honor-nans",
- "-fno-unroll-loops",
- "-fstrict-return",
- "-fstack-protector-strong",
- "-fno-honor-infinities",
- "-Oz",
- "-Og",
- "-fsigned-zeros",
- "-fno-unsafe-math-optimizations",
- "-funsafe-math-optimizations",
- "-fjump-tables",
- "-O3",
- "-fno-strict-overflow",
- "-fno-associative-math",
- "-ffp-exception-behavior=ignore",
- "-fno-strict-aliasing",
- "-funroll-loops",
- "-ffinite-math-only",
- "-fprotect-parens",
- "-ftls-model=local-exec",
- "-ffp-eval-method=source",
- "-fdenormal-fp-math=positive-zero",
- "-fdenormal-fp-math=preserve-sign",
- "-fno-jump-tables",
- "-femulated-tls",
- "-fstrict-overflow",
- "-ffast-math",
- "-fno-trapping-math",
- "-ffp-exception-behavior=strict",
- "-fno-finite-math-only",
- "-fno-keep-static-consts",
- "-funsigned-bitfields",
- "-ffp-model=precise",
- "-fno-unsigned-char",
- "-ftrapv",
- "-fno-unique-section-names",
- "-fno-signed-char",
- "-flax-vector-conversions",
- "-funique-section-names",
- "-fno-rounding-math",
- "-fassociative-math",
- "-fsignaling-math",
- "-fno-strict-return",
- "-ftls-model=global-dynamic",
- "-fstack-size-section",
- "-fwrapv",
- "-ffp-model=strict",
- "-flax-vector-conversions=integer",
- "-fstack-protector-all",
- "-Os",
- "-fno-math-errno",
- "-fno-approx-func",
- "-fno-protect-parens",
- "-ftls-model=local-dynamic",
- "-fno-fixed-point",
- "-ffp-contract=off",
- "-fno-align-functions",
- "-fstrict-aliasing",
- "-fno-stack-protector",
- "-flax-vector-conversions=none",
- "-falign-functions",
- "-fno-strict-float-cast-overflow",
- "-fvectorize",
- "-faddrsig",
- "-ffp-eval-method=double",
- "-fapprox-func",
- "-ffp-exception-behavior=maytrap",
- "-fhonor-nans",
- "-ftls-model=initial-exec",
- "-ffinite-loops",
- "-fkeep-static-consts",
- "-fstrict-float-cast-overflow",
- "-ffp-contract=fast",
- "-fno-fast-math",
- "-fno-reciprocal-math",
- "-funsigned-char",
- "-frounding-math",
- "-fhonor-infinities",
- "-fdenormal-fp-math=ieee",
- "-ffixed-point",
- "-fno-signaling-math",
- "-fno-lax-vector-conversions",
- "-fno-keep-persistent-storage-variables",
- "-fkeep-persistent-storage-variables",
- "-fstack-protector",
- "-Ofast",
- "-ffp-eval-method=extended",
- "-O2",
- "-ffp-contract=on",
- "-fno-asm",
- "-fno-wrapv",
- "-fno-vectorize",
- "-fsigned-char",
- "-ffunction-sections",
- "-fno-stack-size-section",
- "-fno-signed-zeros",
- "-O1",
- "-funwind-tables",
- "-fsigned-bitfields",
- "-fno-unwind-tables",
- "-fno-function-sections",
- "-freciprocal-math",
- "-fmath-errno",
- "-fno-aligned-allocation",
- "-ffp-model=fast"
-]
-
-# Fast bundles/subflags for sanitisation
-FAST_BUNDLES = {"-ffast-math", "-Ofast", "-fast"}
-FAST_SUBFLAGS = {
-    '-fapprox-func', '-fno-approx-func',
-    '-freciprocal-math', '-fno-reciprocal-math',
-    '-fassociative-math', '-fno-associative-math',
-    '-ffp-contract=fast', '-ffp-contract=off',
-    '-funsafe-math-optimizations', '-fno-unsafe-math-optimizations'
-}
-
-# Generate random subset of flags
-def generate_random_flag_subset() -> list[str]:
-    bits = [random.choice('01') for _ in FLAG_LIST]
-    if '1' not in bits:
-        bits[random.randrange(len(bits))] = '1'
-    return [flg for flg, b in zip(FLAG_LIST, bits) if b == '1']
-
-# Sanitise candidate flags
-def sanitise_flags(raw: list[str], src_text: str) -> list[str]:
-    flags = raw.copy()
-    # Guard against inline asm
-    if needs_asm(src_text):
-        flags = [f for f in flags if f not in ('-fno-asm', '-fno-asm-blocks')]
-    # Guard fast bundles vs ffp-eval-method
-    if any(f in FAST_BUNDLES for f in flags) or any(f in FAST_SUBFLAGS for f in flags):
-        flags = [f for f in flags if not f.startswith('-ffp-eval-method=')]
-    return flags
-
-# Compile with timeout, return status
-def compile_with_flags(src: Path, out_name: str, extra: list[str]) -> str:
-    cmd = ["/users/user42/build-clang17/bin/clang", '-x', 'c', str(src), '-o', out_name,
-           *PLUGIN_FLAGS, *extra]
-    try:
-        subprocess.check_output(cmd, stderr=subprocess.STDOUT, timeout=500)
-        return 'success'
-    except subprocess.TimeoutExpired:
-        return 'hang'
-    except subprocess.CalledProcessError:
-        return 'crash'
+# Random non-empty flag subsets as FLAG_LIST bitmasks, drawn in batches
+SAMPLER = MaskSampler()
+
+# Yield-weighted source picker for --schedule yield (uniform when None)
+SCHEDULER = None
+# Coverage queue for --coverage (None: plain random search)
+FEEDBACK = None
+
+# Precheck: let clang's driver validate the flag set without compiling (-###)
+def precheck_flags(flags: list[str]):
+    cmd = [CLANG, '-###', '-x', 'c', os.devnull, '-o', os.devnull, *PLUGIN_FLAGS, *flags]
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=60)
+    if proc.returncode == 0:
+        return None
+    return [l for l in proc.stderr.decode('utf8', errors='replace').splitlines() if 'error:' in l]
+
+# Compile with timeout, return status (the mask becomes argv only here).
+# Runs in a pool worker: settings reach it as arguments, not globals, since a
+# spawned or forkserver worker does not see what main() set.
+def compile_with_flags(src: Path, out_name: str, mask: int, timeout: float = COMPILE_TIMEOUT,
+                       precheck: bool = False, coverage: bool = False) -> CompileResult:
+    flags = mask_to_flags(mask)
+    if precheck:
+        errors = precheck_flags(flags)
+        if errors is not None:
+            return CompileResult('invalid', 1, errors)
+    cmd = [INSTRUMENTED_CLANG if coverage else CLANG, '-x', 'c', str(src), '-o', out_name,
+           *PLUGIN_FLAGS, *flags]
+    # --coverage: the instrumented clang writes its edges into this worker's shared map
+    cov_map = worker_map() if coverage else None
+    if cov_map:
+        cov_map.clear()
+    # stderr is kept (bounded) so crashes can be bucketed by their stack signature
+    rc, stderr = run_bounded(cmd, timeout=timeout, env=cov_map.env() if cov_map else None)
+    if rc is None:
+        return CompileResult('hang', -9)
+    edges = cov_map.classified() if cov_map else None
+    if rc == 0:
+        return CompileResult('success', 0, None, edges)
+    return CompileResult('crash', rc, (signature(stderr, rc), stderr), edges)
+
+# Record a flag set clang rejected, and learn "X not allowed with Y" as an exclusion rule
+def record_invalid(mask: int, errors: list[str]):
+    INVALID.add(mask)
+    with INVALID_LOG.open('a') as f:
+        f.write(mask_to_hex(mask) + '\n')
+    for line in errors:
+        m = NOT_ALLOWED_RE.search(line)
+        if m and m.group(1) in FLAG_BIT and m.group(2) in FLAG_BIT:
+            RULES.learn(exclude([m.group(2)], [m.group(1)], line.strip()), LEARNED_RULES)
+
+# Pick a random source and a valid flag set for one iteration
+def next_case():
+    # --coverage: mostly mutate a case that reached new edges (repaired like a fresh draw)
+    case = FEEDBACK.next_case() if FEEDBACK else None
+    if case:
+        src_idx, mask = case
+        src = CORPUS_DIR / f"test_{src_idx}.c"
+        mask = RULES.repair(mask, FEATURES[src.name])
+        if mask and mask not in INVALID:
+            return src_idx, src, mask
+    if SCHEDULER:
+        src_idx = SCHEDULER.pick()
+    else:
+        src_idx = random.randint(0, NUM_TEST_PROGRAMS - 1)
+    src = CORPUS_DIR / f"test_{src_idx}.c"
+
+    # Generate a valid flag set
+    mask = RULES.sample(SAMPLER, FEATURES[src.name])
+    while mask in INVALID:
+        mask = RULES.sample(SAMPLER, FEATURES[src.name])
+    return src_idx, src, mask
 
 # Main fuzz loop
 def main():
-    crash_count = hang_count = 0
-    iterations = 0
-    deadline = datetime.now() + timedelta(hours=DURATION_HOURS)
-
-    # Log files
-    seed_log = OUTPUT_DIR / 'seeds_log.txt'
-    crash_log = OUTPUT_DIR / 'crash_flags.txt'
-    hang_log = OUTPUT_DIR / 'hang_flags.txt'
-    summary_file = OUTPUT_DIR / 'summary_counters.txt'
-
-    with seed_log.open('w') as log_s, crash_log.open('w') as log_c, hang_log.open('w') as log_h:
-        while datetime.now() < deadline and iterations < REPEAT_LIMIT:
-            iterations += 1
-            src_idx = random.randint(0, NUM_TEST_PROGRAMS - 1)
-            src = Path(f"/users/user42/llvmSS-minimised-corpus/test_{src_idx}.c")
-            txt = read_source(src)
-
-            # Generate a valid flag set
-            while True:
-                cand = generate_random_flag_subset()
-                san = sanitise_flags(cand, txt)
-                if san:
-                    flags = san
-                    break
-
-            test_id = f"iter{iterations}_src{src_idx}"
-            result = compile_with_flags(src, test_id, flags)
-
-            # Prepare log entry
-            for flog, outcome in [(log_s, result), (log_c, 'crash'), (log_h, 'hang')]:
-                if flog is log_s or result == outcome:
-                    flog.write("----------------------------------------\n")
-                    flog.write(f"[Checker] Source File: {src}\n")
-                    flog.write(f"[Checker] Fixed Flags: {' '.join(PLUGIN_FLAGS)}\n")
-                    flog.write(f"[Checker] Flags: {' '.join(flags)}\n")
-                    if flog is log_s:
-                        flog.write(f"[Checker] Result: {result}\n")
-
-            if result == 'crash':
-                crash_count += 1
-            elif result == 'hang':
-                hang_count += 1
-
-    # Write summary
-    summary = (
-        f"Total Iterations: {iterations}\n"
-        f"Crashes        : {crash_count}\n"
-        f"Hangs          : {hang_count}\n"
-    )
-    summary_file.write_text(summary)
-    print(summary)
+    global SCHEDULER, FEEDBACK
+    parser = add_campaign_args(argparse.ArgumentParser(description="NRS (semi-smart): sanitised random flag-set search"))
+    parser.add_argument('--precheck', action='store_true',
+                        help="validate each flag set with 'clang -###' before compiling it")
+    args = parser.parse_args()
+    if args.schedule == 'yield':
+        SCHEDULER = SourceBandit(NUM_TEST_PROGRAMS, default_yield_path(CORPUS_DIR))
+    if args.coverage:
+        FEEDBACK = CoverageFeedback(OUTPUT_DIR, NUM_TEST_PROGRAMS)
+    FEATURES.update(load_or_scan(str(CORPUS_DIR)))
+    RULES.load_learned(LEARNED_RULES)
+    if INVALID_LOG.exists():
+        INVALID.update(mask_from_hex(l) for l in INVALID_LOG.read_text().split())
+    run_campaign(next_case, functools.partial(compile_with_flags, precheck=args.precheck,
+                                              coverage=args.coverage),
+                 PLUGIN_FLAGS, OUTPUT_DIR,
+                 DURATION_HOURS, REPEAT_LIMIT, jobs=args.jobs,
+                 resume=args.resume, checkpoint_every=args.checkpoint_every,
+                 timeouts=TimeoutModel.for_corpus(CORPUS_DIR, COMPILE_TIMEOUT) if args.adaptive_timeouts else None,
+                 scheduler=SCHEDULER, feedback=FEEDBACK,
+                 source_pattern=str(CORPUS_DIR / "test_{}.c"), on_invalid=record_invalid)
 
 if __name__ == '__main__':
     main()
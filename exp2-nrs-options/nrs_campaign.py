@@ -0,0 +1,259 @@
+"""
+Shared campaign loop for the NRS drivers (nrs.py, nrs-semi-smart.py).
+
+Each driver supplies how a test case is picked (source + flag set) and how it is
+compiled; this module runs the cases for the campaign duration, optionally with
+several compilations in flight at once (--jobs N), and writes every outcome to
+a compact results.bin log (result_log.py) plus the summary counters.
+
+Crashes whose compile function reports (Signature, stderr) as detail are
+bucketed live by stack signature (crash_signature.py) under
+<out_dir>/crash_buckets/, with one exemplar per distinct bucket.
+
+Every --checkpoint-every seconds the counters, the elapsed budget, the RNG
+state and the sizes of results.bin and of the crash bucket member list are
+written to <out_dir>/checkpoint.json. --resume continues from there: results.bin
+and the crash buckets are rolled back to the checkpoint and appended to, and
+only the remaining part of the budget is run.
+
+With --adaptive-timeouts each compile gets its source's timeout from the
+shared timeout model (timeout_model.py), which learns from every compile
+that finishes and is saved with each checkpoint.
+
+With --schedule yield the drivers pick sources with source_bandit.SourceBandit,
+which the campaign feeds with every outcome and saves with each checkpoint.
+
+With --coverage the drivers compile with the AFL-instrumented clang and return
+each compile's edge map; coverage_feedback.CoverageFeedback keeps the global
+virgin map and the queue of cases that reached new coverage.
+
+The old seeds_log.txt / crash_flags.txt / hang_flags.txt text logs can be
+regenerated with `result_log.py legacy <out_dir>/results.bin <out_dir>`.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from crash_signature import CrashBuckets
+from flag_table import mask_to_flags
+from result_log import ResultLog
+
+# What a driver's compile function returns; a bare outcome string is accepted too.
+# coverage: the compile's classified AFL edge map (afl_shm.py) in --coverage mode
+CompileResult = namedtuple('CompileResult', 'result rc detail coverage', defaults=(0, None, None))
+
+
+def add_campaign_args(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of compilations run at once (0 = one per CPU core)')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue the campaign from <out_dir>/checkpoint.json')
+    parser.add_argument('--checkpoint-every', type=float, default=300.0, metavar='SECONDS',
+                        help='seconds between checkpoints (default: 300)')
+    parser.add_argument('--adaptive-timeouts', action='store_true',
+                        help='per-source compile timeouts from the timeout model (timeout_model.py)')
+    parser.add_argument('--schedule', choices=('uniform', 'yield'), default='uniform',
+                        help='source selection: uniform, or weighted by crash/hang yield per '
+                             'CPU-second (source_bandit.py)')
+    parser.add_argument('--coverage', action='store_true',
+                        help='compile with the AFL-instrumented clang (INSTRUMENTED_CLANG_PATH) and '
+                             'mutate cases that reach new edges (coverage_feedback.py)')
+    return parser
+
+
+def save_checkpoint(path: Path, state: dict):
+    """Writes the checkpoint atomically, so a reboot mid-write leaves the previous one."""
+    state = dict(state, rng_state=random.getstate(), saved_at=datetime.now().isoformat())
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: Path) -> dict:
+    state = json.loads(path.read_text())
+    version, internal, gauss = state['rng_state']
+    random.setstate((version, tuple(internal), gauss))
+    return state
+
+
+def timed_compile(compile_fn, src: Path, out_name: str, mask: int, timeout=None):
+    """Runs one compilation inside a pool worker; returns (CompileResult, worker_pid, seconds)."""
+    start = time.monotonic()
+    if timeout is None:
+        res = compile_fn(src, out_name, mask)
+    else:
+        res = compile_fn(src, out_name, mask, timeout=timeout)
+    if isinstance(res, str):
+        res = CompileResult(res)
+    return res, os.getpid(), time.monotonic() - start
+
+
+def run_campaign(next_case, compile_fn, plugin_flags: list[str], output_dir: Path,
+                 duration_hours: float, repeat_limit: float, jobs: int = 1,
+                 on_invalid=None, source_pattern: str = "test_{}.c",
+                 resume: bool = False, checkpoint_every: float = 300.0, timeouts=None,
+                 scheduler=None, feedback=None):
+    """
+    next_case()  -> (src_idx, src_path, mask), called once per iteration
+    compile_fn(src_path, out_name, mask) -> CompileResult (or just its outcome string)
+                  outcome: 'success' | 'crash' | 'hang' | 'invalid'
+    A crash's detail may be (crash_signature.Signature, stderr excerpt); such
+    crashes are bucketed and the first of each bucket kept as its exemplar.
+    on_invalid(mask, detail) is called for sets a driver-side precheck rejected;
+    those never reached a full compile and are logged with outcome 'invalid'.
+    source_pattern: str.format pattern of the source path for a src_idx (log header).
+
+    Flag sets travel as flag_table bitmasks; compile_fn expands them to argv.
+
+    New cases are only started before the deadline; compilations already in
+    flight when it passes are waited for and logged, as in the serial loop.
+
+    resume: continue from output_dir/checkpoint.json (counters, RNG state,
+    elapsed budget); results logged and crashes bucketed after that checkpoint
+    are discarded.
+    timeouts: optional timeout_model.TimeoutModel; compile_fn then also gets a
+    timeout= keyword with the source's timeout in seconds.
+    scheduler: optional source_bandit.SourceBandit that next_case() picks from;
+    it is updated with every outcome here.
+    feedback: optional coverage_feedback.CoverageFeedback that next_case() draws
+    from; fed with every CompileResult.coverage map here.
+    """
+    jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+    crash_count = hang_count = invalid_count = 0
+    iterations = 0
+    elapsed_before = 0.0
+    # worker pid -> [finished compilations, busy seconds]
+    worker_stats = {}
+
+    # Log files
+    result_log = output_dir / 'results.bin'
+    summary_file = output_dir / 'summary_counters.txt'
+    checkpoint_file = output_dir / 'checkpoint.json'
+
+    log_size = buckets_size = None
+    if resume:
+        if not checkpoint_file.exists():
+            sys.exit(f"[!]--resume: no checkpoint found at {checkpoint_file}")
+        state = load_checkpoint(checkpoint_file)
+        iterations = state['iterations']
+        crash_count, hang_count, invalid_count = state['crashes'], state['hangs'], state['invalid']
+        elapsed_before = state['elapsed']
+        log_size = state['log_size']
+        buckets_size = state.get('buckets_size')   # absent in checkpoints of older runs
+        if feedback:
+            feedback.load()
+        print(f"[*]Resuming from {checkpoint_file} ({state['saved_at']}): {iterations} iterations, "
+              f"{elapsed_before / 3600:.2f}h of {duration_hours}h used")
+
+    resumed_at = iterations
+    started = time.monotonic()
+    deadline = datetime.now() + timedelta(hours=duration_hours) - timedelta(seconds=elapsed_before)
+    next_checkpoint = started + checkpoint_every
+    buckets = CrashBuckets(str(output_dir / 'crash_buckets'), append=resume, truncate_at=buckets_size)
+
+    with ResultLog(result_log, plugin_flags, source_pattern,
+                   append=resume, truncate_at=log_size) as log, \
+            ProcessPoolExecutor(max_workers=jobs) as pool:
+        in_flight = {}
+        # Only finished cases are checkpointed; in-flight ones are redrawn after a resume
+        completed = iterations
+
+        def checkpoint():
+            log.flush()
+            buckets.save()
+            if timeouts:
+                timeouts.save()
+            if scheduler:
+                scheduler.save()
+            if feedback:
+                feedback.save()
+            save_checkpoint(checkpoint_file, {
+                'iterations': completed, 'crashes': crash_count, 'hangs': hang_count,
+                'invalid': invalid_count, 'elapsed': elapsed_before + time.monotonic() - started,
+                'log_size': log.tell(), 'buckets_size': buckets.tell(),
+            })
+
+        while True:
+            while (len(in_flight) < jobs and datetime.now() < deadline
+                   and iterations < repeat_limit):
+                iterations += 1
+                src_idx, src, mask = next_case()
+                test_id = f"iter{iterations}_src{src_idx}"
+                timeout = timeouts.timeout(src.name) if timeouts else None
+                fut = pool.submit(timed_compile, compile_fn, src, test_id, mask, timeout)
+                in_flight[fut] = (test_id, src_idx, src, mask)
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                test_id, src_idx, src, mask = in_flight.pop(fut)
+                res, pid, seconds = fut.result()
+                completed += 1
+                stats = worker_stats.setdefault(pid, [0, 0.0])
+                stats[0] += 1
+                stats[1] += seconds
+
+                result = res.result
+                log.write(src_idx, mask, result, seconds, res.rc)
+                if timeouts and result in ('success', 'crash'):
+                    timeouts.observe(src.name, seconds)
+                if scheduler:
+                    scheduler.update(src_idx, result, seconds, res.detail)
+                if feedback and res.coverage is not None:
+                    feedback.observe(src_idx, mask, res.coverage)
+                if result == 'invalid':
+                    invalid_count += 1
+                    if on_invalid:
+                        on_invalid(mask, res.detail)
+                elif result == 'crash':
+                    crash_count += 1
+                    if res.detail:
+                        sig, stderr = res.detail
+                        case = (f"Source File: {source_pattern.format(src_idx)}\n"
+                                f"Fixed Flags: {' '.join(plugin_flags)}\n"
+                                f"Flags: {' '.join(mask_to_flags(mask))}\n"
+                                f"Return Code: {res.rc}\n")
+                        if buckets.add(sig, test_id, stderr, case):
+                            print(f"[*]New crash bucket {sig.hash} ({sig.kind}): {sig.title}")
+                elif result == 'hang':
+                    hang_count += 1
+
+            if time.monotonic() >= next_checkpoint:
+                checkpoint()
+                next_checkpoint = time.monotonic() + checkpoint_every
+        checkpoint()
+
+    buckets.close()
+
+    # Write summary
+    wall = max(time.monotonic() - started, 1e-9)
+    summary = (
+        f"Total Iterations: {iterations}\n"
+        f"Crashes        : {crash_count}\n"
+        f"Hangs          : {hang_count}\n"
+        f"Invalid (pre)  : {invalid_count}\n"
+        f"Crash buckets  : {len(buckets.buckets)}\n"
+        f"Workers        : {jobs}\n"
+        f"Iterations/sec : {(iterations - resumed_at) / wall:.3f}\n"
+        f"Elapsed hours  : {(elapsed_before + wall) / 3600:.2f}\n"
+    )
+    for n, (pid, (count, busy)) in enumerate(sorted(worker_stats.items())):
+        summary += (f"  worker {n} (pid {pid}): {count} iterations, "
+                    f"{count / wall:.3f} it/s, busy {100.0 * busy / wall:.1f}%\n")
+    if feedback:
+        summary += (f"Edges covered  : {feedback.virgin.edge_count()}\n"
+                    f"Coverage queue : {len(feedback.queue)} ({feedback.retained} new this run)\n")
+    if scheduler:
+        summary += "Top-yield sources (distinct crashes + hangs per CPU-hour, pulls):\n"
+        for name, rate, pulls in scheduler.top():
+            summary += f"  {name}: {rate:.2f}/h, {pulls}\n"
+    summary_file.write_text(summary)
+    print(summary)
@@ -147,6 +147,10 @@ docker run -d --name rep02 --cpuset-cpus="3-5" \
 # tar -czvf exp21-nrs-result-rep4.tar.gz -C /users/user42/ rep04
 # tar -czvf exp21-nrs-result-rep5.tar.gz -C /users/user42/ rep05
 
+# for r in rep01 rep02 rep03 rep04 rep05; do
+#   docker run --rm -v /users/user42/$r:/users/user42/output-nrs nrs-img \
+#     python3 result_log.py legacy output-nrs/results.bin output-nrs
+# done
 # mkdir -p exp21-nrs-seeds
 # cp rep01/seeds_log.txt exp21-nrs-seeds/rep01_seeds
 # cp rep02/seeds_log.txt exp21-nrs-seeds/rep02_seeds
@@ -165,6 +169,12 @@ tar -czvf exp22-nrs-semi-smart-result-rep3.tar.gz -C /users/user42/ rep03
 tar -czvf exp22-nrs-semi-smart-result-rep4.tar.gz -C /users/user42/ rep04
 tar -czvf exp22-nrs-semi-smart-result-rep5.tar.gz -C /users/user42/ rep05
 
+# results.bin -> seeds_log.txt / crash_flags.txt / hang_flags.txt (result_log.py ships in the image)
+for r in rep01 rep02 rep03 rep04 rep05; do
+  docker run --rm -v /users/user42/$r:/users/user42/output-nrs nrs-img \
+    python3 result_log.py legacy output-nrs/results.bin output-nrs
+done
+
 mkdir -p exp22-nrs-semi-smart-seeds
 cp rep01/seeds_log.txt exp22-nrs-semi-smart-seeds/rep01_seeds
 cp rep02/seeds_log.txt exp22-nrs-semi-smart-seeds/rep02_seeds
@@ -0,0 +1,118 @@
+"""
+Yield-weighted source scheduling for the NRS drivers (--schedule yield).
+
+Uniform scheduling spends most compile time on sources that never crash under
+any flag set. SourceBandit treats each test_N.c as an arm whose reward is
+its crash/hang yield per CPU-second of compiling it, and picks sources by
+Thompson sampling: each arm's rate has a Gamma posterior
+
+    rate ~ Gamma(PRIOR_EVENTS + events, 1 / (PRIOR_SECONDS + seconds))
+
+so sources nobody has tried yet stay attractive until they have had some
+compile time, and a slow source needs proportionally more crashes to win.
+A fixed EXPLORE share of picks stays uniform, so no source is starved.
+
+events = distinct crash signatures (crash_signature.py) seen on the source,
+plus HANG_EVENTS if it ever hung: hangs have no signature to tell them apart,
+so they count as one bug however often they recur. Hitting the same bug again
+is not rewarded, so a source's rate decays once it stops producing new
+crashes (the hangs column keeps the raw count, for reporting only). Plain
+compile errors (signature kind 'error') are not rewarded at all. The table persists as
+<corpus_dir>.yield.tsv (SOURCE_YIELD overrides the location), so later
+campaigns start warm:
+
+  name  pulls  seconds  crashes  hangs  signatures (comma-separated)
+"""
+import os
+import random
+
+from crash_signature import is_compiler_crash
+
+COLUMNS = ("name", "pulls", "seconds", "crashes", "hangs", "signatures")
+PRIOR_EVENTS = 1.0
+PRIOR_SECONDS = 60.0
+HANG_EVENTS = 1
+EXPLORE = 0.1
+
+
+def default_yield_path(corpus_dir):
+    env = os.environ.get("SOURCE_YIELD")
+    if env:
+        return env
+    return os.path.normpath(str(corpus_dir)) + ".yield.tsv"
+
+
+class SourceBandit:
+    def __init__(self, num_sources, path, name_fmt="test_{}.c", explore=EXPLORE, rng=random):
+        self.path = path
+        self.names = [name_fmt.format(i) for i in range(num_sources)]
+        self.explore = explore
+        self.rng = rng
+        self.pulls = [0] * num_sources
+        self.seconds = [0.0] * num_sources
+        self.crashes = [0] * num_sources
+        self.hangs = [0] * num_sources
+        self.signatures = [set() for _ in range(num_sources)]
+        if os.path.isfile(path):
+            self.load()
+
+    def load(self):
+        index = {name: i for i, name in enumerate(self.names)}
+        with open(self.path) as f:
+            header = f.readline().rstrip("\n").split("\t")
+            if tuple(header) != COLUMNS:
+                raise ValueError(f"{self.path}: unexpected yield table header {header}")
+            for line in f:
+                name, pulls, seconds, crashes, hangs, sigs = line.rstrip("\n").split("\t")
+                i = index.get(name)
+                if i is not None:
+                    self.pulls[i], self.seconds[i] = int(pulls), float(seconds)
+                    self.crashes[i], self.hangs[i] = int(crashes), int(hangs)
+                    self.signatures[i] = set(filter(None, sigs.split(",")))
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write("\t".join(COLUMNS) + "\n")
+            for i, name in enumerate(self.names):
+                if self.pulls[i]:
+                    f.write(f"{name}\t{self.pulls[i]}\t{self.seconds[i]:.3f}\t"
+                            f"{self.crashes[i]}\t{self.hangs[i]}\t{','.join(sorted(self.signatures[i]))}\n")
+        os.replace(tmp, self.path)
+
+    def events(self, i):
+        return len(self.signatures[i]) + min(self.hangs[i], HANG_EVENTS)
+
+    def pick(self) -> int:
+        """Index of the source to compile next."""
+        rng = self.rng
+        if rng.random() < self.explore:
+            return rng.randrange(len(self.names))
+        gamma = rng.gammavariate
+        best, best_rate = 0, -1.0
+        for i, secs in enumerate(self.seconds):
+            rate = gamma(PRIOR_EVENTS + self.events(i), 1.0 / (PRIOR_SECONDS + secs))
+            if rate > best_rate:
+                best, best_rate = i, rate
+        return best
+
+    def update(self, src_idx, result, seconds, detail=None):
+        """Folds in one finished case; result/detail as in nrs_campaign.CompileResult."""
+        if result == 'invalid':
+            return
+        self.pulls[src_idx] += 1
+        self.seconds[src_idx] += seconds
+        if result == 'hang':
+            self.hangs[src_idx] += 1
+        elif result == 'crash':
+            sig = detail[0] if detail else None
+            if sig is None or is_compiler_crash(sig):
+                # crashes a driver reports without a signature share one bucket
+                self.signatures[src_idx].add(sig.hash if sig else "unsigned")
+                self.crashes[src_idx] += 1
+
+    def top(self, n=10):
+        """(name, events per CPU-hour, pulls) of the best-yielding sources so far."""
+        rates = [(self.events(i) * 3600.0 / s if s else 0.0, i) for i, s in enumerate(self.seconds)]
+        rates.sort(reverse=True)
+        return [(self.names[i], rate, self.pulls[i]) for rate, i in rates[:n] if rate > 0]
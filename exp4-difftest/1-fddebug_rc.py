@@ -1,18 +1,27 @@
 #!/usr/bin/env python3
 import pandas as pd
-import subprocess
 import json
+import os
 import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# fddebug_min.py sits next to this script; its minimisation runs in-process in the workers
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+import fddebug_min
 
 # Paths and parameters
 CSV_IN = '/users/user42/difftest/hash1-mismatches_return‑code_analysis.csv'
 CSV_OUT = '/users/user42/difftest/hash1-mismatches_return‑code_analysis_min_combs.csv'
-SCRIPT = './fddebug_min.py'
-COMBO_SIZES = '1,2,3'
+# One JSON line per minimised (program, flags, clang version), appended as each finishes.
+# A restart reads it back and only minimises what is missing; delete it to start over.
+PROGRESS = CSV_OUT + '.progress.jsonl'
+COMBO_SIZES = os.environ.get('COMBO_SIZES', '1,2,3')   # or 'ddmin'
+JOBS = int(os.environ.get('JOBS', os.cpu_count() or 1))
+SAVE_EVERY = 60   # seconds between rewrites of CSV_OUT while the pool runs
+CRASH_RCS = ("[134]", "[139]")
 
-# Load DataFrame
-df = pd.read_excel(EXCEL_IN)
-print(f'Loaded {len(df)} rows from {EXCEL_IN}')
 # Function to extract program number
 prog_no_pattern = re.compile(r'(\d+)')
 
@@ -23,35 +32,83 @@ def get_prog_no(name):
 # Columns to process
 clang_versions = [17, 19, 22]
 
-# Initialize columns
-dtype_obj = pd.Series(dtype='object')
-for ver in clang_versions:
-    df[f'Min_Flag_comb_clang{ver}'] = dtype_obj.copy()
+def load_progress(path):
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue   # torn last line of an interrupted run
+                done[rec['program'], rec['flags'], rec['clang']] = rec['min_flags']
+    return done
+
+def save(df):
+    tmp = CSV_OUT + '.tmp'
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, CSV_OUT)
+
+def minimize_task(task):
+    """Runs in a pool worker: (task, JSON min_flags or None on failure)."""
+    idx, prog, prog_no, ver, flags = task
+    try:
+        data = fddebug_min.minimize(str(ver), prog_no, COMBO_SIZES, flags.split())
+    except Exception as e:
+        print(f'  {prog} clang-{ver} failed: {e}')
+        return task, None
+    return task, json.dumps(data['min_flags'])
+
+def main():
+    # Load DataFrame
+    df = pd.read_csv(CSV_IN)
+    print(f'Loaded {len(df)} rows from {CSV_IN}')
 
-# Iterate rows
-for idx, row in df.iterrows():
-    prog = row['program']
-    prog_no = get_prog_no(prog)
-    print(f'Processing {prog} (No: {prog_no})')
+    # Initialize columns
+    dtype_obj = pd.Series(dtype='object')
     for ver in clang_versions:
-        rc = row.get(f'exec_rc_clang-{ver}', 0)
-        print(f'  Clang-{ver} return code: {rc}')
-        if rc=="[134]" or rc=="[139]":
-            # Build command
-            cmd = [
-                SCRIPT,
-                str(ver),
-                prog_no,
-                COMBO_SIZES,
-            ] + row['flags'].split()
-            try:
-                out = subprocess.check_output(cmd, universal_newlines=True, stderr=subprocess.DEVNULL)
-                data = json.loads(out)
-                print(f'Processed {prog} with clang-{ver}: {data}')
-                df.at[idx, f'Min_Flag_comb_clang{ver}'] = json.dumps(data['min_flags'])
-            except subprocess.CalledProcessError:
+        df[f'Min_Flag_comb_clang{ver}'] = dtype_obj.copy()
+
+    # Crashing (row, version) pairs, minus those a previous run already finished
+    done = load_progress(PROGRESS)
+    tasks, resumed = [], 0
+    for idx, row in df.iterrows():
+        prog = row['program']
+        for ver in clang_versions:
+            rc = row.get(f'exec_rc_clang-{ver}', 0)
+            if rc not in CRASH_RCS:
+                continue
+            key = (prog, row['flags'], ver)
+            if key in done:
+                df.at[idx, f'Min_Flag_comb_clang{ver}'] = done[key]
+                resumed += 1
+            else:
+                tasks.append((idx, prog, get_prog_no(prog), ver, row['flags']))
+    # Longest flag lists first, so the slowest minimisations do not trail at the end
+    tasks.sort(key=lambda t: len(t[4].split()), reverse=True)
+    print(f'{len(tasks)} crashing (program, clang) pairs to minimise, {resumed} done in a previous run, '
+          f'{JOBS} workers, combo sizes {COMBO_SIZES}')
+
+    last_save = time.monotonic()
+    with open(PROGRESS, 'a') as progress, ProcessPoolExecutor(max_workers=JOBS) as pool:
+        futures = [pool.submit(minimize_task, t) for t in tasks]
+        for n, future in enumerate(as_completed(futures), 1):
+            (idx, prog, prog_no, ver, flags), min_flags = future.result()
+            if min_flags is None:
                 df.at[idx, f'Min_Flag_comb_clang{ver}'] = ''
+            else:
+                df.at[idx, f'Min_Flag_comb_clang{ver}'] = min_flags
+                progress.write(json.dumps({'program': prog, 'flags': flags, 'clang': ver,
+                                           'min_flags': min_flags}) + '\n')
+                progress.flush()
+            print(f'[{n}/{len(tasks)}] Processed {prog} with clang-{ver}: {min_flags}')
+            if time.monotonic() - last_save >= SAVE_EVERY:
+                save(df)
+                last_save = time.monotonic()
+
+    # Save to new CSV
+    save(df)
+    print(f'Updated CSV saved to {CSV_OUT}')
 
-# Save to new CSV
-df.to_csv(CSV_OUT, index=False)
-print(f'Updated CSV saved to {CSV_OUT}')
+if __name__ == '__main__':
+    main()
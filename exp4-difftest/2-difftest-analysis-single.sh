@@ -43,6 +43,19 @@ COMMON_FLAGS=(
   -I"$HOME/llvmSS-include"
 )
 
+# Per-source compile timeouts (FuzzdFlags-tool/timeout_model.py baseline ...), capped at
+# COMPILE_TIMEOUT; sources missing from the model keep COMPILE_TIMEOUT
+TIMEOUT_MODEL="${TIMEOUT_MODEL:-/users/user42/llvmSS-minimised-corpus.timeouts.tsv}"
+FUZZDFLAGS_TOOL_DIR="${FUZZDFLAGS_TOOL_DIR:-$(dirname "$(readlink -f "$0")")/../FuzzdFlags-tool}"
+declare -A COMPILE_TIMEOUTS=()
+if [[ -f "$TIMEOUT_MODEL" ]]; then
+  while IFS=$'\t' read -r name secs; do
+    COMPILE_TIMEOUTS[$name]=$secs
+  done < <(python3 "$FUZZDFLAGS_TOOL_DIR/timeout_model.py" export "$TIMEOUT_MODEL" --ceiling "$COMPILE_TIMEOUT")
+  echo "Loaded ${#COMPILE_TIMEOUTS[@]} compile timeouts from $TIMEOUT_MODEL"
+fi
+COMPILE_TIMEOUT="${COMPILE_TIMEOUTS[test_${no}.c]:-$COMPILE_TIMEOUT}"
+
 # ─── compile each version ──────────────────────────────────────────────────────
 echo "=== Compiling test_${no}.c with Clang-17,19,22 ==="
 timeout "$COMPILE_TIMEOUT" "$COMP17" "${COMMON_FLAGS[@]}" "${flags[@]}" -o "$BIN17" "$SRC" 
@@ -41,6 +41,18 @@ PROGRAMS=( "$HOME"/llvmSS-minimised-corpus/*.c )
 TOTAL=${#PROGRAMS[@]}
 echo "Found $TOTAL programs to test in ~/llvmSS-minimised-corpus."
 
+# Per-source compile timeouts (FuzzdFlags-tool/timeout_model.py baseline ...), capped at
+# COMPILE_TIMEOUT; sources missing from the model keep COMPILE_TIMEOUT
+TIMEOUT_MODEL="${TIMEOUT_MODEL:-$HOME/llvmSS-minimised-corpus.timeouts.tsv}"
+FUZZDFLAGS_TOOL_DIR="${FUZZDFLAGS_TOOL_DIR:-$(dirname "$(readlink -f "$0")")/../FuzzdFlags-tool}"
+declare -A COMPILE_TIMEOUTS=()
+if [[ -f "$TIMEOUT_MODEL" ]]; then
+  while IFS=$'\t' read -r name secs; do
+    COMPILE_TIMEOUTS[$name]=$secs
+  done < <(python3 "$FUZZDFLAGS_TOOL_DIR/timeout_model.py" export "$TIMEOUT_MODEL" --ceiling "${COMPILE_TIMEOUT%s}")
+  echo "Loaded ${#COMPILE_TIMEOUTS[@]} compile timeouts from $TIMEOUT_MODEL"
+fi
+
 # ─── 4) Prepare output directories ────────────────────────────────────
 BASELOG="golden_reference"
 rm -rf "$BASELOG"
@@ -66,13 +78,15 @@ for SRC in "${PROGRAMS[@]}"; do
     
     # 5a) Compile, capture stdout/stderr
     echo "[ $LABEL ] Compiling..."
-    timeout $COMPILE_TIMEOUT "$COMP" "${COMMON_FLAGS[@]}" -o "$BIN" "$SRC" \
+    timeout "${COMPILE_TIMEOUTS[$NAME.c]:-$COMPILE_TIMEOUT}" "$COMP" "${COMMON_FLAGS[@]}" -o "$BIN" "$SRC" \
       >"$OUTDIR/compile.stdout" \
       2>"$OUTDIR/compile.stderr"
     comp_rc[$LABEL]=$?
     
     # 5b) Run only if compile succeeded
     if [ "${comp_rc[$LABEL]}" -eq 0 ]; then
+        # The literal argv[1] grep, not corpus_index.py's looser argv1 column: the
+        # golden run arguments must stay those of earlier golden results
         if grep -q "argv\\[1\\]" "$SRC"; then
             ARGS="1000000"
         else
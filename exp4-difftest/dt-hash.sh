@@ -1,4 +1,11 @@
 #!/usr/bin/env bash
+# The loop below is kept as the reference implementation; dt_hash.py produces the same
+# CSV, hashing the outputs from the pipes instead of writing them under runs_hash/, and
+# keeps the outputs of mismatching rows in a blob store. DT_HASH_LEGACY=1 runs this loop.
+# PYTHONCOERCECLOCALE=0: the compilers see this shell's locale (it changes their messages)
+if [[ "${DT_HASH_LEGACY:-0}" != 1 ]]; then
+  PYTHONCOERCECLOCALE=0 exec python3 "$(dirname "$(readlink -f "$0")")/dt_hash.py" "$@"
+fi
 # Base path for sources and includes
 BASE_DIR="$HOME"
 CORPUS_DIR="$BASE_DIR/llvmSS-minimised-corpus"
@@ -35,6 +42,39 @@ SEEDS_FILE="/users/user42/unique_pairs.csv"
 OUTPUT_CSV="seed_results_1000000_hash.csv"
 LOG_ROOT="runs_hash"
 
+# Per-source feature index (FuzzdFlags-tool/corpus_index.py build "$CORPUS_DIR"),
+# loaded once instead of grepping every source for argv[1]
+CORPUS_INDEX="${CORPUS_INDEX:-$CORPUS_DIR.features.tsv}"
+declare -A USES_ARGV1=()
+if [[ -f "$CORPUS_INDEX" ]]; then
+  while IFS=$'\t' read -r name _size _asm _typeof argv1 _libm _o0_ms; do
+    USES_ARGV1[$name]=$argv1
+  done < <(tail -n +2 "$CORPUS_INDEX")
+  echo "Loaded ${#USES_ARGV1[@]} entries from $CORPUS_INDEX"
+fi
+
+# Per-source compile timeouts (FuzzdFlags-tool/timeout_model.py baseline ...), capped at
+# COMPILE_TIMEOUT; sources missing from the model keep COMPILE_TIMEOUT
+TIMEOUT_MODEL="${TIMEOUT_MODEL:-$CORPUS_DIR.timeouts.tsv}"
+FUZZDFLAGS_TOOL_DIR="${FUZZDFLAGS_TOOL_DIR:-$(dirname "$(readlink -f "$0")")/../FuzzdFlags-tool}"
+declare -A COMPILE_TIMEOUTS=()
+if [[ -f "$TIMEOUT_MODEL" ]]; then
+  while IFS=$'\t' read -r name secs; do
+    COMPILE_TIMEOUTS[$name]=$secs
+  done < <(python3 "$FUZZDFLAGS_TOOL_DIR/timeout_model.py" export "$TIMEOUT_MODEL" --ceiling "$COMPILE_TIMEOUT")
+  echo "Loaded ${#COMPILE_TIMEOUTS[@]} compile timeouts from $TIMEOUT_MODEL"
+fi
+
+# Shared outcome cache (FuzzdFlags-tool/outcome_cache.py): a (compiler, source, flags)
+# any earlier run or driver compiled is not compiled again; OUTCOME_CACHE=off disables it
+OUTCOME_CACHE_PY="$FUZZDFLAGS_TOOL_DIR/outcome_cache.py"
+USE_CACHE=1
+[[ "${OUTCOME_CACHE:-}" == off ]] && USE_CACHE=0
+# Hashes of the placeholder exec outputs written when a program does not compile
+SKIP_STDOUT_HASH=$(echo "" | sha256sum | cut -d' ' -f1)
+SKIP_STDERR_HASH=$(echo "<skipped>" | sha256sum | cut -d' ' -f1)
+now_ms() { echo $(( $(date +%s%N) / 1000000 )); }
+
 # Clean old output
 rm -f "$OUTPUT_CSV"
 mkdir -p "$LOG_ROOT"
@@ -60,8 +100,10 @@ tail -n +2 "$SEEDS_FILE" | while IFS=, read -r source_file flags_field; do
     continue
   fi
 
-  # Determine if we need an argv[1] argument
-  if grep -qE '\bargv[[:space:]]*\[\s*1\s*\]' "$src_path"; then
+  # Determine if we need an argv[1] argument (index first, grep if not indexed)
+  if [[ -n "${USES_ARGV1[$prog.c]:-}" ]]; then
+    USE_ARG=${USES_ARGV1[$prog.c]}
+  elif grep -qE '\bargv[[:space:]]*\[\s*1\s*\]' "$src_path"; then
     USE_ARG=1
   else
     USE_ARG=0
@@ -80,6 +122,35 @@ tail -n +2 "$SEEDS_FILE" | while IFS=, read -r source_file flags_field; do
     ((count++))
     echo "[$count] $prog @ $label"
 
+    compile_timeout="${COMPILE_TIMEOUTS[$prog.c]:-$COMPILE_TIMEOUT}"
+    run_args=""
+    [[ $USE_ARG -eq 1 ]] && run_args="1000000"
+
+    # Outcome and output hashes from the cache when this exact compile + run was done before
+    if [[ $USE_CACHE -eq 1 ]] && hit=$(python3 "$OUTCOME_CACHE_PY" lookup "$clang_bin" "$src_path" "$run_args" \
+          --compile-timeout "$compile_timeout" --exec-timeout "$EXEC_TIMEOUT" \
+          --need compile_stdout --need compile_stderr --need exec_stdout --need exec_stderr \
+          -- "${COMMON_FLAGS[@]}" "${flags_array[@]}"); then
+      declare -A cached=()
+      read -r c_rc e_rc rest <<< "$hit"
+      for kv in $rest; do cached[${kv%%=*}]=${kv#*=}; done
+      csout=${cached[compile_stdout]}
+      cserr=${cached[compile_stderr]}
+      if [[ $e_rc == "-" ]]; then
+        e_rc=124
+        esout=$SKIP_STDOUT_HASH
+        eserr=$SKIP_STDERR_HASH
+      else
+        esout=${cached[exec_stdout]}
+        eserr=${cached[exec_stderr]}
+      fi
+      unset cached
+      printf '"%s","%s","%s",%d,"%s","%s",%d,"%s","%s"\n' \
+        "$prog" "$flags_field" "$label" $c_rc "$csout" "$cserr" $e_rc "$esout" "$eserr" \
+        >> "$OUTPUT_CSV"
+      continue
+    fi
+
     # Create log directory
     run_id=$(printf '%s' "$flags_field" | sha256sum | cut -c1-12)
     run_dir="$LOG_ROOT/$prog/$label/$run_id"
@@ -88,10 +159,12 @@ tail -n +2 "$SEEDS_FILE" | while IFS=, read -r source_file flags_field; do
     compile_stdout="$run_dir/compile.stdout"
     compile_stderr="$run_dir/compile.stderr"
 
-    timeout $COMPILE_TIMEOUT "$clang_bin" "${COMMON_FLAGS[@]}" "${flags_array[@]}" \
+    start_ms=$(now_ms)
+    timeout "$compile_timeout" "$clang_bin" "${COMMON_FLAGS[@]}" "${flags_array[@]}" \
       -o "$run_dir/$prog" "$src_path" \
       >"$compile_stdout" 2>"$compile_stderr"
     c_rc=$?
+    c_ms=$(( $(now_ms) - start_ms ))
 
     #  Compute hashes of compile outputs
     csout=$(sha256sum "$compile_stdout" | cut -d' ' -f1)
@@ -103,13 +176,16 @@ tail -n +2 "$SEEDS_FILE" | while IFS=, read -r source_file flags_field; do
     # Execute if compiled
     exec_stdout="$run_dir/exec.stdout"
     exec_stderr="$run_dir/exec.stderr"
+    e_ms=-
     if [[ $c_rc -eq 0 ]]; then
+      start_ms=$(now_ms)
       if [[ $USE_ARG -eq 1 ]]; then
         timeout $EXEC_TIMEOUT "$run_dir/$prog" 1000000 >"$exec_stdout" 2>"$exec_stderr"
       else
         timeout $EXEC_TIMEOUT "$run_dir/$prog" >"$exec_stdout" 2>"$exec_stderr"
       fi
       e_rc=$?
+      e_ms=$(( $(now_ms) - start_ms ))
     else
       e_rc=124
       echo "" >"$exec_stdout"  # empty
@@ -120,6 +196,19 @@ tail -n +2 "$SEEDS_FILE" | while IFS=, read -r source_file flags_field; do
     esout=$(sha256sum "$exec_stdout" | cut -d' ' -f1)
     eserr=$(sha256sum "$exec_stderr" | cut -d' ' -f1)
 
+    # Record everything but timeouts in the outcome cache
+    if [[ $USE_CACHE -eq 1 && $c_rc -ne 124 && ( $c_rc -ne 0 || $e_rc -ne 124 ) ]]; then
+      exec_rc_arg=-
+      hash_args=(--hash "compile_stdout=$csout" --hash "compile_stderr=$cserr")
+      if [[ $c_rc -eq 0 ]]; then
+        exec_rc_arg=$e_rc
+        hash_args+=(--hash "exec_stdout=$esout" --hash "exec_stderr=$eserr")
+      fi
+      python3 "$OUTCOME_CACHE_PY" record "$clang_bin" "$src_path" "$run_args" \
+        "$c_rc" "$c_ms" "$exec_rc_arg" "$e_ms" "${hash_args[@]}" \
+        -- "${COMMON_FLAGS[@]}" "${flags_array[@]}"
+    fi
+
     # Append to CSV using printf for robust quoting
     printf '"%s","%s","%s",%d,"%s","%s",%d,"%s","%s"\n' \
       "$prog" "$flags_field" "$label" $c_rc "$csout" "$cserr" $e_rc "$esout" "$eserr" \
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+dt_hash.py - streaming runner of dt-hash.sh.
+
+Usage:
+  dt-hash.sh [--jobs N]      (runs this script unless DT_HASH_LEGACY=1)
+  PYTHONCOERCECLOCALE=0 dt_hash.py [--jobs N]
+
+Compiles and runs every (program, flags) row of SEEDS_FILE with clang-17, -19
+and -22 and writes OUTPUT_CSV exactly as dt-hash.sh did (same columns, same
+rows in the same order, the same sha256 values). dt-hash.sh sent the four
+streams of every run (compile stdout/stderr, exec stdout/stderr) to files
+under runs_hash/ and ran sha256sum on each: four files and four extra
+processes per run. Here the streams are hashed as they are read from the
+pipes, and only their first CAPTURE_BYTES are held in memory.
+
+The outputs are kept only for rows that end up as a mismatch (the compile rc,
+exec rc or exec stdout of the three compilers differ, as in
+difftest_inconsistents_analysis.py): every stream of such a row goes to the
+content-addressed blob store LOG_ROOT/blobs (blob_store.py; an output many
+runs produced is stored once), and one JSON line per compiler goes to
+LOG_ROOT/mismatches.jsonl with the stream hashes to look them up by:
+
+  blob_store.py cat runs_hash/blobs <exec_stdout sha256>
+
+Runs any driver did before (outcome_cache.py) are not repeated; when such a
+run is part of a mismatch and its outputs are not in the blob store yet, it
+is run again to capture them. Up to --jobs compiles and runs (default: one
+per core) are in flight at once.
+
+Python coerces the C locale to C.UTF-8 for itself and for the processes it
+starts, and compiler messages depend on the locale (gcc quotes with ' or
+with curly quotes). PYTHONCOERCECLOCALE=0, as dt-hash.sh sets it, keeps the
+compile output hashes the same as those of the bash loop.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+# Shared FuzzdFlags modules (../FuzzdFlags-tool in a checkout)
+sys.path.insert(1, os.environ.get("FUZZDFLAGS_TOOL_DIR",
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FuzzdFlags-tool")))
+from blob_store import BlobStore
+from corpus_index import ARGV1_RE, default_index_path, load_index
+from outcome_cache import OutcomeCache
+from timeout_model import TimeoutModel
+
+# Base path for sources and includes
+BASE_DIR = os.path.expanduser("~")
+CORPUS_DIR = f"{BASE_DIR}/llvmSS-minimised-corpus"
+INCLUDE_DIR = f"{BASE_DIR}/llvmSS-include"
+
+# Compilers to test, in the order dt-hash.sh's associative array listed them
+COMPILERS = (
+    ("clang-22", f"{BASE_DIR}/llvm-latest-build/bin/clang-22"),
+    ("clang-19", f"{BASE_DIR}/llvm-19-build/bin/clang-19"),
+    ("clang-17", f"{BASE_DIR}/build/bin/clang-17"),
+)
+
+COMMON_FLAGS = [
+    "-std=gnu89",
+    "-fpermissive", "-w",
+    "-Wno-implicit-function-declaration",
+    "-Wno-implicit-int",
+    "-Wno-return-type",
+    "-Wno-builtin-declaration-mismatch",
+    "-Wno-int-conversion",
+    "-march=native",
+    "-lm",
+    "-I/usr/include",
+    f"-I{INCLUDE_DIR}",
+]
+
+COMPILE_TIMEOUT = 60   # ceiling for the per-source timeout from timeout_model.py
+EXEC_TIMEOUT = 30
+RUN_ARG = "1000000"
+
+SEEDS_FILE = "/users/user42/unique_pairs.csv"
+OUTPUT_CSV = "seed_results_1000000_hash.csv"
+LOG_ROOT = "runs_hash"
+CSV_HEADER = ("program,flags,compiler,compile_rc,compile_stdout_hash,compile_stderr_hash,"
+              "exec_rc,exec_stdout_hash,exec_stderr_hash")
+
+# Bytes of each stream held for the blob store; longer streams are hashed in full
+CAPTURE_BYTES = int(os.environ.get("DT_HASH_CAPTURE", str(1 << 20)))
+STREAMS = ("compile_stdout", "compile_stderr", "exec_stdout", "exec_stderr")
+# What dt-hash.sh wrote as exec output (with exec rc 124) when a program did not compile
+SKIPPED_EXEC = {"exec_stdout": b"\n", "exec_stderr": b"<skipped>\n"}
+TIMEOUT_RC = 124
+
+
+class Stream:
+    """sha256 of everything read from a pipe, and its first CAPTURE_BYTES."""
+
+    def __init__(self, data=b""):
+        self.sha = hashlib.sha256()
+        self.head = bytearray()
+        self.size = 0
+        if data:
+            self.feed(data)
+
+    def feed(self, chunk):
+        self.sha.update(chunk)
+        self.size += len(chunk)
+        if len(self.head) < CAPTURE_BYTES:
+            self.head += chunk[:CAPTURE_BYTES - len(self.head)]
+
+    @property
+    def complete(self):
+        return self.size == len(self.head)
+
+
+async def run_streams(cmd, timeout):
+    """(shell-style rc: 128+N for signal N, 124 on timeout; stdout Stream; stderr Stream; ms)."""
+    start = time.monotonic()
+    out, err = Stream(), Stream()
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE, start_new_session=True)
+    except OSError as e:
+        err.feed(f"{cmd[0]}: {e}\n".encode())
+        return 127, out, err, 0
+
+    async def pump(pipe, stream):
+        while True:
+            chunk = await pipe.read(65536)
+            if not chunk:
+                break
+            stream.feed(chunk)
+
+    try:
+        await asyncio.wait_for(asyncio.gather(pump(proc.stdout, out), pump(proc.stderr, err), proc.wait()),
+                               timeout)
+        rc = proc.returncode if proc.returncode >= 0 else 128 - proc.returncode
+    except asyncio.TimeoutError:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+        rc = TIMEOUT_RC
+    return rc, out, err, int((time.monotonic() - start) * 1000)
+
+
+def shell_rc_to_cache(rc):
+    return 128 - rc if rc > 128 else rc
+
+
+def cache_rc_to_shell(rc):
+    return 128 - rc if rc < 0 else rc
+
+
+class Runner:
+    def __init__(self, jobs, work_dir, blobs, index_path, cache):
+        self.slots = asyncio.Semaphore(jobs)
+        self.work_dir = work_dir
+        self.blobs = blobs
+        self.index = open(index_path, "w")
+        self.cache = cache
+        self.timeouts = TimeoutModel.for_corpus(CORPUS_DIR, COMPILE_TIMEOUT)
+        features_path = default_index_path(CORPUS_DIR)
+        self.features = load_index(features_path) if os.path.isfile(features_path) else {}
+        if self.features:
+            print(f"Loaded {len(self.features)} entries from {features_path}")
+        self.uses_argv1 = {}
+        self.counts = {"runs": 0, "cached": 0, "rerun": 0, "mismatch_rows": 0}
+
+    def run_args(self, prog, src_path):
+        name = prog + ".c"
+        if name not in self.uses_argv1:
+            if name in self.features:
+                self.uses_argv1[name] = self.features[name].argv1
+            else:
+                with open(src_path, "r", errors="replace") as f:
+                    self.uses_argv1[name] = bool(ARGV1_RE.search(f.read()))
+        return [RUN_ARG] if self.uses_argv1[name] else []
+
+    async def run_one(self, prog, src_path, flags, clang, fresh=False):
+        """{compile_rc, exec_rc, <stream>: sha256, streams: {<stream>: Stream} or None if cached}."""
+        compile_timeout = self.timeouts.timeout(prog + ".c")
+        run_args = self.run_args(prog, src_path)
+        key = self.cache.key(clang, src_path, COMMON_FLAGS + flags, run_args) if self.cache else None
+        if key and not fresh:
+            hit = self.cache.get(key, compile_timeout, EXEC_TIMEOUT, need=STREAMS)
+            if hit is not None:
+                self.counts["cached"] += 1
+                res = {"compile_rc": cache_rc_to_shell(hit.compile_rc), "streams": None}
+                if hit.exec_rc is None:
+                    res["exec_rc"] = TIMEOUT_RC
+                    res.update((k, hashlib.sha256(v).hexdigest()) for k, v in SKIPPED_EXEC.items())
+                else:
+                    res["exec_rc"] = cache_rc_to_shell(hit.exec_rc)
+                res.update((k, hit.hashes[k]) for k in STREAMS if k in hit.hashes)
+                return res
+
+        self.counts["runs"] += 1
+        workdir = tempfile.mkdtemp(dir=self.work_dir)
+        try:
+            exe = os.path.join(workdir, prog)
+            async with self.slots:
+                c_rc, c_out, c_err, c_ms = await run_streams(
+                    [clang, *COMMON_FLAGS, *flags, "-o", exe, src_path], compile_timeout)
+            streams = {"compile_stdout": c_out, "compile_stderr": c_err}
+            e_rc = e_ms = None
+            if c_rc == 0:
+                async with self.slots:
+                    e_rc, e_out, e_err, e_ms = await run_streams([exe, *run_args], EXEC_TIMEOUT)
+                streams.update(exec_stdout=e_out, exec_stderr=e_err)
+            else:
+                streams.update((k, Stream(v)) for k, v in SKIPPED_EXEC.items())
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        hashes = {k: s.sha.hexdigest() for k, s in streams.items()}
+        # Record everything but timeouts in the outcome cache (exec hashes only if it ran)
+        if key and c_rc != TIMEOUT_RC and e_rc != TIMEOUT_RC:
+            recorded = hashes if c_rc == 0 else {k: hashes[k] for k in ("compile_stdout", "compile_stderr")}
+            self.cache.put(key, shell_rc_to_cache(c_rc), c_ms,
+                           None if e_rc is None else shell_rc_to_cache(e_rc), e_ms, recorded)
+        return {"compile_rc": c_rc, "exec_rc": TIMEOUT_RC if e_rc is None else e_rc,
+                **hashes, "streams": streams}
+
+    async def run_row(self, prog, src_path, flags_field):
+        flags = flags_field.split()
+        results = await asyncio.gather(*(self.run_one(prog, src_path, flags, clang) for _, clang in COMPILERS))
+        if len({(r["compile_rc"], r["exec_rc"], r["exec_stdout"]) for r in results}) > 1:
+            self.counts["mismatch_rows"] += 1
+            for (label, clang), res in zip(COMPILERS, results):
+                if res["streams"] is None and not all(self.blobs.has(res[k], head=True) for k in STREAMS):
+                    # A cached run: its outputs were never kept, so run it again to capture them
+                    self.counts["rerun"] += 1
+                    again = await self.run_one(prog, src_path, flags, clang, fresh=True)
+                    if all(again[k] == res[k] for k in STREAMS):
+                        res["streams"] = again["streams"]
+                self.keep(prog, flags_field, label, res)
+        return prog, flags_field, results
+
+    def keep(self, prog, flags_field, label, res):
+        """Blob-stores the streams of one mismatching run and indexes them."""
+        truncated = []
+        for kind, stream in (res["streams"] or {}).items():
+            self.blobs.put(res[kind], bytes(stream.head), stream.complete)
+            if not stream.complete:
+                truncated.append(kind)
+        entry = {"program": prog, "flags": flags_field, "compiler": label,
+                 "compile_rc": res["compile_rc"], "exec_rc": res["exec_rc"],
+                 **{k: res[k] for k in STREAMS}}
+        if truncated:
+            entry["truncated"] = truncated
+        if res["streams"] is None and not all(self.blobs.has(res[k], head=True) for k in STREAMS):
+            entry["not_stored"] = True   # the rerun did not reproduce the cached outputs
+        self.index.write(json.dumps(entry) + "\n")
+        self.index.flush()
+
+    def close(self):
+        self.index.close()
+
+
+def read_seeds(path):
+    """(program, source path, flags field) per row, the way dt-hash.sh's read loop split them."""
+    with open(path, "r") as f:
+        next(f, None)
+        for line in f:
+            source_file, _, flags_field = line.rstrip("\n").partition(",")
+            source_file = source_file.removesuffix('"').removeprefix('"')
+            flags_field = flags_field.removesuffix('"').removeprefix('"')
+            prog = os.path.basename(source_file).removesuffix(".c")
+            yield prog, f"{CORPUS_DIR}/{prog}.c", flags_field
+
+
+async def run(runner, out, jobs):
+    count = 0
+
+    def write(row):
+        nonlocal count
+        prog, flags_field, results = row
+        for (label, _), r in zip(COMPILERS, results):
+            count += 1
+            print(f"[{count}] {prog} @ {label}")
+            out.write(f'"{prog}","{flags_field}","{label}",{r["compile_rc"]},"{r["compile_stdout"]}",'
+                      f'"{r["compile_stderr"]}",{r["exec_rc"]},"{r["exec_stdout"]}","{r["exec_stderr"]}"\n')
+        out.flush()
+
+    # Rows run concurrently; their CSV lines are written in seed order
+    window = max(1, 2 * jobs)
+    pending = []
+    for prog, src_path, flags_field in read_seeds(SEEDS_FILE):
+        if not os.path.isfile(src_path):
+            print(f"⚠️  Missing source {src_path}, skipping.")
+            continue
+        pending.append(asyncio.create_task(runner.run_row(prog, src_path, flags_field)))
+        while len(pending) >= window:
+            write(await pending.pop(0))
+    for task in pending:
+        write(await task)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-version hash difftest of seed (program, flags) rows")
+    parser.add_argument("--jobs", type=int, default=0, help="concurrent compiles/runs (0 = one per CPU core)")
+    args = parser.parse_args()
+    jobs = args.jobs or os.cpu_count() or 1
+
+    os.makedirs(LOG_ROOT, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="dt_hash-")
+    cache = OutcomeCache.default()
+    runner = Runner(jobs, work_dir, BlobStore(os.path.join(LOG_ROOT, "blobs")),
+                    os.path.join(LOG_ROOT, "mismatches.jsonl"), cache)
+    try:
+        with open(OUTPUT_CSV, "w") as out:
+            out.write(CSV_HEADER + "\n")
+            asyncio.run(run(runner, out, jobs))
+    finally:
+        runner.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    c = runner.counts
+    print(f"[*]{c['runs']} runs, {c['cached']} from the outcome cache, {c['mismatch_rows']} mismatching rows "
+          f"({c['rerun']} cached runs rerun to capture outputs, {runner.blobs.written} blobs written)")
+    print(f"✅ All runs complete; summary in {OUTPUT_CSV}")
+
+
+if __name__ == "__main__":
+    main()
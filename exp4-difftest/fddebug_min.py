@@ -1,9 +1,24 @@
 #!/usr/bin/env python3
-import sys, subprocess, itertools, os, json
+import sys, subprocess, itertools, os, json, time
+
+# Shared FuzzdFlags modules (../FuzzdFlags-tool in a checkout)
+sys.path.insert(1, os.environ.get("FUZZDFLAGS_TOOL_DIR",
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FuzzdFlags-tool")))
+from ddmin import CrashIndex, DeltaDebugger, ScratchDirs, ordered_map
+from flag_canon import canonical_flags
+from outcome_cache import OutcomeCache
+from timeout_model import TimeoutModel
 
 # Usage:
-#   ./fddebug_min.py <clang_path|17|19|22> <test_no> <combo_sizes> <flags...>
+#   ./fddebug_min.py [--jobs N] <clang_path|17|19|22> <test_no> <combo_sizes|ddmin> <flags...>
 # Outputs a JSON mapping of combo_size -> list of minimal crashing flag combinations.
+# With "ddmin" the full flag set is delta-debugged down to one 1-minimal crashing
+# combination (O(k log n) compiles instead of every combination of each size).
+# --jobs N tests N combinations at once, each worker in its own scratch directory.
+# Combinations containing a smaller crashing combination are skipped before compiling,
+# and combinations already compiled by any run (outcome_cache.py) are not compiled again.
+# The flags are first reduced to their canonical form (flag_canon.py): repeated and
+# overridden flags (-O2 ... -O3, -fwrapv ... -fno-wrapv) are dropped.
 
 # Constants (adjust paths if needed)
 BASE_DIR = "/users/user42"
@@ -12,70 +27,107 @@ INCLUDES_DIR = f"{BASE_DIR}/llvmSS-include"
 COMP17 = f"{BASE_DIR}/build/bin/clang-17"
 COMP19 = f"{BASE_DIR}/llvm-19-build/bin/clang-19"
 COMP22 = f"{BASE_DIR}/llvm-latest-build/bin/clang-22"
-COMPILE_TIMEOUT = 60
+COMPILE_TIMEOUT = 60   # ceiling for the per-source timeout from timeout_model.py
 EXEC_TIMEOUT = 30
 
-def is_crash(rc):
-    return (rc < 0) or (rc >= 128) or (rc == 124)
-
-# Parse args
-if len(sys.argv) < 5:
-    print("Usage: fddebug_min.py <clang_path|17|19|22> <test_no> <combo_sizes> <flags...>")
-    sys.exit(1)
-clang_arg = sys.argv[1]
-if clang_arg == "17": clang = COMP17
-elif clang_arg == "19": clang = COMP19
-elif clang_arg == "22": clang = COMP22
-else: clang = clang_arg
-
-test_no = sys.argv[2]
-test_file = os.path.join(CORPUS_DIR, f"test_{test_no}.c")
-combo_sizes = sorted({int(x) for x in sys.argv[3].split(",") if x.isdigit()})
-raw_flags = sys.argv[4:]
-
-# Deduplicate flags, preserving last occurrence order
-unique_flags = []
-seen = set()
-for f in raw_flags:
-    if f in seen:
-        unique_flags.remove(f)
-    seen.add(f)
-    unique_flags.append(f)
-
-constant_flags = [
+CONSTANT_FLAGS = [
     "-std=gnu89", "-fpermissive", "-w",
     "-Wno-implicit-function-declaration", "-Wno-implicit-int",
     "-Wno-return-type", "-Wno-builtin-redeclared", "-Wno-int-conversion",
     "-march=native", "-I/usr/include", "-lm", f"-I{INCLUDES_DIR}" ]
 
-# Container for minimal crashing combos
-minimal = {size: [] for size in combo_sizes}
-exe = "./_temp_fd.exe"
+def is_crash(rc):
+    return (rc < 0) or (rc >= 128) or (rc == 124)
 
-# Check each combination size in ascending order
-for size in combo_sizes:
-    crashing = []
-    for combo in itertools.combinations(unique_flags, size):
-        flags = list(combo)
+def resolve_clang(clang_arg):
+    return {"17": COMP17, "19": COMP19, "22": COMP22}.get(clang_arg, clang_arg)
+
+def minimize(clang_arg, test_no, combo_sizes_arg, raw_flags, jobs=1):
+    """
+    Minimal crashing flag combinations of test_<test_no>.c; returns the dict
+    printed as JSON (also imported by 1-fddebug_rc.py for batch runs).
+    """
+    clang = resolve_clang(clang_arg)
+    test_file = os.path.join(CORPUS_DIR, f"test_{test_no}.c")
+    use_ddmin = combo_sizes_arg == "ddmin"
+    combo_sizes = [] if use_ddmin else sorted({int(x) for x in combo_sizes_arg.split(",") if x.isdigit()})
+    compile_timeout = TimeoutModel.for_corpus(CORPUS_DIR, COMPILE_TIMEOUT).timeout(os.path.basename(test_file))
+    # Canonical form: no duplicates, no flags a later one overrides (flag_canon.py)
+    unique_flags = canonical_flags(raw_flags)
+
+    # Container for minimal crashing combos
+    minimal = {size: [] for size in combo_sizes}
+    # Private scratch directory per worker (two runs in one directory no longer share an exe)
+    scratch = ScratchDirs(prefix="fddebug_min-")
+    cache = OutcomeCache.default()
+
+    def crashes(flags):
+        key = cache.key(clang, test_file, CONSTANT_FLAGS + flags) if cache else None
+        hit = cache.get(key, compile_timeout, EXEC_TIMEOUT) if cache else None
+        if hit is not None:
+            return is_crash(hit.compile_rc if hit.compile_rc != 0 else hit.exec_rc)
+        workdir = scratch.get()
+        exe = os.path.join(workdir, "_temp_fd.exe")
         # compile
-        cmd = ["timeout", str(COMPILE_TIMEOUT), clang] + constant_flags + flags + [test_file, "-o", exe]
+        cmd = ["timeout", str(compile_timeout), clang] + CONSTANT_FLAGS + flags + [test_file, "-o", exe]
+        start = time.monotonic()
         cp = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        if cp.returncode != 0:
-            if is_crash(cp.returncode):
-                crashing.append(combo)
-            continue
-        # run
-        rp = subprocess.run(["timeout", str(EXEC_TIMEOUT), exe], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        if is_crash(rp.returncode):
-            crashing.append(combo)
-    # Filter out supersets of any smaller minimal combo
-    for combo in crashing:
-        if any(set(sm).issubset(combo) for sz in combo_sizes for sm in minimal.get(sz, []) if sz < size):
-            continue
-        minimal[size].append(list(combo))
-# Cleanup
-if os.path.exists(exe): os.remove(exe)
+        compile_ms = int((time.monotonic() - start) * 1000)
+        run_rc = run_ms = None
+        if cp.returncode == 0:
+            # run
+            start = time.monotonic()
+            rp = subprocess.run(["timeout", str(EXEC_TIMEOUT), exe], cwd=workdir,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            run_rc, run_ms = rp.returncode, int((time.monotonic() - start) * 1000)
+        if cache and 124 not in (cp.returncode, run_rc):
+            cache.put(key, cp.returncode, compile_ms, run_rc, run_ms)
+        return is_crash(cp.returncode if cp.returncode != 0 else run_rc)
+
+    compiles = 0
+    known = CrashIndex(unique_flags)
+    try:
+        if use_ddmin:
+            dd = DeltaDebugger(crashes, jobs)
+            try:
+                if dd.fails(unique_flags):
+                    found = dd.ddmin(unique_flags)
+                    minimal = {len(found): [found]}
+            finally:
+                dd.close()
+            compiles = dd.tests
+
+        # Check each combination size in ascending order; supersets of smaller minimal combos are never compiled
+        for size in combo_sizes:
+            combos = known.prune(itertools.combinations(unique_flags, size))
+            for combo, crashed in ordered_map(lambda c: crashes(list(c)), combos, jobs):
+                compiles += 1
+                if crashed:
+                    minimal[size].append(list(combo))
+            for combo in minimal[size]:
+                known.add(combo)
+    finally:
+        # Cleanup
+        scratch.close()
+
+    return {"clang": clang_arg, "test": test_no, "min_flags": minimal,
+            "strategy": "ddmin" if use_ddmin else "exhaustive", "compiles": compiles,
+            "skipped": known.skipped}
+
+def main():
+    # Parse args
+    argv = sys.argv[1:]
+    jobs = 1
+    if len(argv) >= 2 and argv[0] == "--jobs" and argv[1].isdigit():
+        jobs = max(1, int(argv[1]))
+        argv = argv[2:]
+    if len(argv) < 4:
+        print("Usage: fddebug_min.py [--jobs N] <clang_path|17|19|22> <test_no> <combo_sizes|ddmin> <flags...>")
+        sys.exit(1)
+
+    # Output results
+    result = minimize(argv[0], argv[1], argv[2], argv[3:], jobs)
+    print(json.dumps(result, indent=2))
 
-# Output results
-result = {"clang": clang_arg, "test": test_no, "min_flags": minimal}
-print(json.dumps(result, indent=2))
+if __name__ == "__main__":
+    main()
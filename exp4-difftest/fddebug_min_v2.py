@@ -1,10 +1,35 @@
 #!/usr/bin/env python3
-import sys, subprocess, os, json
+import sys, subprocess, os, json, time
+
+# Shared FuzzdFlags modules (../FuzzdFlags-tool in a checkout)
+sys.path.insert(1, os.environ.get("FUZZDFLAGS_TOOL_DIR",
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FuzzdFlags-tool")))
+from concurrent.futures import ThreadPoolExecutor
+
+from ddmin import ScratchDirs
+from outcome_cache import OutcomeCache
+from timeout_model import TimeoutModel
 
 # Usage (both supported):
-#   fddebug_min_v2.py <test_no> <RC17> <RC19> <RC22> <flags...>
-#   fddebug_min_v2.py <clang_path|17|19|22> <test_no> <RC17> <RC19> <RC22> <flags...>
-# Grows the ordered flag prefix until the cross-version RC triple (17,19,22) matches.
+#   fddebug_min_v2.py [--linear|--bisect] <test_no> <RC17> <RC19> <RC22> <flags...>
+#   fddebug_min_v2.py [--linear|--bisect] <clang_path|17|19|22> <test_no> <RC17> <RC19> <RC22> <flags...>
+# Finds the shortest ordered flag prefix whose cross-version RC triple (17,19,22) matches,
+# growing the prefix one flag at a time (--linear, the default).
+#
+# --bisect finds a match boundary instead, in about log2(n) prefixes rather
+# than up to n: a prefix that matches while the one a flag shorter does not.
+# That is the shortest match only if matching is monotone in the prefix
+# length (a match at 5, none at 6-29 and one again from 30 bisects to 30).
+# The boundary is compiled again to rule out a flaky result, and up to
+# VERIFY_PROBES prefixes below it, evenly spaced, are checked; if any of them
+# matches (or the full list does not, or the re-check fails) the prefixes are
+# grown as with --linear. The result is "min_matching_prefix" either way, and
+# "verified_minimal" says whether every shorter prefix is known not to match:
+# always with --linear, with --bisect only when the probes covered all of them.
+# The three compilers of a prefix run concurrently, each in a private scratch
+# directory. Prefixes any earlier run compiled are taken from the shared
+# outcome cache (outcome_cache.py) instead; "prefixes_compiled" counts only
+# those that were compiled.
 
 BASE_DIR = "/users/user42"
 CORPUS_DIR = f"{BASE_DIR}/llvmSS-minimised-corpus"
@@ -12,8 +37,13 @@ INCLUDES_DIR = f"{BASE_DIR}/llvmSS-include"
 COMP17 = f"{BASE_DIR}/build/bin/clang-17"
 COMP19 = f"{BASE_DIR}/llvm-19-build/bin/clang-19"
 COMP22 = f"{BASE_DIR}/llvm-latest-build/bin/clang-22"
-COMPILE_TIMEOUT = 60
+VERSIONS = (("17", COMP17), ("19", COMP19), ("22", COMP22))
+COMPILE_TIMEOUT = 60   # ceiling for the per-source timeout from timeout_model.py
 EXEC_TIMEOUT = 30
+VERIFY_PROBES = 4   # --bisect: prefixes below the boundary checked for an earlier match
+
+TIMEOUTS = TimeoutModel.for_corpus(CORPUS_DIR, COMPILE_TIMEOUT)
+CACHE = OutcomeCache.default()
 
 CONSTANT_FLAGS = [
     "-std=gnu89", "-fpermissive", "-w",
@@ -35,26 +65,38 @@ def dedupe_keep_last_order(raw_flags):
 def compile_with_flags(clang, flags, test_file, exe):
     if os.path.exists(exe):
         os.remove(exe)
-    cmd = ["timeout", str(COMPILE_TIMEOUT), clang] + CONSTANT_FLAGS + flags + [test_file, "-o", exe]
+    cmd = ["timeout", str(TIMEOUTS.timeout(os.path.basename(test_file))), clang] + CONSTANT_FLAGS + flags + [test_file, "-o", exe]
     cp = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     return cp.returncode
 
 def run_binary(exe):
-    rp = subprocess.run(["timeout", str(EXEC_TIMEOUT), exe],
+    rp = subprocess.run(["timeout", str(EXEC_TIMEOUT), exe], cwd=os.path.dirname(exe),
                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     return rp.returncode
 
-def effective_rc(clang, flags, test_file, tag):
-    exe = f"./_tmp_{tag}.exe"
+def effective_rc(clang, flags, test_file, workdir, fresh=False):
+    """((stage, rc), compiled): compiled is False when the outcome cache answered."""
+    compile_timeout = TIMEOUTS.timeout(os.path.basename(test_file))
+    key = CACHE.key(clang, test_file, CONSTANT_FLAGS + flags) if CACHE else None
+    hit = CACHE.get(key, compile_timeout, EXEC_TIMEOUT) if CACHE and not fresh else None
+    if hit is not None:
+        return (("compile", hit.compile_rc) if hit.compile_rc != 0 else ("exec", hit.exec_rc)), False
+    exe = os.path.join(workdir, "_tmp.exe")
+    start = time.monotonic()
     c_rc = compile_with_flags(clang, flags, test_file, exe)
+    c_ms = int((time.monotonic() - start) * 1000)
+    r_rc = r_ms = None
     try:
-        if c_rc != 0:
-            return ("compile", c_rc)
-        r_rc = run_binary(exe)
-        return ("exec", r_rc)
+        if c_rc == 0:
+            start = time.monotonic()
+            r_rc = run_binary(exe)
+            r_ms = int((time.monotonic() - start) * 1000)
     finally:
         if os.path.exists(exe):
             os.remove(exe)
+    if CACHE and 124 not in (c_rc, r_rc):
+        CACHE.put(key, c_rc, c_ms, r_rc, r_ms)
+    return (("compile", c_rc) if c_rc != 0 else ("exec", r_rc)), True
 
 def parse_expected(tok):
     tok = tok.strip()
@@ -70,30 +112,98 @@ def match_triple(got, want):
             return False
     return True
 
+class PrefixProbe:
+    """(stage, rc) per version for flag prefixes, the three compilers run at once; results cached by length."""
+
+    def __init__(self, flags, test_file, want):
+        self.flags = flags
+        self.test_file = test_file
+        self.want = want
+        self.results = {}
+        self.compiled = 0
+        self.scratch = ScratchDirs(prefix="fddebug_min_v2-")
+        self.pool = ThreadPoolExecutor(max_workers=len(VERSIONS))
+
+    def close(self):
+        self.pool.shutdown()
+        self.scratch.close()
+
+    def _one(self, clang, prefix, fresh):
+        return effective_rc(clang, prefix, self.test_file, self.scratch.get(), fresh)
+
+    def probe(self, i, fresh=False):
+        """fresh=True compiles again, bypassing this cache and the shared outcome cache."""
+        if fresh or i not in self.results:
+            prefix = self.flags[:i]
+            futures = [self.pool.submit(self._one, clang, prefix, fresh) for _, clang in VERSIONS]
+            done = [f.result() for f in futures]
+            self.results[i] = [res for res, _ in done]
+            if any(compiled for _, compiled in done):
+                self.compiled += 1
+        return self.results[i]
+
+    def matches(self, i, fresh=False):
+        return match_triple([rc for _, rc in self.probe(i, fresh)], self.want)
+
+def grow_search(probe, n):
+    """Shortest matching prefix length, growing one flag at a time (None if none matches)."""
+    return next((i for i in range(1, n + 1) if probe.matches(i)), None)
+
+def bisect_search(probe, n):
+    """
+    (length, verified) of a matching prefix whose prefix one flag shorter does
+    not match, found by bisection, or None: the full list does not match, the
+    boundary does not hold up when compiled again, or a sampled shorter prefix
+    matches (not monotone). verified: every shorter prefix was checked.
+    """
+    if n == 0 or not probe.matches(n):
+        return None
+    lo, hi = 0, n   # prefix lo does not match (0: the empty prefix), prefix hi does
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if probe.matches(mid):
+            hi = mid
+        else:
+            lo = mid
+    if not probe.matches(hi, fresh=True) or (lo > 0 and probe.matches(lo, fresh=True)):
+        return None
+    below = range(1, lo)
+    if len(below) > VERIFY_PROBES:
+        below = sorted({1 + (lo - 1) * k // VERIFY_PROBES for k in range(VERIFY_PROBES)})
+    if any(probe.matches(i) for i in below):
+        return None
+    return hi, len(below) == lo - 1
+
 def main():
-    if len(sys.argv) < 5:
-        print("Usage:\n  fddebug_min_v2.py <test_no> <RC17> <RC19> <RC22> <flags...>\n  fddebug_min_v2.py <clang|17|19|22> <test_no> <RC17> <RC19> <RC22> <flags...>")
+    args = sys.argv[1:]
+    linear = True
+    if args and args[0] in ("--linear", "--bisect"):
+        linear = args[0] == "--linear"
+        args = args[1:]
+
+    if len(args) < 4:
+        print("Usage:\n  fddebug_min_v2.py [--linear|--bisect] <test_no> <RC17> <RC19> <RC22> <flags...>\n  fddebug_min_v2.py [--linear|--bisect] <clang|17|19|22> <test_no> <RC17> <RC19> <RC22> <flags...>")
         sys.exit(1)
 
     # Flexible CLI parsing: detect whether first arg is test_no (digits) or a clang arg.
-    arg1 = sys.argv[1]
+    arg1 = args[0]
     use_short = arg1.isdigit()
 
     if use_short:
-        test_no = sys.argv[1]
-        exp17 = parse_expected(sys.argv[2])
-        exp19 = parse_expected(sys.argv[3])
-        exp22 = parse_expected(sys.argv[4])
-        raw_flags = sys.argv[5:]
+        test_no = args[0]
+        exp17 = parse_expected(args[1])
+        exp19 = parse_expected(args[2])
+        exp22 = parse_expected(args[3])
+        raw_flags = args[4:]
     else:
         # legacy/long form; clang_arg accepted but not needed (we always test 17/19/22)
         # still parse it for compatibility
-        clang_arg = sys.argv[1]
-        test_no = sys.argv[2]
-        exp17 = parse_expected(sys.argv[3])
-        exp19 = parse_expected(sys.argv[4])
-        exp22 = parse_expected(sys.argv[5])
-        raw_flags = sys.argv[6:]
+        clang_arg = args[0]
+        test_no = args[1]
+        exp17 = parse_expected(args[2])
+        exp19 = parse_expected(args[3])
+        exp22 = parse_expected(args[4])
+        raw_flags = args[5:]
 
     test_file = os.path.join(CORPUS_DIR, f"test_{test_no}.c")
     if not os.path.exists(test_file):
@@ -106,31 +216,42 @@ def main():
     found = None
     details = None
 
-    # Grow prefix: 1..len(flags)
-    for i in range(1, len(flags) + 1):
-        prefix = flags[:i]
-        st17, rc17 = effective_rc(COMP17, prefix, test_file, f"17_{i}")
-        st19, rc19 = effective_rc(COMP19, prefix, test_file, f"19_{i}")
-        st22, rc22 = effective_rc(COMP22, prefix, test_file, f"22_{i}")
-        got = [rc17, rc19, rc22]
-
-        if match_triple(got, want):
-            found = prefix
-            details = {
-                "stages": {"17": st17, "19": st19, "22": st22},
-                "rcs": {"17": rc17, "19": rc19, "22": rc22},
-                "prefix_len": i
-            }
-            break
+    probe = PrefixProbe(flags, test_file, want)
+    try:
+        strategy = "prefix-grow-cross-version"
+        length = None
+        verified = True
+        if not linear:
+            found_bisect = bisect_search(probe, len(flags))
+            if found_bisect is not None:
+                length, verified = found_bisect
+                strategy = "prefix-bisect-cross-version"
+        if length is None:
+            # Grow prefix: 1..len(flags) (prefixes already compiled come from the cache)
+            length = grow_search(probe, len(flags))
+    finally:
+        probe.close()
+
+    if length is not None:
+        found = flags[:length]
+        (st17, rc17), (st19, rc19), (st22, rc22) = probe.results[length]
+        details = {
+            "stages": {"17": st17, "19": st19, "22": st22},
+            "rcs": {"17": rc17, "19": rc19, "22": rc22},
+            "prefix_len": length
+        }
 
     out = {
         "test": test_no,
         "expected": {"17": exp17, "19": exp19, "22": exp22},
-        "strategy": "prefix-grow-cross-version",
+        "strategy": strategy,
         "deduped_flags": flags,
         "match_found": bool(found),
         "min_matching_prefix": (found or []),
-        "details": details
+        # False: a bisection boundary, shorter prefixes only sampled
+        "verified_minimal": verified if found else None,
+        "details": details,
+        "prefixes_compiled": probe.compiled
     }
     print(json.dumps(out, indent=2))
 
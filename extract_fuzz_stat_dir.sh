@@ -1,5 +1,7 @@
 #!/usr/bin/env bash
 #/users/user42/extract_fuzz_stat_dir.sh ~/fuzz_analaysis directory of rep1 rep2 rep3 rep4 rep5 rep6
+# For mean/CI across repetitions and experiments, and plot_data time series, see
+# FuzzdFlags-tool/campaign_stats.py (summary / series).
 workdir=$1
 fields=(
   corpus_count
@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FuzzdFlags-tool"))
+
+from crash_signature import CrashBuckets, Signature
+
+A = Signature("aaaa", "assert", "assertion a")
+B = Signature("bbbb", "stack", "crash in b")
+
+
+def test_resume_rolls_buckets_back_to_checkpoint(tmp_path):
+    root = str(tmp_path / "crash_buckets")
+    buckets = CrashBuckets(root, append=False)
+    buckets.add(A, "iter1", "stderr a", "case a")
+    buckets.save()
+    size = buckets.tell()   # checkpoint
+    buckets.add(A, "iter2", "stderr a", "case a")
+    buckets.add(B, "iter3", "stderr b", "case b")
+    buckets.close()
+
+    resumed = CrashBuckets(root, append=True, truncate_at=size)
+    assert resumed.buckets == {"aaaa": ["assert", 1, "assertion a"]}
+    assert not os.path.exists(os.path.join(root, "bbbb"))
+    # the replayed crashes are counted once
+    resumed.add(A, "iter2", "stderr a", "case a")
+    resumed.add(B, "iter3", "stderr b", "case b")
+    resumed.close()
+    with open(os.path.join(root, "members.tsv")) as f:
+        assert [line.split("\t")[1].strip() for line in f] == ["iter1", "iter2", "iter3"]
+    assert CrashBuckets(root).buckets["aaaa"][1] == 2
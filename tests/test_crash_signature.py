@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FuzzdFlags-tool"))
+
+from crash_signature import _is_noise, signature
+
+STACK = """PLEASE submit a bug report to https://github.com/llvm/llvm-project/issues/ and include the crash backtrace.
+Stack dump:
+0.\tProgram arguments: /users/user42/build-clang17/bin/clang -O2 test_1.c
+1.\t<eof> parser at end of file
+ #0 0x000055d0c1f2a1b2 llvm::sys::PrintStackTrace(llvm::raw_ostream&, int) (/b/bin/clang+0x2b2a1b2)
+ #1 0x000055d0c1f27f0e llvm::sys::RunSignalHandlers() (/b/bin/clang+0x2b27f0e)
+ #2 0x000055d0c1f2a85f SignalHandler(int) Signals.cpp:0:0
+ #3 0x00007f2d7e842520 (/lib/x86_64-linux-gnu/libc.so.6+0x42520)
+ #4 0x00007f2d7e8969fc __pthread_kill_implementation ./nptl/pthread_kill.c:44:76
+ #5 0x00007f2d7e842476 raise ./signal/../sysdeps/posix/raise.c:27:6
+ #6 0x00007f2d7e8287f3 abort ./stdlib/abort.c:81:7
+ #7 0x000055d0c2a1b2c3 {FRAME} (/b/bin/clang+0x361b2c3)
+ #8 0x000055d0c2a1c000 llvm::FPPassManager::runOnFunction(llvm::Function&) (/b/bin/clang+0x361c000)
+ #9 0x00007f2d7e829d90 __libc_start_call_main ./csu/../sysdeps/nptl/libc_start_call_main.h:58:16
+#10 0x000055d0c1a00ee5 _start (/b/bin/clang+0x2600ee5)
+"""
+
+
+def test_reporting_frames_are_noise():
+    for frame in ("llvm::sys::PrintStackTrace(llvm::raw_ostream&, int)", "SignalHandler(int)",
+                  "(anonymous namespace)::CrashRecoverySignalHandler(int)", "raise", "abort",
+                  "__libc_start_main", "_start", "llvm::CrashRecoveryContext::HandleExit(int)"):
+        assert _is_noise(frame), frame
+
+
+def test_compiler_frames_containing_noise_names_are_kept():
+    for frame in ("llvm::Attributor::abortIfNoProgress()", "clang::Parser::ParseRaiseStmt()",
+                  "llvm::LiveRange::find_start(llvm::SlotIndex)", "clang::Sema::raiseError(int)"):
+        assert not _is_noise(frame), frame
+
+
+def test_crashes_in_functions_with_noise_substrings_get_different_signatures():
+    a = signature(STACK.replace("{FRAME}", "llvm::Attributor::abortIfNoProgress()"), 139)
+    b = signature(STACK.replace("{FRAME}", "clang::Sema::raiseError(int)"), 139)
+    assert a.kind == b.kind == "stack"
+    assert a.title == "llvm::Attributor::abortIfNoProgress()"
+    assert a.hash != b.hash
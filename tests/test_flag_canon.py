@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FuzzdFlags-tool"))
+
+from flag_canon import canonical_flags, flag_group
+
+
+def test_overridden_flags_are_dropped():
+    assert canonical_flags(["-O2", "-fwrapv", "-O3", "-fno-wrapv"]) == ["-fno-wrapv", "-O3"]
+
+
+def test_mllvm_keeps_its_argument():
+    assert canonical_flags(["-mllvm", "-fwrapv", "-fno-wrapv"]) == ["-mllvm", "-fwrapv", "-fno-wrapv"]
+
+
+def test_separate_arg_pairs_stay_together_in_order():
+    flags = ["-O2", "-Xclang", "-disable-llvm-passes", "-fwrapv", "-x", "c",
+             "-mllvm", "-inline-threshold=0", "-O3", "-mllvm", "-O1"]
+    assert canonical_flags(flags) == ["-Xclang", "-disable-llvm-passes", "-x", "c",
+                                      "-mllvm", "-inline-threshold=0", "-mllvm", "-O1",
+                                      "-fwrapv", "-O3"]
+
+
+def test_separate_arg_flags_are_not_grouped():
+    assert flag_group("-mllvm") == (None, False)
+    assert flag_group("-Xclang") == (None, False)
@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+TOOL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "FuzzdFlags-tool")
+sys.path.insert(0, TOOL_DIR)
+
+from reference_store import ReferenceStore, load_store, source_digest
+
+RESULT = {"compile": "OK", "exec": "OK"}
+
+
+def key(source):
+    return "build", "config", os.path.basename(source), source_digest(source)
+
+
+def test_edited_source_is_not_reused(tmp_path):
+    src = tmp_path / "test_1.c"
+    src.write_text("int main(){return 0;}\n")
+    store = ReferenceStore(str(tmp_path / "refs.jsonl"))
+    store.put(key(str(src)), RESULT)
+    store.close()
+    assert ReferenceStore(store.path).get(key(str(src))) == RESULT
+
+    src.write_text("int main(){return 1;}\n")
+    os.utime(src, ns=(1, 1))
+    assert ReferenceStore(store.path).get(key(str(src))) is None
+
+
+def test_prune_drops_results_of_changed_sources(tmp_path):
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "test_1.c").write_text("int a;\n")
+    (corpus / "test_2.c").write_text("int b;\n")
+    compiler = tmp_path / "gcc"
+    compiler.write_text("")
+    from reference_store import compiler_build
+    build = compiler_build(str(compiler))
+    path = str(tmp_path / "refs.jsonl")
+    store = ReferenceStore(path)
+    for name in ("test_1.c", "test_2.c"):
+        store.put((build, "config", name, source_digest(str(corpus / name))), RESULT)
+    store.close()
+    with open(path, "a") as f:   # a line from before sources were hashed
+        f.write(json.dumps({"build": build, "config": "config", "source": "test_3.c", "result": RESULT}) + "\n")
+    (corpus / "test_2.c").write_text("int changed;\n")
+
+    subprocess.run([sys.executable, os.path.join(TOOL_DIR, "reference_store.py"), "prune", path,
+                    str(compiler), "--corpus", str(corpus)], check=True, capture_output=True)
+    assert [k[2] for k in load_store(path)] == ["test_1.c"]
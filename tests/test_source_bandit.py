@@ -0,0 +1,33 @@
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "exp2-nrs-options"))
+sys.path.insert(0, os.path.join(HERE, "..", "FuzzdFlags-tool"))
+
+from crash_signature import Signature
+from source_bandit import HANG_EVENTS, SourceBandit
+
+
+def crash(n):
+    return (Signature(f"sig{n}", "assert", f"assertion {n}"),)
+
+
+def test_repeated_hangs_are_one_event(tmp_path):
+    bandit = SourceBandit(1, str(tmp_path / "yield.tsv"))
+    for _ in range(20):
+        bandit.update(0, 'hang', 10.0)
+    assert bandit.hangs[0] == 20
+    assert bandit.events(0) == HANG_EVENTS
+
+
+def test_always_hanging_source_loses_to_new_signatures(tmp_path):
+    bandit = SourceBandit(2, str(tmp_path / "yield.tsv"), explore=0.0, rng=random.Random(1))
+    for n in range(50):
+        bandit.update(0, 'hang', 10.0)
+        bandit.update(1, 'crash', 10.0, crash(n // 10))   # a new signature every 10th pull
+    assert bandit.events(0) < bandit.events(1)
+    picks = [bandit.pick() for _ in range(200)]
+    assert picks.count(1) > 150
+    assert bandit.top(1)[0][0] == "test_1.c"